@@ -0,0 +1,111 @@
+"""Microbenchmark of the Receipt JSON encoding and decoding
+
+Compares the current codec with the previous one
+(`dataclasses.asdict` encoding and `object_hook` on every nested dictionary)
+on the `params` reply of the setup with 1000 channels and checks that
+both codecs produce the same wire format
+
+Usage
+-----
+    python benchmarks/receipt_codec.py --channels 1000 --number 200
+"""
+
+import argparse
+import dataclasses
+import json
+import timeit
+
+from caen_tools.utils.receipt import (
+    Receipt,
+    ReceiptResponse,
+    ReceiptJSONDecoder,
+    ReceiptJSONEncoder,
+)
+
+
+class LegacyEncoder(json.JSONEncoder):
+    """Previous encoder (deep copy of the receipt by dataclasses.asdict)"""
+
+    def default(self, o):
+        if dataclasses.is_dataclass(o):
+            return dataclasses.asdict(o)
+        return super().default(o)
+
+
+class LegacyDecoder(json.JSONDecoder):
+    """Previous decoder (checks every nested dictionary)"""
+
+    def __init__(self, *args, **kwargs):
+        json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
+
+    def object_hook(self, dct):
+        if ("sender" in dct) and ("executor" in dct):
+            response_dict = dct.pop("response", None)
+            response = (
+                ReceiptResponse(**response_dict) if response_dict is not None else None
+            )
+            return Receipt(response=response, **dct)
+        return dct
+
+
+def params_receipt(nchannels: int) -> Receipt:
+    """DeviceBackend `params` reply of the setup with `nchannels` channels"""
+
+    params = {
+        str(ch): dict(
+            VSet=1500.0,
+            VMon=1499.7 + ch * 1e-3,
+            IMonH=1.25,
+            IMonL=1.25,
+            ImonRange=0,
+            ChStatus=1,
+            Trip=2.5,
+            RDWn=50,
+            RUp=20,
+        )
+        for ch in range(nchannels)
+    }
+    receipt = Receipt(
+        sender="bench", executor="device_backend", title="params", params={}
+    )
+    receipt.response = ReceiptResponse(statuscode=1, body=dict(params=params))
+    return receipt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receipt codec microbenchmark")
+    parser.add_argument("--channels", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=200, help="repetitions")
+    args = parser.parse_args()
+
+    receipt = params_receipt(args.channels)
+    wire = json.dumps(receipt, cls=ReceiptJSONEncoder)
+    legacy_wire = json.dumps(receipt, cls=LegacyEncoder)
+    assert wire == legacy_wire, "wire format is changed"
+    assert json.loads(wire, cls=ReceiptJSONDecoder) == json.loads(
+        wire, cls=LegacyDecoder
+    ), "decoded receipts differ"
+
+    cases = dict(
+        encode=(
+            lambda: json.dumps(receipt, cls=LegacyEncoder),
+            lambda: json.dumps(receipt, cls=ReceiptJSONEncoder),
+        ),
+        decode=(
+            lambda: json.loads(wire, cls=LegacyDecoder),
+            lambda: json.loads(wire, cls=ReceiptJSONDecoder),
+        ),
+    )
+    print(f"receipt of {args.channels} channels, {len(wire) / 1024:.0f} kB")
+    print(f"{'':>8} {'legacy, ms':>12} {'current, ms':>12} {'speedup':>8}")
+    for name, (legacy, current) in cases.items():
+        t_legacy = min(timeit.repeat(legacy, number=args.number, repeat=3))
+        t_current = min(timeit.repeat(current, number=args.number, repeat=3))
+        print(
+            f"{name:>8} {t_legacy / args.number * 1e3:>12.3f}"
+            f" {t_current / args.number * 1e3:>12.3f} {t_legacy / t_current:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Load test of the WebService with different numbers of workers
+
+Runs stand-in backends and the WebService (`caen_tools.WebService.ws`)
+with every requested number of workers, loads `/device_backend/params`
+from several client processes and prints the throughput
+together with the number of queries reached the backends
+
+Usage
+-----
+    mkdir -p caen_tools/WebService/frontend/build/static
+    python benchmarks/ws_load.py --workers 1 2 4 --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from caen_tools.connection.server import RouterServer
+from caen_tools.utils.receipt import ReceiptResponse
+
+BACKENDS = dict(device_backend=5701, monitor=5702, system_check=5703)
+PATH = "/device_backend/params"
+
+
+def backend(title: str, port: int, nchannels: int, counter) -> None:
+    """Stand-in backend answering every receipt with a parameters snapshot"""
+
+    params = {
+        str(ch): dict(VMon=1500.0, IMonH=1.2, IMonL=1.2, ImonRange=0, ChStatus=1)
+        for ch in range(nchannels)
+    }
+
+    async def serve():
+        srv = RouterServer(f"tcp://*:{port}", title)
+        while True:
+            client, receipt = await srv.recv_receipt()
+            with counter.get_lock():
+                counter.value += 1
+            receipt.response = ReceiptResponse(statuscode=1, body=dict(params=params))
+            await srv.send_receipt(client, receipt)
+
+    asyncio.run(serve())
+
+
+async def http_load(host: str, port: int, connections: int, duration: float) -> int:
+    """Sends keep-alive GET requests and returns the number of responses"""
+
+    request = f"GET {PATH} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    stop = time.monotonic() + duration
+
+    async def connection() -> int:
+        reader, writer = await asyncio.open_connection(host, port)
+        done = 0
+        while time.monotonic() < stop:
+            writer.write(request)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            done += 1
+        writer.close()
+        return done
+
+    return sum(await asyncio.gather(*(connection() for _ in range(connections))))
+
+
+def client(host: str, port: int, connections: int, duration: float, results) -> None:
+    """Client process entry point"""
+    results.put(asyncio.run(http_load(host, port, connections, duration)))
+
+
+def wait_port(host: str, port: int, timeout: float = 30) -> None:
+    """Waits until the WebService accepts connections"""
+
+    async def probe():
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            asyncio.run(probe())
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def run_case(args, workers: int, counter) -> dict:
+    """Measures the throughput of the WebService with `workers` workers"""
+
+    with tempfile.NamedTemporaryFile("w", suffix=".ini", delete=False) as config:
+        config.write("[ws]\n")
+        for title, port in BACKENDS.items():
+            config.write(f"{title} = tcp://localhost:{port}\n")
+        config.write(f"port = {args.port}\nhost = {args.host}\nloglevel = warning\n")
+        config.write(f"upstream = ipc://{tempfile.gettempdir()}/caen_ws_load\n")
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "caen_tools.WebService.ws"]
+        + ["-c", config.name, "--workers", str(workers)]
+    )
+    try:
+        wait_port(args.host, args.port)
+        time.sleep(1)  # let all workers start
+        counter.value = 0
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=client,
+                args=(args.host, args.port, args.connections, args.duration, results),
+            )
+            for _ in range(args.clients)
+        ]
+        for proc in clients:
+            proc.start()
+        requests = sum(results.get() for _ in clients)
+        for proc in clients:
+            proc.join()
+        backend_queries = counter.value
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(config.name)
+
+    return dict(
+        workers=workers,
+        rps=requests / args.duration,
+        backend_qps=backend_queries / args.duration,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebService load test")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10, help="in seconds")
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument(
+        "--connections", type=int, default=16, help="connections per client"
+    )
+    parser.add_argument("--channels", type=int, default=100, help="setup size")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    counter = multiprocessing.Value("l", 0)
+    backends = [
+        multiprocessing.Process(
+            target=backend, args=(title, port, args.channels, counter), daemon=True
+        )
+        for title, port in BACKENDS.items()
+    ]
+    for proc in backends:
+        proc.start()
+
+    print(f"{'workers':>8} {'req/s':>10} {'backend q/s':>12}")
+    for workers in args.workers:
+        res = run_case(args, workers, counter)
+        print(f"{res['workers']:>8} {res['rps']:>10.1f} {res['backend_qps']:>12.2f}")
+
+    for proc in backends:
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
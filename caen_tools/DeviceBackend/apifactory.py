@@ -12,7 +12,11 @@ from caen_setup.Tickets.Tickets import (
     GetParams_Ticket,
 )
 
+from caen_tools.utils import tracing
+from caen_tools.utils.metrics import REGISTRY, Names
+from caen_tools.utils.paramsframe import ParamsFrame
 from caen_tools.utils.receipt import Receipt, ReceiptResponse
+from caen_tools.utils.utils import get_timestamp
 
 
 class APIMethods:
@@ -88,21 +92,30 @@ class APIMethods:
         Notes
         -----
         receipt.params must correspond GetParams_Ticket.type_description
+        (with the optional "frame" flag to get the parameters
+        in the ParamsFrame wire format)
+
+        The response body has the "measurement_time" of the reading
+        (unix time in seconds with the fraction of the second)
         """
 
         logging.debug("Start get params ticket")
-        ticket = GetParams_Ticket(receipt.params)
+        ticket_params = {k: v for k, v in receipt.params.items() if k != "frame"}
+        ticket = GetParams_Ticket(ticket_params)
+        started = get_timestamp(precise=True)
         receipt.response = APIMethods.ticketexec(ticket, h)
         if receipt.response.statuscode == 0:
             return receipt
+        # the middle of the reading is the best estimate of the sampling time
+        measured = (started + get_timestamp(precise=True)) / 2
 
         rawdata = receipt.response.body["params"]
-        outdict = dict()
-        for row in rawdata:
-            chidx = row["channel"]["alias"]
-            values = row["params"]
-            outdict[chidx] = values
-        receipt.response.body["params"] = outdict
+        if receipt.params.get("frame", False):
+            params = ParamsFrame.from_rows(rawdata).to_wire()
+        else:
+            params = {row["channel"]["alias"]: row["params"] for row in rawdata}
+        receipt.response.body["params"] = params
+        receipt.response.body["measurement_time"] = measured
         return receipt
 
     @staticmethod
@@ -114,6 +127,30 @@ class APIMethods:
         receipt.response = APIMethods.ticketexec(ticket, h)
         return receipt
 
+    @staticmethod
+    def flight_trigger(receipt: Receipt, h: Handler) -> Receipt:
+        """Triggers the flight recorder
+        (see caen_tools.DeviceBackend.recorder, the optional "reason" parameter
+        is saved with the recording, ignored if the recorder is disabled)"""
+
+        logging.debug("Start flight trigger")
+        receipt.response = ReceiptResponse(statuscode=1, body={})
+        return receipt
+
+    @staticmethod
+    def metrics(receipt: Receipt, h: Handler) -> Receipt:
+        """Returns metrics of the service"""
+        receipt.response = ReceiptResponse(statuscode=1, body=REGISTRY.snapshot())
+        return receipt
+
+    @staticmethod
+    def traces(receipt: Receipt, h: Handler) -> Receipt:
+        """Returns recent slow receipts of the service"""
+        receipt.response = ReceiptResponse(
+            statuscode=1, body=tracing.SLOW_TRACES.snapshot()
+        )
+        return receipt
+
     @staticmethod
     def wrongroute(receipt: Receipt) -> Receipt:
         """Default answer for the wrong title field in the receipt"""
@@ -134,6 +171,9 @@ class APIFactory:
         "get_voltage": APIMethods.get_voltage,
         "params": APIMethods.params,
         "down": APIMethods.down,
+        "flight_trigger": APIMethods.flight_trigger,
+        "metrics": APIMethods.metrics,
+        "traces": APIMethods.traces,
     }
 
     @staticmethod
@@ -153,6 +193,16 @@ class APIFactory:
             input receipt with extra ReceiptResponse block
         """
 
-        if receipt.title in APIFactory.apiroutes:
-            return APIFactory.apiroutes[receipt.title](receipt, h)
-        return APIMethods.wrongroute(receipt)
+        if receipt.title not in APIFactory.apiroutes:
+            REGISTRY.inc(Names.REQUESTS, route="wrongroute", statuscode=404)
+            return APIMethods.wrongroute(receipt)
+
+        with (
+            REGISTRY.timer(Names.REQUEST_DURATION, route=receipt.title),
+            tracing.execution(receipt),
+        ):
+            receipt = APIFactory.apiroutes[receipt.title](receipt, h)
+        REGISTRY.inc(
+            Names.REQUESTS, route=receipt.title, statuscode=receipt.response.statuscode
+        )
+        return receipt
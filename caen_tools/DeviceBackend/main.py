@@ -5,8 +5,11 @@ import argparse
 import logging
 from caen_setup import Handler
 
-from caen_tools.connection.server import RouterServer
+from caen_tools.connection.pubsub import Publisher
+from caen_tools.connection.server import RouterServer, server_options
 from caen_tools.DeviceBackend.apifactory import APIFactory
+from caen_tools.DeviceBackend.publisher import ParamsPublisher
+from caen_tools.DeviceBackend.recorder import FlightRecorder
 from caen_tools.utils.utils import config_processor, get_logging_config
 
 NUM_ASYNC_TASKS = 5
@@ -14,7 +17,9 @@ sem = asyncio.Semaphore(NUM_ASYNC_TASKS)
 logger = logging.getLogger(__file__)
 
 
-async def process_message(dbs: RouterServer, handler: Handler) -> None:
+async def process_message(
+    dbs: RouterServer, handler: Handler, recorder: FlightRecorder | None = None
+) -> None:
     """Waits a message, processes it and sends back a response
 
     Parameters
@@ -23,15 +28,19 @@ async def process_message(dbs: RouterServer, handler: Handler) -> None:
         server instance
     handler : Handler
         handler object for CAEN board managing
+    recorder : FlightRecorder | None, default None
+        flight recorder triggered by the executed receipts
     """
 
     async with sem:
-        asyncio.ensure_future(process_message(dbs, handler))
+        asyncio.ensure_future(process_message(dbs, handler, recorder))
 
         client_address, receipt = await dbs.recv_receipt()
         logging.info("Received %s from %s", receipt, client_address)
         out_receipt = APIFactory.execute_receipt(receipt, handler)
         await dbs.send_receipt(client_address, out_receipt)
+        if recorder is not None:
+            recorder.observe(out_receipt)
         logging.info("send response to client %s", client_address)
 
     return
@@ -66,7 +75,7 @@ def main():
         dict(settings.items("device")),
     )
 
-    dbs = RouterServer(address, "devback")
+    dbs = RouterServer(address, "devback", **server_options(settings, "device"))
     handler = Handler(
         map_config,
         refresh_time=handler_refresh_time,
@@ -76,9 +85,36 @@ def main():
         is_high_range=is_high_range,
     )
 
+    publisher = None
+    pub_address = settings.get("device", "pub_address", fallback="")
+    shm_name = settings.get("device", "shm_name", fallback="")
+    if pub_address or shm_name:
+        publisher = ParamsPublisher(
+            map_config,
+            settings.getfloat("device", "publish_every", fallback=1),
+            settings.get("device", "publish_params", fallback="").split() or None,
+            Publisher(pub_address) if pub_address else None,
+            shm_name or None,
+        )
+
+    recorder = None
+    record_every = settings.getfloat("device", "record_every", fallback=0)
+    if record_every > 0:
+        recorder = FlightRecorder(
+            map_config,
+            record_every,
+            settings.getfloat("device", "record_pre_trigger", fallback=10),
+            settings.getfloat("device", "record_post_trigger", fallback=5),
+            settings.get("device", "monitor"),
+        )
+
     loop = asyncio.get_event_loop()
     try:
-        asyncio.ensure_future(process_message(dbs, handler))
+        asyncio.ensure_future(process_message(dbs, handler, recorder))
+        if publisher is not None:
+            asyncio.ensure_future(publisher.run(handler))
+        if recorder is not None:
+            asyncio.ensure_future(recorder.run(handler))
         loop.run_forever()
     except KeyboardInterrupt:
         logging.info("Keyboard Interrupt. Finish the program")
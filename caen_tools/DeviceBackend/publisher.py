@@ -0,0 +1,106 @@
+"""Publication of the device parameters
+on the telemetry bus and in the shared memory"""
+
+import asyncio
+import json
+import logging
+
+from caen_setup import Handler
+
+from caen_tools.connection.pubsub import PARAMS_TOPIC, Publisher, board_topics
+from caen_tools.connection.sharedmem import SnapshotWriter, channel_aliases
+from caen_tools.DeviceBackend.apifactory import APIFactory
+from caen_tools.utils.receipt import Receipt
+
+
+class ParamsPublisher:
+    """Reads parameters of the device once per period,
+    publishes them per board (see caen_tools.connection.pubsub)
+    and writes them into the shared memory (see caen_tools.connection.sharedmem)
+
+    Parameters
+    ----------
+    map_config : str
+        path to the DC Layer map config (boards and channel aliases)
+    period : float
+        publication period (in seconds)
+    parameters : list[str] | None, default None
+        published parameters (all by default)
+    publisher : Publisher | None, default None
+        telemetry bus publisher
+    shm_name : str | None, default None
+        name of the shared memory segment
+    """
+
+    SENDER = "devback/publisher"
+
+    def __init__(
+        self,
+        map_config: str,
+        period: float,
+        parameters: list[str] | None = None,
+        publisher: Publisher | None = None,
+        shm_name: str | None = None,
+    ):
+        with open(map_config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.topics = board_topics(config)
+        self.period = period
+        self.parameters = parameters
+        self.publisher = publisher
+        self.writer = (
+            SnapshotWriter(shm_name, channel_aliases(config)) if shm_name else None
+        )
+
+    def receipt(self) -> Receipt:
+        """Receipt of the parameters reading"""
+
+        return Receipt(
+            sender=self.SENDER,
+            executor="devback",
+            title="params",
+            params=(
+                {} if self.parameters is None else {"select_params": self.parameters}
+            ),
+        )
+
+    async def publish(self, h: Handler) -> None:
+        """Reads and publishes parameters once"""
+
+        receipt = APIFactory.execute_receipt(self.receipt(), h)
+        if receipt.response.statuscode != 1:
+            logging.error("Parameters are not published: %s", receipt.response.body)
+            return
+
+        params = receipt.response.body["params"]
+        measured = receipt.response.body["measurement_time"]
+        if self.writer is not None:
+            self.writer.write(params, measured)
+        if self.publisher is None:
+            return
+
+        boards: dict[str, dict] = dict()
+        for alias, values in params.items():
+            topic = self.topics.get(str(alias), f"{PARAMS_TOPIC}unknown")
+            boards.setdefault(topic, dict())[alias] = values
+        for topic, channels in boards.items():
+            await self.publisher.publish(
+                topic, dict(params=channels), timestamp=measured
+            )
+
+    async def run(self, h: Handler) -> None:
+        """Publishes parameters every period"""
+
+        logging.info("Start parameters publication every %.3f s", self.period)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                starttime = loop.time()
+                try:
+                    await self.publish(h)
+                except Exception:
+                    logging.error("Parameters publication failed", exc_info=True)
+                await asyncio.sleep(max(0, self.period - (loop.time() - starttime)))
+        finally:
+            if self.writer is not None:
+                self.writer.close()
@@ -0,0 +1,243 @@
+"""Flight recorder of the device parameters
+
+The parameters are sampled at a high rate into the fixed-size ring buffer.
+A trigger (`down` receipt, `flight_trigger` receipt or new bad bits
+of the channel status) freezes the window around it:
+after the post-trigger time the samples from `pre_trigger` seconds before
+the trigger up to `post_trigger` seconds after it are sent to Monitor
+in one `send_flight` receipt. Triggers during the post-trigger time
+are merged into the same recording.
+
+Recording format (params of the `send_flight` receipt)
+`{"time": float, "reasons": [str, ...], "aliases": [alias, ...], "t": [float, ...],
+"columns": {"VMon": [...], "IMon": [...], "ChStatus": [...]}}`,
+the value of the channel `aliases[j]` at the time `t[i]` is `columns[par][i * len(aliases) + j]`
+(None if the channel was not read)
+"""
+
+from array import array
+import asyncio
+import json
+import logging
+import math
+
+from caen_setup import Handler
+
+from caen_tools.connection.client import AsyncClient
+from caen_tools.connection.sharedmem import channel_aliases
+from caen_tools.DeviceBackend.apifactory import APIMethods
+from caen_tools.utils.chstatus import Status
+from caen_tools.utils.metrics import REGISTRY, Names
+from caen_tools.utils.paramsframe import ParamsFrame
+from caen_tools.utils.receipt import Receipt, ReceiptResponseError
+from caen_tools.utils.utils import get_timestamp
+
+
+class FlightRecorder:
+    """Samples parameters of the device into the ring buffer
+    and sends the windows around the triggers to Monitor
+
+    Parameters
+    ----------
+    map_config : str
+        path to the DC Layer map config (channel aliases)
+    period : float
+        sampling period (in seconds)
+    pre_trigger : float
+        recorded time before the trigger (in seconds)
+    post_trigger : float
+        recorded time after the trigger (in seconds)
+    monitor : str
+        Monitor address
+    """
+
+    SENDER = "devback/recorder"
+    PARAMETERS = ["VMon", "IMonH", "IMonL", "ImonRange", "ChStatus"]
+    COLUMNS = ("VMon", "IMon", "ChStatus")
+
+    def __init__(
+        self,
+        map_config: str,
+        period: float,
+        pre_trigger: float,
+        post_trigger: float,
+        monitor: str,
+    ):
+        with open(map_config, "r", encoding="utf-8") as f:
+            self.aliases = channel_aliases(json.load(f))
+        self.index = {alias: i for i, alias in enumerate(self.aliases)}
+        self.period = period
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        # the ring keeps the whole window (sampling is never faster than the period)
+        # and a second more for the delayed recording
+        self.capacity = math.ceil((pre_trigger + post_trigger + 1) / period)
+        self.times = array("d", [math.nan]) * self.capacity
+        self.columns = {
+            c: array("d", [math.nan]) * (self.capacity * len(self.aliases))
+            for c in self.COLUMNS
+        }
+        self.head = 0
+        self.size = 0
+        self.cli = AsyncClient({"monitor": monitor})
+        self.counters = dict(samples=0, triggers=0, recordings=0, failed=0)
+        self.__status: list[int | None] = [None] * len(self.aliases)
+        self.__triggers: list[tuple[float, str]] = []
+        self.__dump: asyncio.Task | None = None
+
+    def receipt(self) -> Receipt:
+        """Receipt of the parameters reading"""
+
+        return Receipt(
+            sender=self.SENDER,
+            executor="devback",
+            title="params",
+            params={"select_params": self.PARAMETERS, "frame": True},
+        )
+
+    def sample(self, h: Handler) -> None:
+        """Reads parameters once into the ring buffer
+        (triggers the recording if new bad status bits are found)"""
+
+        # the metrics of the requests are not polluted by the sampling
+        receipt = APIMethods.params(self.receipt(), h)
+        if receipt.response.statuscode != 1:
+            logging.error("Flight recorder sampling failed: %s", receipt.response.body)
+            return
+        self.add(
+            ParamsFrame.from_wire(receipt.response.body["params"]),
+            receipt.response.body["measurement_time"],
+        )
+
+    def add(self, frame: ParamsFrame, timestamp: float) -> None:
+        """Adds the sample of the channel parameters to the ring buffer"""
+
+        nchannels = len(self.aliases)
+        base = self.head * nchannels
+        for c in self.COLUMNS:
+            values = self.columns[c]
+            for j in range(base, base + nchannels):
+                values[j] = math.nan
+        self.times[self.head] = timestamp
+
+        failed = []
+        for alias, vmon, imon_h, imon_l, imon_range, ch_status in zip(
+            frame.aliases,
+            frame["VMon"],
+            frame["IMonH"],
+            frame["IMonL"],
+            frame["ImonRange"],
+            frame["ChStatus"],
+        ):
+            j = self.index.get(alias)
+            if j is None:
+                continue
+            status = int(ch_status)
+            self.columns["VMon"][base + j] = vmon
+            self.columns["IMon"][base + j] = imon_h if int(imon_range) == 0 else imon_l
+            self.columns["ChStatus"][base + j] = status
+            last = self.__status[j]
+            if last is not None and status & ~last & Status.ERRORS:
+                failed.append(alias)
+            self.__status[j] = status
+
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.counters["samples"] += 1
+        REGISTRY.inc(Names.FLIGHT_SAMPLES)
+        if failed:
+            self.trigger(f"status {' '.join(failed)}", timestamp)
+
+    def window(self, start: float, end: float) -> dict:
+        """Returns the samples of the time range [`start`, `end`]
+        in the recording format (without the trigger fields)"""
+
+        nchannels = len(self.aliases)
+        times = []
+        columns = {c: [] for c in self.COLUMNS}
+        for k in range(self.head - self.size, self.head):
+            i = k % self.capacity
+            if not start <= self.times[i] <= end:
+                continue
+            times.append(self.times[i])
+            for c, values in self.columns.items():
+                columns[c].extend(
+                    None if math.isnan(v) else v
+                    for v in values[i * nchannels : (i + 1) * nchannels]
+                )
+        columns["ChStatus"] = [
+            None if v is None else int(v) for v in columns["ChStatus"]
+        ]
+        return dict(aliases=self.aliases, t=times, columns=columns)
+
+    def trigger(self, reason: str, timestamp: float | None = None) -> None:
+        """Triggers the recording of the window around `timestamp`
+        (current time by default)"""
+
+        timestamp = get_timestamp(precise=True) if timestamp is None else timestamp
+        logging.warning("Flight recorder is triggered by %s", reason)
+        self.counters["triggers"] += 1
+        REGISTRY.inc(Names.FLIGHT_TRIGGERS, reason=reason.split(" ", 1)[0])
+        self.__triggers.append((timestamp, reason))
+        if self.__dump is None or self.__dump.done():
+            self.__dump = asyncio.ensure_future(self.__record(timestamp))
+
+    def observe(self, receipt: Receipt) -> None:
+        """Triggers the recording by the executed receipt
+        (`down` and `flight_trigger` ones)"""
+
+        if receipt.title == "down":
+            self.trigger(f"down {receipt.sender}")
+        elif receipt.title == "flight_trigger":
+            self.trigger(f"{receipt.params.get('reason', 'manual')} {receipt.sender}")
+
+    async def __record(self, timestamp: float) -> None:
+        await asyncio.sleep(self.post_trigger)
+        triggers, self.__triggers = self.__triggers, []
+        # the window is taken: triggers during the sending start a new recording
+        self.__dump = None
+        recording = self.window(
+            timestamp - self.pre_trigger, timestamp + self.post_trigger
+        )
+        recording.update(time=timestamp, reasons=[reason for _, reason in triggers])
+
+        response = await self.cli.query(
+            Receipt(
+                sender=self.SENDER,
+                executor="monitor",
+                title="send_flight",
+                params=recording,
+            )
+        )
+        if (
+            isinstance(response.response, ReceiptResponseError)
+            or response.response.statuscode != 1
+        ):
+            self.counters["failed"] += 1
+            REGISTRY.inc(Names.FLIGHT_RECORDINGS, result="failed")
+            logging.error("Flight recording is not saved: %s", response.response)
+            return
+        self.counters["recordings"] += 1
+        REGISTRY.inc(Names.FLIGHT_RECORDINGS, result="saved")
+        logging.info(
+            "Flight recording of %d samples (%s) is saved",
+            len(recording["t"]),
+            recording["reasons"],
+        )
+
+    async def run(self, h: Handler) -> None:
+        """Samples parameters every period"""
+
+        logging.info(
+            "Start flight recorder every %.3f s (%d samples)",
+            self.period,
+            self.capacity,
+        )
+        loop = asyncio.get_running_loop()
+        while True:
+            starttime = loop.time()
+            try:
+                self.sample(h)
+            except Exception:
+                logging.error("Flight recorder sampling failed", exc_info=True)
+            await asyncio.sleep(max(0, self.period - (loop.time() - starttime)))
@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta
 import json
+import math
 from pathlib import Path
 import sqlite3
 import warnings
 
+# flight recordings are kept longer than the regular history
+FLIGHT_KEEP_DAYS = 30
+
 
 class ODB_Handler:
     def __init__(self, dbpath: str, cleaning_frequency: int = 100):
@@ -11,8 +15,20 @@ class ODB_Handler:
 
         self.con = sqlite3.connect(self.__dbpath)
         self.con.row_factory = sqlite3.Row  # to fetch dicts (not simple tuples)
+        # `t` is the measurement time with the fraction of the second
+        # (tables created with `t INTEGER` keep fractional values as REAL too)
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS data (idx INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, voltage REAL, current REAL, t REAL, status INTEGER);"
+        ).close()
+        # flight recordings: the window around the trigger per event
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS flight_events (idx INTEGER PRIMARY KEY AUTOINCREMENT, t REAL, reasons TEXT, t_start REAL, t_end REAL, samples INTEGER);"
+        ).close()
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS flight (event INTEGER, channel TEXT, voltage REAL, current REAL, t REAL, status INTEGER);"
+        ).close()
         self.con.execute(
-            "CREATE TABLE IF NOT EXISTS data (idx INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, voltage REAL, current REAL, t INTEGER, status INTEGER);"
+            "CREATE INDEX IF NOT EXISTS flight_event ON flight (event);"
         ).close()
         self.__records_after_delete_counter: int = 0
         self.__cleaning_frequency: int = cleaning_frequency
@@ -30,9 +46,19 @@ class ODB_Handler:
 
     def clear_db(self):
         min_timestamp = int((datetime.now() - timedelta(days=1)).timestamp())
+        min_flight_timestamp = int(
+            (datetime.now() - timedelta(days=FLIGHT_KEEP_DAYS)).timestamp()
+        )
         try:
             cur = self.con.cursor()
             cur.execute("DELETE FROM data WHERE t < ?", (min_timestamp,))
+            cur.execute(
+                "DELETE FROM flight WHERE event IN (SELECT idx FROM flight_events WHERE t < ?)",
+                (min_flight_timestamp,),
+            )
+            cur.execute(
+                "DELETE FROM flight_events WHERE t < ?", (min_flight_timestamp,)
+            )
             self.con.commit()
         except Exception as e:
             warnings.warn(f"Can not delete old records from the DB: {e}")
@@ -45,7 +71,8 @@ class ODB_Handler:
         Parameters
         ----------
         results : list
-            list of CAEN channels parameters with the following structure: list[(chidx, val["VMon"], val["IMonH"], ts, status)].
+            list of CAEN channels parameters with the following structure: list[(chidx, val["VMon"], val["IMonH"], ts, status)]
+            (`ts` is the measurement time in seconds, possibly fractional).
 
         Returns
         -------
@@ -83,25 +110,133 @@ class ODB_Handler:
 
         return is_ok
 
-    def get_params(self, start: int, end: int) -> list[dict] | None:
+    def get_params(
+        self, start: int | float, end: int | float, precise: bool = False
+    ) -> list[dict] | None:
+        """Returns records of the time range (`start`, `end`]
+
+        Parameters
+        ----------
+        start : int | float
+            start of the range (in seconds)
+        end : int | float
+            end of the range (in seconds)
+        precise : bool, default False
+            return the measurement time with the fraction of the second,
+            otherwise integer seconds are returned and compared with the range
+            (as they were stored before)
+        """
+        if precise:
+            query = "SELECT channel, voltage, current, t FROM data WHERE (t > ? AND t <= ?) ORDER BY idx DESC"
+            bounds = (start, end)
+        else:
+            # int(t) > start and int(t) <= end for the integer range bounds
+            query = "SELECT channel, voltage, current, t FROM data WHERE (t >= ? AND t < ?) ORDER BY idx DESC"
+            bounds = (math.floor(start) + 1, math.floor(end) + 1)
         is_ok = True
+        with self.con as con:
+            try:
+                res = con.execute(query, bounds).fetchall()
+                # return [dict(row) for row in res]
+                return [
+                    {
+                        "t": row["t"] if precise else int(row["t"]),
+                        "V": row["voltage"],
+                        "I": row["current"],
+                        "chidx": row["channel"],
+                    }
+                    for row in res
+                ]
+            except sqlite3.DatabaseError as e:
+                is_ok = False
+                warnings.warn(f"Houston! We faced problems with the Database: {e}.")
+        return []
+
+    def write_flight(
+        self, time: float, reasons: list[str], rows: list[tuple]
+    ) -> int | None:
+        """Writes the flight recording in one transaction.
+
+        Parameters
+        ----------
+        time : float
+            trigger time (in seconds)
+        reasons : list[str]
+            triggers of the recording
+        rows : list[tuple]
+            samples of the channels: list[(chidx, voltage, current, t, status)]
+
+        Returns
+        -------
+        int | None
+            identifier of the recording or None if something went wrong
+        """
+        times = [row[3] for row in rows]
+        try:
+            with self.con:
+                cur = self.con.execute(
+                    "INSERT INTO flight_events(t, reasons, t_start, t_end, samples) VALUES(?, ?, ?, ?, ?)",
+                    (
+                        time,
+                        json.dumps(reasons),
+                        min(times, default=time),
+                        max(times, default=time),
+                        len(set(times)),
+                    ),
+                )
+                event = cur.lastrowid
+                cur.close()
+                self.con.executemany(
+                    "INSERT INTO flight(event, channel, voltage, current, t, status) VALUES(?, ?, ?, ?, ?, ?)",
+                    [(event, *row) for row in rows],
+                ).close()
+            return event
+        except sqlite3.DatabaseError as e:
+            warnings.warn(f"Houston! We faced problems with the Database: {e}.")
+        return None
+
+    def get_flights(self, start: float, end: float) -> list[dict] | None:
+        """Returns flight recordings triggered in the time range (`start`, `end`]"""
         with self.con as con:
             try:
                 res = con.execute(
-                    "SELECT channel, voltage, current, t FROM data WHERE (t > ? AND t <= ?) ORDER BY idx DESC",
+                    "SELECT idx, t, reasons, t_start, t_end, samples FROM flight_events WHERE (t > ? AND t <= ?) ORDER BY t DESC",
                     (start, end),
                 ).fetchall()
-                # return [dict(row) for row in res]
+                return [
+                    {
+                        "id": row["idx"],
+                        "t": row["t"],
+                        "reasons": json.loads(row["reasons"]),
+                        "start": row["t_start"],
+                        "end": row["t_end"],
+                        "samples": row["samples"],
+                    }
+                    for row in res
+                ]
+            except sqlite3.DatabaseError as e:
+                warnings.warn(f"Houston! We faced problems with the Database: {e}.")
+        return None
+
+    def get_flight(self, event: int) -> list[dict] | None:
+        """Returns samples of the flight recording
+        (the same rows as get_params with the channel status)"""
+        with self.con as con:
+            try:
+                res = con.execute(
+                    "SELECT channel, voltage, current, t, status FROM flight WHERE event = ? ORDER BY t, channel",
+                    (event,),
+                ).fetchall()
                 return [
                     {
                         "t": row["t"],
                         "V": row["voltage"],
                         "I": row["current"],
+                        "status": row["status"],
                         "chidx": row["channel"],
                     }
                     for row in res
                 ]
             except sqlite3.DatabaseError as e:
-                is_ok = False
                 warnings.warn(f"Houston! We faced problems with the Database: {e}.")
-        return []
+        return None
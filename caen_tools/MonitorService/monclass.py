@@ -3,6 +3,7 @@ import logging
 from datetime import datetime
 from pathlib import Path
 
+from caen_tools.utils.paramsframe import ParamsFrame
 from .ODB import ODB_Handler
 
 
@@ -11,29 +12,35 @@ class Monitor:
         self.__odb = ODB_Handler(dbpath)
         self.__param_file_path = Path(param_file_path)
 
-    @staticmethod
-    def __imon_key(val_ImonRange: int) -> str:
-        return "IMonH" if val_ImonRange == 0 else "IMonL"
-
     def __process_response(self, res_dict, measurement_time):
         ts = measurement_time
 
-        res = res_dict["params"]
+        frame = ParamsFrame.from_any(res_dict["params"])
 
         res_list = []
-        for chidx, val in res.items():
-            status = int(bin(int(val["ChStatus"]))[2:])
-            imon_key = self.__imon_key(int(val["ImonRange"]))
-            res_list.append((chidx, val["VMon"], val[imon_key], ts, status))
+        for chidx, vmon, imon_h, imon_l, imon_range, ch_status in zip(
+            frame.aliases,
+            frame["VMon"],
+            frame["IMonH"],
+            frame["IMonL"],
+            frame["ImonRange"],
+            frame["ChStatus"],
+        ):
+            status = int(bin(int(ch_status))[2:])
+            imon = imon_h if int(imon_range) == 0 else imon_l
+            res_list.append((chidx, vmon, imon, ts, status))
         return res_list
 
-    def send_params(self, params: dict, measurement_time: int) -> dict:
+    def send_params(self, params: dict, measurement_time: int | float) -> dict:
         """Sends params to DB.
 
         Parameters
         ----------
         params : dict
-            json dict with key "body" where all parameters are stored (the GetParameters ticket response).
+            json dict with key "params" where all parameters are stored
+            (`{alias: {par: value}}` or ParamsFrame wire format)
+        measurement_time : int | float
+            unix time of the parameters reading (in seconds)
 
         Returns
         -------
@@ -53,12 +60,62 @@ class Monitor:
         }
         return response
 
-    def get_params(self, start: int, end: int) -> dict:
+    def get_params(
+        self, start: int | float, end: int | float, precise: bool = False
+    ) -> dict:
         logging.debug("Start getting parameters from ODB")
-        res = self.__odb.get_params(start, end)
+        res = self.__odb.get_params(start, end, precise)
         response = {
             "timestamp": int(datetime.now().timestamp()),
             "is_ok": res is not None,
             "params": res,
         }
         return response
+
+    def send_flight(self, recording: dict) -> dict:
+        """Sends the flight recording to DB in one bulk write.
+
+        Parameters
+        ----------
+        recording : dict
+            window around the trigger in the DeviceBackend flight recorder format
+            (see caen_tools.DeviceBackend.recorder)
+
+        Returns
+        -------
+        dict
+            {"id": identifier of the recording, "is_ok": bool}
+        """
+        logging.debug("Start sending flight recording to ODB")
+        aliases = recording["aliases"]
+        columns = recording["columns"]
+        rows = []
+        for i, t in enumerate(recording["t"]):
+            for j, chidx in enumerate(aliases, start=i * len(aliases)):
+                status = columns["ChStatus"][j]
+                if status is None:
+                    continue
+                # the same status representation as in the parameters history
+                rows.append(
+                    (
+                        chidx,
+                        columns["VMon"][j],
+                        columns["IMon"][j],
+                        t,
+                        int(bin(int(status))[2:]),
+                    )
+                )
+        event = self.__odb.write_flight(
+            recording["time"], recording.get("reasons", []), rows
+        )
+        return {"id": event, "is_ok": event is not None}
+
+    def get_flights(self, start: float, end: float) -> dict:
+        logging.debug("Start getting flight recordings from ODB")
+        res = self.__odb.get_flights(start, end)
+        return {"is_ok": res is not None, "flights": res}
+
+    def get_flight(self, event: int) -> dict:
+        logging.debug("Start getting flight recording %s from ODB", event)
+        res = self.__odb.get_flight(event)
+        return {"is_ok": res is not None, "params": res}
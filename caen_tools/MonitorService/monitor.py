@@ -4,8 +4,10 @@ import argparse
 import asyncio
 import logging
 
-from caen_tools.connection.server import RouterServer
+from caen_tools.connection.server import RouterServer, server_options
 from caen_tools.MonitorService.monclass import Monitor
+from caen_tools.utils import tracing
+from caen_tools.utils.metrics import REGISTRY, Names
 from caen_tools.utils.receipt import Receipt, ReceiptResponse
 from caen_tools.utils.utils import config_processor, get_logging_config
 
@@ -44,9 +46,12 @@ class APIMethods:
     @staticmethod
     def execute_send(receipt: Receipt, monitor: Monitor):
         """Sends device parameters in Monitor.
-        Monitor writes them in the DB and returns {}"""
+        Monitor writes them in the DB and returns {}
+        (parameters are measured at "measurement_time",
+        the receipt time if it is not set)"""
         response = monitor.send_params(
-            receipt.params, measurement_time=receipt.timestamp
+            receipt.params,
+            measurement_time=receipt.params.get("measurement_time", receipt.timestamp),
         )
         receipt.response = ReceiptResponse(
             statuscode=1 if response["is_ok"] else 0,
@@ -56,10 +61,55 @@ class APIMethods:
 
     @staticmethod
     def execute_get(receipt: Receipt, monitor: Monitor):
-        """Gets device parameters from Monitor"""
+        """Gets device parameters from Monitor
+        (timestamps are integer seconds
+        unless the "precise" flag is set)"""
         response = monitor.get_params(
+            receipt.params["start_time"],
+            receipt.params["end_time"],
+            receipt.params.get("precise", False),
+        )
+        receipt.response = ReceiptResponse(
+            statuscode=1 if response["is_ok"] else 0,
+            body=(
+                response["params"]
+                if response["is_ok"]
+                else "Something is wrong in the DB. No rows selected."
+            ),
+        )
+        return receipt
+
+    @staticmethod
+    def execute_send_flight(receipt: Receipt, monitor: Monitor):
+        """Saves the flight recording of DeviceBackend in Monitor
+        and returns {"id": identifier of the recording}"""
+        response = monitor.send_flight(receipt.params)
+        receipt.response = ReceiptResponse(
+            statuscode=1 if response["is_ok"] else 0,
+            body={"id": response["id"]},
+        )
+        return receipt
+
+    @staticmethod
+    def execute_get_flights(receipt: Receipt, monitor: Monitor):
+        """Gets flight recordings triggered in the time range"""
+        response = monitor.get_flights(
             receipt.params["start_time"], receipt.params["end_time"]
         )
+        receipt.response = ReceiptResponse(
+            statuscode=1 if response["is_ok"] else 0,
+            body=(
+                response["flights"]
+                if response["is_ok"]
+                else "Something is wrong in the DB. No rows selected."
+            ),
+        )
+        return receipt
+
+    @staticmethod
+    def execute_get_flight(receipt: Receipt, monitor: Monitor):
+        """Gets samples of the flight recording"""
+        response = monitor.get_flight(receipt.params["id"])
         receipt.response = ReceiptResponse(
             statuscode=1 if response["is_ok"] else 0,
             body=(
@@ -70,6 +120,20 @@ class APIMethods:
         )
         return receipt
 
+    @staticmethod
+    def metrics(receipt: Receipt, monitor: Monitor):
+        """Returns metrics of the microservice"""
+        receipt.response = ReceiptResponse(statuscode=1, body=REGISTRY.snapshot())
+        return receipt
+
+    @staticmethod
+    def traces(receipt: Receipt, monitor: Monitor):
+        """Returns recent slow receipts of the microservice"""
+        receipt.response = ReceiptResponse(
+            statuscode=1, body=tracing.SLOW_TRACES.snapshot()
+        )
+        return receipt
+
     @staticmethod
     def wrongroute(receipt: Receipt) -> Receipt:
         """Default answer for the wrong title field in the receipt"""
@@ -84,6 +148,11 @@ class APIFactory:
         "status": APIMethods.status,
         "send_params": APIMethods.execute_send,
         "get_params": APIMethods.execute_get,
+        "send_flight": APIMethods.execute_send_flight,
+        "get_flights": APIMethods.execute_get_flights,
+        "get_flight": APIMethods.execute_get_flight,
+        "metrics": APIMethods.metrics,
+        "traces": APIMethods.traces,
     }
 
     @staticmethod
@@ -92,9 +161,20 @@ class APIFactory:
 
         if receipt.title in APIFactory.apiroutes:
             try:
-                return APIFactory.apiroutes[receipt.title](receipt, monitor)
+                with (
+                    REGISTRY.timer(Names.REQUEST_DURATION, route=receipt.title),
+                    tracing.execution(receipt),
+                ):
+                    receipt = APIFactory.apiroutes[receipt.title](receipt, monitor)
+                REGISTRY.inc(
+                    Names.REQUESTS,
+                    route=receipt.title,
+                    statuscode=receipt.response.statuscode,
+                )
+                return receipt
             except:
                 logging.error("Not processed %s", receipt, exc_info=True)
+        REGISTRY.inc(Names.REQUESTS, route="wrongroute", statuscode=404)
         return APIMethods.wrongroute(receipt)
 
 
@@ -126,7 +206,7 @@ def main():
 
     monitor = Monitor(dbpath, param_file_path)
 
-    dbs = RouterServer(address, "monitor")
+    dbs = RouterServer(address, "monitor", **server_options(settings, "monitor"))
 
     loop = asyncio.get_event_loop()
     try:
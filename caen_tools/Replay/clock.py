@@ -0,0 +1,50 @@
+"""Event loop running on the accelerated virtual clock"""
+
+import asyncio
+import selectors
+import time
+
+
+class _ScaledSelector(selectors.DefaultSelector):
+    """Selector waiting `speed` times less than asked"""
+
+    def __init__(self, speed: float):
+        super().__init__()
+        self._speed = speed
+
+    def select(self, timeout=None):
+        if timeout is not None:
+            timeout = timeout / self._speed
+        return super().select(timeout)
+
+
+class AcceleratedEventLoop(asyncio.SelectorEventLoop):
+    """Event loop with the virtual clock running `speed` times faster than real one
+
+    All loop timers (`asyncio.sleep`, `asyncio.wait_for`, zmq.asyncio timeouts)
+    are compressed by `speed` times
+
+    Parameters
+    ----------
+    speed : float
+        acceleration of the virtual time
+    start_timestamp : float
+        virtual unix timestamp of the loop creation (in seconds)
+    """
+
+    def __init__(self, speed: float, start_timestamp: float):
+        super().__init__(_ScaledSelector(speed))
+        self.speed = speed
+        self.start_timestamp = start_timestamp
+        self._real_start = time.monotonic()
+
+    def elapsed(self) -> float:
+        """Virtual time passed since the loop creation (in seconds)"""
+        return (time.monotonic() - self._real_start) * self.speed
+
+    def time(self) -> float:
+        return self._real_start + self.elapsed()
+
+    def timestamp(self) -> float:
+        """Current virtual unix timestamp (in seconds)"""
+        return self.start_timestamp + self.elapsed()
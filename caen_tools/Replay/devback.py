@@ -0,0 +1,141 @@
+"""Stand-in DeviceBackend serving parameters recorded by Monitor"""
+
+from typing import Callable
+
+import logging
+import sqlite3
+
+from caen_tools.utils.receipt import Receipt, ReceiptResponse
+from caen_tools.utils.resperrs import RResponseErrors
+
+
+class MonitorHistory:
+    """Forward-only reader of the Monitor `data` table
+
+    Parameters
+    ----------
+    dbpath : str
+        path to the Monitor sqlite database
+    start : int
+        start timestamp of the replay (in seconds)
+    end : int
+        end timestamp of the replay (in seconds)
+    """
+
+    def __init__(self, dbpath: str, start: int, end: int):
+        self.con = sqlite3.connect(dbpath)
+        self.__rows = self.con.execute(
+            "SELECT channel, voltage, current, t, status FROM data WHERE (t >= ? AND t <= ?) ORDER BY t, idx",
+            (start, end),
+        )
+        self.__next = self.__rows.fetchone()
+        self.snapshot: dict[str, dict] = dict()
+        self.timestamp: float | None = None
+
+    @staticmethod
+    def __channel_params(voltage: float, current: float, status: int) -> dict:
+        """Restores DeviceBackend channel parameters from the Monitor row"""
+
+        # Monitor keeps binary digits of ChStatus as a decimal number
+        chstatus = int(str(status), 2)
+        return dict(
+            VMon=voltage, IMonH=current, IMonL=current, ImonRange=0, ChStatus=chstatus
+        )
+
+    @property
+    def finished(self) -> bool:
+        """All rows are read"""
+        return self.__next is None
+
+    def advance(self, timestamp: float) -> None:
+        """Applies all rows recorded up to `timestamp`"""
+
+        while self.__next is not None and self.__next[3] <= timestamp:
+            channel, voltage, current, t, status = self.__next
+            self.snapshot[channel] = self.__channel_params(voltage, current, status)
+            self.timestamp = t
+            self.__next = self.__rows.fetchone()
+        return
+
+
+class ReplayDevice:
+    """Executes DeviceBackend receipts using recorded parameters
+    and records all commands
+
+    Parameters
+    ----------
+    history : MonitorHistory
+        source of the recorded parameters
+    clock : Callable[[], float]
+        returns current virtual timestamp
+    multiplier : float, default 1
+        initial voltage multiplier
+    """
+
+    def __init__(
+        self, history: MonitorHistory, clock: Callable[[], float], multiplier=1.0
+    ):
+        self.history = history
+        self.clock = clock
+        self.multiplier = multiplier
+        self.decisions: list[dict] = []
+        self.__last_served: dict[str, int | None] = dict()
+        self.apiroutes = {
+            "status": self.status,
+            "params": self.params,
+            "get_voltage": self.get_voltage,
+            "set_voltage": self.set_voltage,
+            "down": self.down,
+        }
+
+    def record(self, receipt: Receipt) -> None:
+        """Keeps a command with its timing"""
+
+        now = self.clock()
+        data_time = self.__last_served.get(receipt.sender)
+        decision = dict(
+            timestamp=now,
+            sender=receipt.sender,
+            title=receipt.title,
+            params=receipt.params,
+            data_timestamp=data_time,
+            latency=now - data_time if data_time is not None else None,
+        )
+        logging.info("Decision %s", decision)
+        self.decisions.append(decision)
+        return
+
+    def status(self, receipt: Receipt) -> ReceiptResponse:
+        return ReceiptResponse(statuscode=1, body={})
+
+    def params(self, receipt: Receipt) -> ReceiptResponse:
+        self.history.advance(self.clock())
+        if self.history.timestamp is None:
+            return ReceiptResponse(statuscode=0, body="No recorded data yet")
+        self.__last_served[receipt.sender] = self.history.timestamp
+        return ReceiptResponse(
+            statuscode=1,
+            body=dict(params={ch: dict(v) for ch, v in self.history.snapshot.items()}),
+        )
+
+    def get_voltage(self, receipt: Receipt) -> ReceiptResponse:
+        return ReceiptResponse(statuscode=1, body=dict(multiplier=self.multiplier))
+
+    def set_voltage(self, receipt: Receipt) -> ReceiptResponse:
+        self.record(receipt)
+        self.multiplier = float(receipt.params["target_voltage"])
+        return ReceiptResponse(statuscode=1, body={})
+
+    def down(self, receipt: Receipt) -> ReceiptResponse:
+        self.record(receipt)
+        self.multiplier = 0
+        return ReceiptResponse(statuscode=1, body={})
+
+    def execute_receipt(self, receipt: Receipt) -> Receipt:
+        """Matches a method to execute input receipt"""
+
+        if receipt.title in self.apiroutes:
+            receipt.response = self.apiroutes[receipt.title](receipt)
+        else:
+            receipt.response = RResponseErrors.NotFound("this api method is not found")
+        return receipt
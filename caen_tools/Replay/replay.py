@@ -0,0 +1,210 @@
+"""Replay of the recorded Monitor data through SystemCheck scripts
+on the accelerated virtual clock"""
+
+from queue import Queue
+from types import SimpleNamespace
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+from caen_tools.connection.server import RouterServer
+from caen_tools.SystemCheck.scripts import (
+    ManagerScript,
+    MChSWorker,
+    InterlockControl,
+    HealthControl,
+    RelaxControl,
+    ReducerControl,
+)
+from caen_tools.SystemCheck.scripts.structures import InterlockState
+from caen_tools.SystemCheck.utils import (
+    sharedmemo_fillup,
+    parse_max_currents,
+    parse_trip_time,
+)
+from caen_tools.utils.utils import config_processor, get_logging_config
+from caen_tools.Replay.clock import AcceleratedEventLoop
+from caen_tools.Replay.devback import MonitorHistory, ReplayDevice
+
+CONFIG_SECTION = "check"
+
+
+class RecordingMChS(MChSWorker):
+    """MChSWorker recording datagrams instead of sending"""
+
+    def __init__(self, clock, **kwargs):
+        super().__init__(**kwargs)
+        self.clock = clock
+        self.states: list[dict] = []
+
+    def send(self, ack: bool):
+        self.states.append(dict(timestamp=self.clock(), ack=ack))
+        self.counters["sent"] += 1
+        return
+
+
+class ReplayInterlock:
+    """Constant interlock state (stand-in of the InterlockManager)"""
+
+    def __init__(self, state: bool):
+        self.state = state
+
+    def subscribe(self, callback) -> None:
+        return
+
+    async def listen(self) -> None:
+        return
+
+    async def get_interlock(self) -> InterlockState:
+        return InterlockState(self.state)
+
+
+async def serve(srv: RouterServer, device: ReplayDevice) -> None:
+    """Executes DeviceBackend receipts with the replay device"""
+
+    while True:
+        client_address, receipt = await srv.recv_receipt()
+        logging.debug("Received %s from %s", receipt, client_address)
+        out_receipt = device.execute_receipt(receipt)
+        await srv.send_receipt(client_address, out_receipt)
+
+
+async def wait_end(loop: AcceleratedEventLoop, history: MonitorHistory, end: int):
+    """Waits the end of the replay"""
+
+    while loop.timestamp() < end and not history.finished:
+        await asyncio.sleep(60)
+        logging.info(
+            "Replay time %d, %.1f%% done",
+            loop.timestamp(),
+            100
+            * (loop.timestamp() - loop.start_timestamp)
+            / (end - loop.start_timestamp),
+        )
+
+
+def summary(decisions: list[dict], states: list[dict], realtime: float) -> dict:
+    """Aggregates the replay results"""
+
+    res = dict(realtime=realtime, mchs_datagrams=len(states), decisions=dict())
+    res["nack"] = sum(1 for state in states if not state["ack"])
+    for title in sorted(set(d["title"] for d in decisions)):
+        latencies = [
+            d["latency"]
+            for d in decisions
+            if d["title"] == title and d["latency"] is not None
+        ]
+        res["decisions"][title] = dict(
+            count=sum(1 for d in decisions if d["title"] == title),
+            mean_latency=statistics.fmean(latencies) if latencies else None,
+            max_latency=max(latencies, default=None),
+        )
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay of the Monitor data through SystemCheck scripts"
+    )
+    parser.add_argument(
+        "-c",
+        "--config",
+        required=False,
+        type=argparse.FileType("r"),
+        help="Config file",
+        nargs="?",
+    )
+    parser.add_argument("--start", type=int, required=True, help="Start timestamp")
+    parser.add_argument("--end", type=int, required=True, help="End timestamp")
+    parser.add_argument("--db", help="Monitor database (dbpath from config)")
+    parser.add_argument("--speed", type=float, default=100, help="Time acceleration")
+    parser.add_argument("--port", type=int, default=5590, help="Stand-in devback port")
+    parser.add_argument(
+        "--interlock", type=int, default=0, choices=[0, 1], help="Interlock state"
+    )
+    parser.add_argument(
+        "--voltage", type=float, default=1.0, help="Initial voltage multiplier"
+    )
+    parser.add_argument("--autopilot", action="store_true", help="Enable autopilot")
+    parser.add_argument(
+        "-o", "--output", default="replay.json", help="Output file with the results"
+    )
+    args = parser.parse_args()
+    settings = config_processor(args.config)
+    get_logging_config(
+        level=settings.get(CONFIG_SECTION, "loglevel"),
+        filepath=settings.get(CONFIG_SECTION, "logfile"),
+    )
+
+    loop = AcceleratedEventLoop(args.speed, args.start)
+    asyncio.set_event_loop(loop)
+
+    history = MonitorHistory(
+        args.db or settings.get("monitor", "dbpath"), args.start, args.end
+    )
+    device = ReplayDevice(history, loop.timestamp, args.voltage)
+    srv = RouterServer(f"tcp://*:{args.port}", "devback")
+    devback_address = f"tcp://localhost:{args.port}"
+
+    # Shared parameters are kept in the plain dicts (single process)
+    shared_parameters = sharedmemo_fillup(
+        SimpleNamespace(dict=dict, Queue=Queue), settings, CONFIG_SECTION
+    )
+    shared_parameters["relax"]["enable"] = args.autopilot
+    shared_parameters["reducer"]["enable"] = args.autopilot
+    health_config = settings.get(f"{CONFIG_SECTION}.health", "health_check_config_path")
+
+    mchs = RecordingMChS(loop.timestamp, **shared_parameters["mchs"])
+    interlockdb = ReplayInterlock(bool(args.interlock))
+    interlock = InterlockControl(shared_parameters["interlock"], interlockdb, mchs)
+    relax = RelaxControl(shared_parameters["relax"], devback_address, interlockdb)
+    reducer = ReducerControl(
+        shared_parameters["reducer"], devback_address, interlockdb, mchs, relax
+    )
+    health = HealthControl(
+        shared_parameters["health"],
+        devback_address,
+        devback_address,
+        mchs,
+        parse_max_currents(health_config),
+        parse_trip_time(health_config),
+        [relax, reducer],
+    )
+    manager = ManagerScript(
+        dict(interlock=interlock, relax=relax, reducer=reducer, health=health),
+        shared_parameters["events"],
+    )
+
+    logging.info(
+        "Start replay from %s to %s with speed %s", args.start, args.end, args.speed
+    )
+    realstart = time.monotonic()
+    loop.create_task(serve(srv, device))
+    manager.start()
+    try:
+        loop.run_until_complete(wait_end(loop, history, args.end))
+    except KeyboardInterrupt:
+        logging.info("Keyboard Interrupt. Finish the replay")
+    finally:
+        pending = asyncio.all_tasks(loop=loop)
+        for task in pending:
+            task.cancel()
+            logging.debug("Close task %s", task)
+
+    results = dict(
+        summary=summary(device.decisions, mchs.states, time.monotonic() - realstart),
+        decisions=device.decisions,
+        mchs=mchs.states,
+    )
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+    logging.info("Replay summary %s", results["summary"])
+    return
+
+
+if __name__ == "__main__":
+    main()
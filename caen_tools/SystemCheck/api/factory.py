@@ -1,4 +1,6 @@
 from caen_tools.SystemCheck.api import APIMethods
+from caen_tools.utils import tracing
+from caen_tools.utils.metrics import REGISTRY, Names
 from caen_tools.utils.receipt import Receipt
 
 
@@ -9,6 +11,9 @@ class APIFactory:
         "status": APIMethods.status,
         "status_autopilot": APIMethods.autopilot_enable,
         "set_autopilot": APIMethods.set_autopilot,
+        "telemetry": APIMethods.telemetry,
+        "metrics": APIMethods.metrics,
+        "traces": APIMethods.traces,
     }
 
     @staticmethod
@@ -28,8 +33,18 @@ class APIFactory:
             input receipt with extra ReceiptResponse block
         """
 
-        if receipt.title in APIFactory.apiroutes:
-            return APIFactory.apiroutes[receipt.title](
+        if receipt.title not in APIFactory.apiroutes:
+            REGISTRY.inc(Names.REQUESTS, route="wrongroute", statuscode=404)
+            return APIMethods.wrongroute(receipt)
+
+        with (
+            REGISTRY.timer(Names.REQUEST_DURATION, route=receipt.title),
+            tracing.execution(receipt),
+        ):
+            receipt = APIFactory.apiroutes[receipt.title](
                 receipt=receipt, shared_parameters=shared_parameters
             )
-        return APIMethods.wrongroute(receipt)
+        REGISTRY.inc(
+            Names.REQUESTS, route=receipt.title, statuscode=receipt.response.statuscode
+        )
+        return receipt
@@ -1,6 +1,10 @@
 """A set of API methods for SystemCheck microservice"""
 
+import time
 import logging
+from caen_tools.SystemCheck.scripts.structures import ScriptEvent
+from caen_tools.utils import tracing
+from caen_tools.utils.metrics import REGISTRY
 from caen_tools.utils.receipt import Receipt, ReceiptResponse
 from caen_tools.utils.resperrs import RResponseErrors
 from caen_tools.utils.utils import get_timestamp
@@ -65,8 +69,64 @@ class APIMethods:
         )
 
         logging.info("new par %s", shared_parameters["relax"]["enable"])
+
+        # wake up worker scripts to apply new parameters immediately
+        shared_parameters["events"].put(tuple(ScriptEvent("relax", wake=True)))
+        shared_parameters["events"].put(tuple(ScriptEvent("reducer")))
         return APIMethods.autopilot_enable(receipt, shared_parameters, **kwargs)
 
+    @staticmethod
+    def telemetry(receipt: Receipt, shared_parameters: dict, **kwargs) -> Receipt:
+        """Gets execution statistics of the worker scripts"""
+
+        logging.debug("Start telemetry method")
+        now = time.time()
+        body = dict()
+        for name in ("loader", "health", "interlock", "relax", "reducer"):
+            stats = shared_parameters.get(name).get("telemetry")
+            if stats is None:
+                continue
+            last_success = stats["last_success"]
+            stats["since_success"] = (
+                now - last_success if last_success is not None else None
+            )
+            body[name] = stats
+        body["mchs"] = shared_parameters.get("mchs_counters")
+
+        receipt.response = ReceiptResponse(
+            statuscode=1, body=body, timestamp=get_timestamp()
+        )
+        return receipt
+
+    @staticmethod
+    def metrics(receipt: Receipt, shared_parameters: dict, **kwargs) -> Receipt:
+        """Gets metrics of the SystemCheck server and worker processes
+        (worker ones have the `process="worker"` label)"""
+
+        logging.debug("Start metrics method")
+        body = REGISTRY.snapshot()
+        worker = shared_parameters.get("worker_metrics")
+        if worker is not None:
+            for kind, rows in worker.items():
+                body[kind].extend(
+                    dict(row, labels=dict(row["labels"], process="worker"))
+                    for row in rows
+                )
+        receipt.response = ReceiptResponse(
+            statuscode=1, body=body, timestamp=get_timestamp()
+        )
+        return receipt
+
+    @staticmethod
+    def traces(receipt: Receipt, **kwargs) -> Receipt:
+        """Gets recent slow receipts of the SystemCheck server"""
+
+        logging.debug("Start traces method")
+        receipt.response = ReceiptResponse(
+            statuscode=1, body=tracing.SLOW_TRACES.snapshot(), timestamp=get_timestamp()
+        )
+        return receipt
+
     @staticmethod
     def wrongroute(receipt: Receipt, **kwargs) -> Receipt:
         """Default answer for the wrong title field in the receipt"""
@@ -7,6 +7,7 @@ import pathlib
 import json
 import multiprocessing as mp
 
+from caen_tools.connection.server import server_options
 from caen_tools.SystemCheck.server import run_server
 from caen_tools.SystemCheck.worker import run_worker
 from caen_tools.utils.utils import config_processor, get_logging_config
@@ -59,11 +60,21 @@ def main():
             settings.get(CONFIG_SECTION, "interlock_db_uri"),
             max_currents,
             ramp_down_trip_time,
+            settings.get(CONFIG_SECTION, "interlock_notify_channel", fallback=None),
+            settings.getfloat(CONFIG_SECTION, "interlock_safety_poll", fallback=10),
+            settings.get(CONFIG_SECTION, "device_pub", fallback=None),
+            settings.getfloat(CONFIG_SECTION, "device_pub_max_age", fallback=3),
+            settings.get(CONFIG_SECTION, "device_shm", fallback=None),
         ),
     )
     serv = mp.Process(
         target=run_server,
-        args=(shared_parameters, address, CONFIG_SECTION),
+        args=(
+            shared_parameters,
+            address,
+            CONFIG_SECTION,
+            server_options(settings, CONFIG_SECTION),
+        ),
         daemon=True,
     )
 
@@ -2,18 +2,24 @@
 of current parameters on CAEN device
 """
 
-import time
 from typing import TypeAlias
 
+import asyncio
 import logging
+import time
 import timeit
 
 from caen_tools.connection.client import AsyncClient
+from caen_tools.connection.pubsub import ParamsSubscriber
+from caen_tools.connection.sharedmem import SharedParams
+from caen_tools.utils.chstatus import Status
+from caen_tools.utils.paramsframe import ParamsFrame
 from caen_tools.utils.receipt import ReceiptResponseError
 
 from .metascript import Script
 from .mchswork import MChSWorker
 from .structures import HealthParametersDict, CheckResult, Codes
+from .telemetry import Steps
 from .receipts import Services, PreparedReceipts
 from ..utils import RampDownInfo
 
@@ -21,7 +27,16 @@ Address: TypeAlias = str
 
 
 class HealthControl(Script):
-    """Class to performs checks of the devback parameters"""
+    """Class to performs checks of the devback parameters
+
+    Notes
+    -----
+    In the adaptive mode (`adaptive` shared parameter) the execution period
+    falls to `min_repeat_every` when any channel current reaches
+    `current_ratio_threshold` of its limit or ramping down channel spends
+    `trip_progress_threshold` of its trip time.
+    Otherwise the period is doubled every execution up to `max_repeat_every`.
+    """
 
     SENDER = "syscheck/healthcontrol"
     MCHS_KEY = "healthok"
@@ -35,6 +50,7 @@ class HealthControl(Script):
         max_currents: dict[str, dict[str, float]],
         ramp_down_trip_time: dict[str, RampDownInfo],
         stop_on_failure: list[Script] | None = None,
+        bus: ParamsSubscriber | SharedParams | None = None,
     ):
         super().__init__(shared_parameters=shared_parameters)
         self.cli = AsyncClient(
@@ -44,24 +60,40 @@ class HealthControl(Script):
             }
         )
         self.mchs = mchs
+        self.bus = bus
         self.dependent_scripts = stop_on_failure if stop_on_failure is not None else []
         self.__max_currents: dict[str, dict[str, float]] = max_currents
         self.__rdown_info: dict[str, RampDownInfo] = ramp_down_trip_time
+        self.__current_ratio: float = 0
+        self.__adaptive_interval: float | None = None
+
+    @property
+    def interval(self) -> float:
+        if self.__adaptive_interval is None:
+            return super().interval
+        return self.__adaptive_interval
 
     async def on_stop(self):
         self.mchs.pop_keystate(self.MCHS_KEY)
 
+    @staticmethod
+    def now() -> float:
+        """Monotonic time of the event loop (in seconds)"""
+        return asyncio.get_running_loop().time()
+
     def form_answer(self, code: Codes) -> None:
+        if code is not Codes.OK:
+            self.telemetry.mark_failed()
         self.shared_parameters["last_check"] = CheckResult(code)
         return
 
     @staticmethod
-    def __check_ch_status(pars: dict) -> tuple[bool, bool]:
+    def __check_ch_status(frame: ParamsFrame) -> tuple[bool, bool]:
         """Check channels statuses.
 
         Parameters
         ----------
-        pars : dict
+        frame : ParamsFrame
             channel parameters
 
         Returns
@@ -70,30 +102,26 @@ class HealthControl(Script):
             (is_status_ok, is_only_overvoltage)
         """
 
-        def good_status(ch_status: str) -> tuple[bool, bool]:
-            st = format(int(ch_status), "015b")[::-1][3:13]
-            is_good = int(st) == 0
-            is_only_overvoltage = (
-                (st[1] == "1" or st[2] == "1") and st[0] == "0" and int(st[3:]) == 0
-            )
-            return is_good, is_only_overvoltage
-
         status = False
+        is_only_overvoltage = False
         bad_channels = []
         only_overvolt_channels = []
         try:
-            ch_status_good = {
-                ch: good_status(val["ChStatus"]) for ch, val in pars.items()
-            }
-            bad_channels = [ch for ch, stat in ch_status_good.items() if not stat[0]]
+            statuses = [int(st) for st in frame["ChStatus"]]
+            bad_channels = [
+                ch for ch, st in zip(frame.aliases, statuses) if st & Status.ERRORS
+            ]
             only_overvolt_channels = [
-                ch for ch, stat in ch_status_good.items() if stat[1]
+                ch
+                for ch, st in zip(frame.aliases, statuses)
+                if st & Status.OVERVOLTAGE
+                and not st & (Status.ERRORS & ~Status.OVERVOLTAGE)
             ]
             status = len(bad_channels) == 0
             is_only_overvoltage = (
                 len(bad_channels) != 0 and only_overvolt_channels == bad_channels
             )
-            logging.debug("Channel statuses (is_good, is_only_overvoltage): %s", ch_status_good)
+            logging.debug("Channel statuses %s", dict(zip(frame.aliases, statuses)))
         except Exception as e:
             logging.warning("Can't check channels status. %s", e)
 
@@ -103,13 +131,9 @@ class HealthControl(Script):
             )
         return status, is_only_overvoltage
 
-    def __trip_time_check(self, pars: dict) -> bool:
+    def __trip_time_check(self, frame: ParamsFrame) -> bool:
         """Returns true if trip time is not exceeded."""
 
-        def check_status(ch_status: str) -> bool:
-            st = format(int(ch_status), "015b")[::-1][2]
-            return st == "1"
-
         status = False
         ch_trip_status: dict = {}
 
@@ -117,17 +141,17 @@ class HealthControl(Script):
             """If is_rdown time exceeds trip_time returns False, otherwise returns True."""
             if info.timestamp is None:
                 return True
-            return time.time() - info.timestamp < info.trip_time
+            return self.now() - info.timestamp < info.trip_time
 
         try:
-            for ch, val in pars.items():
-                new_status = check_status(val["ChStatus"])
+            for ch, ch_status in zip(frame.aliases, frame["ChStatus"]):
+                new_status = bool(int(ch_status) & Status.RAMP_DOWN)
                 prev_status = self.__rdown_info[ch].is_rdown
                 ch_status = True
 
                 if new_status and not prev_status:
                     self.__rdown_info[ch].is_rdown = True
-                    self.__rdown_info[ch].timestamp = time.time()
+                    self.__rdown_info[ch].timestamp = self.now()
 
                 if not new_status and prev_status:
                     self.__rdown_info[ch].is_rdown = False
@@ -147,26 +171,33 @@ class HealthControl(Script):
 
         return status
 
-    def __check_currents(self, pars: dict) -> bool:
-        def max_current_key(ch_status: str) -> str:
-            st = format(int(ch_status), "015b")[::-1][:13]
-            key = "volt_change" if int(st[1]) == 1 or int(st[2]) == 1 else "steady"
-            return key
-
-        imon_key = lambda value: "IMonH" if value["ImonRange"] == 0 else "IMonL"
-
+    def __check_currents(self, frame: ParamsFrame) -> bool:
         status = False
         currents_status = {}
+        max_ratio = 0
         try:
-            currents_status = {
-                ch: val[imon_key(val)]
-                < self.__max_currents[ch][max_current_key(val["ChStatus"])]
-                for ch, val in pars.items()
-            }
+            for ch, ch_status, imon_range, imon_h, imon_l in zip(
+                frame.aliases,
+                frame["ChStatus"],
+                frame["ImonRange"],
+                frame["IMonH"],
+                frame["IMonL"],
+            ):
+                current = imon_h if imon_range == 0 else imon_l
+                key = "volt_change" if int(ch_status) & Status.RAMP else "steady"
+                limit = self.__max_currents[ch][key]
+                currents_status[ch] = current < limit
+                if limit > 0:
+                    max_ratio = max(max_ratio, current / limit)
             status = all(currents_status.values())
         except KeyError as e:
             logging.warning("Can't find channel max current in config: %s", e)
             status = False
+        except Exception as e:
+            # e.g. a missing current (None) of the incomplete row
+            logging.warning("Can't check channels currents. %s", e)
+            status = False
+        self.__current_ratio = max_ratio
 
         if not status:
             logging.warning(
@@ -174,20 +205,60 @@ class HealthControl(Script):
             )
         return status
 
-    def perform_checks(self, params_dict: dict) -> bool:
+    def __trip_progress(self) -> float | None:
+        """Returns maximal fraction of the trip time spent by ramping down channels
+        (None if there are no ramping down channels)"""
+
+        now = self.now()
+        progress = [
+            (now - info.timestamp) / info.trip_time if info.trip_time > 0 else 1
+            for info in self.__rdown_info.values()
+            if info.is_rdown and info.timestamp is not None
+        ]
+        return max(progress, default=None)
+
+    def adapt_interval(self) -> None:
+        """Updates execution period according to the margins of the last check"""
+
+        pars = self.shared_parameters.copy()
+        if not pars.get("adaptive", False):
+            self.__adaptive_interval = None
+            return
+
+        trip_progress = self.__trip_progress()
+        alarm = self.__current_ratio >= pars["current_ratio_threshold"] or (
+            trip_progress is not None
+            and trip_progress >= pars["trip_progress_threshold"]
+        )
+        interval = (
+            pars["min_repeat_every"]
+            if alarm
+            else min(pars["max_repeat_every"], 2 * self.interval)
+        )
+        if interval != self.__adaptive_interval:
+            logging.info(
+                "HealthControl period is %.3f s (current ratio %.3f, trip progress %s)",
+                interval,
+                self.__current_ratio,
+                trip_progress,
+            )
+        self.__adaptive_interval = interval
+        return
+
+    def perform_checks(self, frame: ParamsFrame) -> bool:
         """All checks of the recieved parameters are here"""
 
-        logging.debug("Perform parameters check: %s", params_dict)
+        logging.debug("Perform parameters check: %s", frame)
 
-        is_trip_time_ok = self.__trip_time_check(params_dict)
-        is_status_ok, is_only_overvoltage = self.__check_ch_status(params_dict)
-        is_current_ok = self.__check_currents(params_dict)
+        is_trip_time_ok = self.__trip_time_check(frame)
+        is_status_ok, is_only_overvoltage = self.__check_ch_status(frame)
+        is_current_ok = self.__check_currents(frame)
         if is_only_overvoltage and is_trip_time_ok:
             is_status_ok = True
         good_status = is_status_ok and is_current_ok
 
         if not good_status:
-            logging.warning("Bad parameters found: %s", params_dict)
+            logging.warning("Bad parameters found: %s", frame.to_dict())
         return good_status
 
     def send_mchs(self, status: bool) -> None:
@@ -208,18 +279,24 @@ class HealthControl(Script):
         self.send_mchs(False)
 
         logging.debug("Send Down Voltage Receipt")
-        down_voltage = await self.cli.query(PreparedReceipts.down(self.SENDER))
+        down_voltage = await self.timed(
+            Steps.DEVBACK, self.cli.query(PreparedReceipts.down(self.SENDER))
+        )
         if isinstance(down_voltage.response, ReceiptResponseError):
             logging.error(
                 "Not sent DownVoltage Receipt (%s)! Try again...", down_voltage.response
             )
-            down_voltage = await self.cli.query(PreparedReceipts.down(self.SENDER))
+            down_voltage = await self.timed(
+                Steps.DEVBACK, self.cli.query(PreparedReceipts.down(self.SENDER))
+            )
             logging.info("Final response (%s)", down_voltage.response)
         return
 
     async def exec_function(self):
         """Logic:
         1. Get parameters from CAEN device
+          (from the shared memory or the bus if they are younger
+          than the current execution period)
         2. Perform some checks
           If Checks OK -> send ACK on mchs
           If Checks FAILED ->
@@ -230,18 +307,31 @@ class HealthControl(Script):
         logging.debug("Start HealthControl script")
         starttime = timeit.default_timer()
 
-        devback_params = await self.cli.query(
-            PreparedReceipts.get_params(
-                self.SENDER, ["IMonH", "IMonL", "ImonRange", "ChStatus"]
+        parameters = ["IMonH", "IMonL", "ImonRange", "ChStatus"]
+        published = self.bus.params(parameters) if self.bus is not None else None
+        if published is not None and time.time() - published[0] >= self.interval:
+            # the decision is not based on the data older than the check period
+            logging.debug(
+                "Published parameters are %.3f s old", time.time() - published[0]
             )
-        )
-        if isinstance(devback_params.response, ReceiptResponseError):
-            logging.warning("Error from DeviceBackend %s", devback_params.response)
-            self.form_answer(Codes.DEVBACK_ERROR)
-            return
-
-        params_dict = devback_params.response.body["params"]
-        params_ok: bool = self.perform_checks(params_dict)
+            published = None
+        if published is not None:
+            params = published[1]
+        else:
+            devback_params = await self.timed(
+                Steps.DEVBACK,
+                self.cli.query(
+                    PreparedReceipts.get_params(self.SENDER, parameters, frame=True)
+                ),
+            )
+            if isinstance(devback_params.response, ReceiptResponseError):
+                logging.warning("Error from DeviceBackend %s", devback_params.response)
+                self.form_answer(Codes.DEVBACK_ERROR)
+                return
+            params = devback_params.response.body["params"]
+
+        params_ok: bool = self.perform_checks(ParamsFrame.from_any(params))
+        self.adapt_interval()
 
         if not params_ok:
             await self.failure_actions()
@@ -7,6 +7,7 @@ import logging
 from caen_tools.SystemCheck.utils.interlockdb import InterlockManager
 from .metascript import Script
 from .structures import InterlockParametersDict
+from .telemetry import Steps
 from .mchswork import MChSWorker
 
 
@@ -25,13 +26,14 @@ class InterlockControl(Script):
         super().__init__(shared_parameters=shared_parameters)
         self.mchs = mchs
         self.db = interlockdb
+        self.db.subscribe(self.wake)
 
     async def exec_function(self):
         logging.debug("Start HealthControl script")
         starttime = timeit.default_timer()
 
         # 1. Get state
-        interlock = await self.db.get_interlock()
+        interlock = await self.timed(Steps.INTERLOCK, self.db.get_interlock())
 
         # 2. Send state
         self.mchs.set_state(nointerlock=not interlock.current_state)
@@ -6,26 +6,36 @@ import timeit
 import logging
 
 from caen_tools.connection.client import AsyncClient
+from caen_tools.connection.pubsub import ParamsSubscriber
+from caen_tools.connection.sharedmem import SharedParams
+from caen_tools.utils.paramsframe import ParamsFrame
 from caen_tools.utils.receipt import ReceiptResponseError
 from .structures import LoaderDict, Codes, CheckResult
 from .metascript import Script
 from .receipts import Services, PreparedReceipts
+from .telemetry import Steps
 
 Address: TypeAlias = str
 
 
 class LoaderControl(Script):
     """Logic:
-    1. asks devback for parameters (self.__parameters)
+    1. takes parameters (self.__parameters) from the shared memory or the bus
+       or asks devback for them (if there are no fresh ones there)
     2. sends parameters to monitor service
     """
 
     SENDER = "syscheck/loader"
 
     def __init__(
-        self, shared_parameters: LoaderDict, device_backend: Address, monitor: Address
+        self,
+        shared_parameters: LoaderDict,
+        device_backend: Address,
+        monitor: Address,
+        bus: ParamsSubscriber | SharedParams | None = None,
     ):
         super().__init__(shared_parameters=shared_parameters)
+        self.__bus = bus
         self.__cli = AsyncClient(
             {
                 Services.DEVBACK: device_backend,
@@ -35,6 +45,8 @@ class LoaderControl(Script):
         self.__parameters = ["VMon", "IMonH", "IMonL", "ChStatus", "ImonRange"]
 
     def form_answer(self, code: Codes):
+        if code is not Codes.OK:
+            self.telemetry.mark_failed()
         self.shared_parameters["last_check"] = CheckResult(code)
 
     def get_time(self, starttime):
@@ -44,21 +56,36 @@ class LoaderControl(Script):
     async def exec_function(self):
 
         starttime = timeit.default_timer()
-        # 1. Get parameters from DEVBACK
-        devpars = await self.__cli.query(
-            PreparedReceipts.get_params(self.SENDER, self.__parameters)
+        # 1. Get parameters from the bus or DEVBACK
+        published = (
+            self.__bus.params(self.__parameters) if self.__bus is not None else None
         )
-        if isinstance(devpars.response, ReceiptResponseError):
-            logging.error("No connection with DevBackend during LoaderControl")
-            self.form_answer(Codes.DEVBACK_ERROR)
-            return
+        if published is not None:
+            measured = published[0]
+            params = ParamsFrame.from_dict(published[1]).to_wire()
+        else:
+            devpars = await self.timed(
+                Steps.DEVBACK,
+                self.__cli.query(
+                    PreparedReceipts.get_params(
+                        self.SENDER, self.__parameters, frame=True
+                    )
+                ),
+            )
+            if isinstance(devpars.response, ReceiptResponseError):
+                logging.error("No connection with DevBackend during LoaderControl")
+                self.form_answer(Codes.DEVBACK_ERROR)
+                return
+            params = devpars.response.body["params"]
+            measured = devpars.response.body.get("measurement_time")
         logging.debug(
             "LoaderControl: got devback params in %.3f", self.get_time(starttime)
         )
 
         # 2. Put parameters into MON
-        moncheck = await self.__cli.query(
-            PreparedReceipts.put2mon(self.SENDER, devpars.response.body["params"])
+        moncheck = await self.timed(
+            Steps.MONITOR,
+            self.__cli.query(PreparedReceipts.put2mon(self.SENDER, params, measured)),
         )
         if isinstance(moncheck.response, ReceiptResponseError):
             logging.error("No connection with Monitor during LoaderControl")
@@ -1,26 +1,88 @@
+from queue import Queue, Empty
+
 import asyncio
 import logging
+import time
 
 from caen_tools.SystemCheck.scripts.metascript import Script
+from caen_tools.SystemCheck.scripts.structures import ScriptEvent
+
+
+class ManagerScript:
+    """Main script to manage (turn on / off) all other scripts
 
+    Parameters
+    ----------
+    manage_scripts : dict[str, Script]
+        managed scripts by their names (keys of the shared parameters)
+    events : Queue | None, default None
+        queue of the ScriptEvent delivered by the API server
+    resync_every : float, default 10
+        period of the full synchronization of the scripts states
+        with shared parameters (in seconds)
+    """
 
-class ManagerScript(Script):
-    """Main script to manage (turn on / off) all other scripts every `repeat_every` seconds"""
+    POLL_TIMEOUT = 1  # in seconds
 
-    def __init__(self, manage_scripts: list[Script], repeat_every: int = 1):
-        super().__init__({"enable": True, "repeat_every": repeat_every})
+    def __init__(
+        self,
+        manage_scripts: dict[str, Script],
+        events: Queue | None = None,
+        resync_every: float = 10,
+    ):
         self.manage_scripts = manage_scripts
+        self.events = events
+        self.resync_every = resync_every
         logging.info("ManagerScript script was init")
 
     def start(self):
         loop = asyncio.get_event_loop()
-        loop.create_task(self.loop())
+        loop.create_task(self.run())
         return loop
 
-    async def exec_function(self):
-        """Polls all manage_scripts and for updating their status"""
+    def sync(self) -> None:
+        """Updates statuses of all manage_scripts"""
 
-        for script in self.manage_scripts:
+        for script in self.manage_scripts.values():
             script.trigger()
+        return
+
+    def dispatch(self, event: ScriptEvent) -> None:
+        """Delivers an event to the script"""
+
+        logging.debug("Dispatch %s", event)
+        script = self.manage_scripts.get(event.script)
+        if script is None:
+            logging.warning("Event for unknown script %s", event)
+            return
 
+        script.trigger()
+        if event.wake and script.isrunning:
+            script.wake()
         return
+
+    def __get_event(self) -> ScriptEvent | None:
+        """Blocking waiting of the next event"""
+
+        try:
+            return ScriptEvent(*self.events.get(timeout=self.POLL_TIMEOUT))
+        except Empty:
+            return None
+
+    async def run(self):
+        """Starts scripts and delivers events to them"""
+
+        self.sync()
+        last_sync = time.monotonic()
+
+        while True:
+            if self.events is not None:
+                event = await asyncio.to_thread(self.__get_event)
+                if event is not None:
+                    self.dispatch(event)
+            else:
+                await asyncio.sleep(self.resync_every)
+
+            if time.monotonic() - last_sync > self.resync_every:
+                self.sync()
+                last_sync = time.monotonic()
@@ -1,57 +1,83 @@
+from typing import Callable
+
 import logging
 import socket
+import time
 
 
 class MChSWorker:
-    """A class for working with MChS"""
+    """A class for working with MChS
+
+    Parameters
+    ----------
+    udp_ip : str
+        MChS controller host address
+    udp_port : str
+        Port listened by MChS controller
+    client_id : str
+        Id of Caen_HV registered in MChS controller
+    heartbeat : float, default 1
+        minimal period of sending of the unchanged ACK (in seconds)
+
+    Notes
+    -----
+    * the datagram is sent immediately if the total acknowledge is changed
+    * NACK is always sent immediately
+    * unchanged ACK is sent not more often than once per `heartbeat` seconds
+    * `on_nack` callback (if it is set) is called after the sent NACK
+      when the total acknowledge changes to NACK
+    """
+
+    def __init__(
+        self, udp_ip: str, udp_port: str, client_id: str, heartbeat: float = 1
+    ):
+        self.udp_ip = udp_ip
+        self.udp_port = int(udp_port)
+        self.client_id = client_id
+        self.heartbeat = float(heartbeat)
+        self.__state = dict()
+        self.__sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.__last_ack: bool | None = None
+        self.__last_sent: float = 0
+        self.counters = dict(sent=0, suppressed=0, failed=0)
+        self.on_nack: Callable[[], None] | None = None
+        logging.debug("Opened MChS socket")
 
-    @staticmethod
-    def send(udp_ip: str, udp_port: str, client_id: str, ack: bool):
+    def send(self, ack: bool):
         """Sends UDP datagram to the MChS Controller.
         For details read this: https://cmd.inp.nsk.su/wiki/pub/CMD3/Diplom2018/Зубакин_АС.pdf
 
         Parameters
         ----------
-        udp_ip : str
-            MChS controller host address
-        udp_port : str
-            Port listened by MChS controller
-        client_id : str
-            Id of Caen_HV registered in MChS controller
         ack : bool
             True == everything is ok, False == lock Triggers
         """
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        logging.debug(
-            "Opened send_UDP_to_MChS_Controller socket. Start sending UDP package to MChS Controller."
-        )
-
         try:
-            udp_port = int(udp_port)  # type: ignore
-            sock.sendto(
-                str.encode(f"{'ACK' if ack else 'NACK'} {client_id}"),
-                (udp_ip, udp_port),
+            self.__sock.sendto(
+                str.encode(f"{'ACK' if ack else 'NACK'} {self.client_id}"),
+                (self.udp_ip, self.udp_port),
             )
+            self.counters["sent"] += 1
             logging.debug(
                 "Sent UDP package to MChS Controller with status code %s",
                 ("ACK" if ack else "NACK"),
             )
         except Exception as e:
+            self.counters["failed"] += 1
             logging.error(
                 "MChS_Controler sending problems: %s, %s", type(e).__name__, e
             )
 
-        sock.close()
-        logging.debug("Closed send_UDP_to_MChS_Controller socket.")
-
         return
 
-    def __init__(self, udp_ip: str, udp_port: str, client_id: str):
-        self.udp_ip = udp_ip
-        self.udp_port = udp_port
-        self.client_id = client_id
-        self.__state = dict()
+    def close(self):
+        """Closes the socket"""
+        self.__sock.close()
+        logging.debug("Closed MChS socket")
+
+    def __del__(self):
+        self.close()
 
     @property
     def isack(self) -> bool:
@@ -69,8 +95,28 @@ class MChSWorker:
         return self.__state.pop(key, None)
 
     def send_state(self):
-        """Sends an acknowledge status to the server"""
-        logging.info("Send %s to MChS", "ACK" if self.isack else "NACK")
+        """Sends an acknowledge status to the server
+        (if it was changed, is NACK or heartbeat time has come)"""
+
+        isack = self.isack
+        now = time.monotonic()
+        if (
+            isack
+            and isack == self.__last_ack
+            and now - self.__last_sent < self.heartbeat
+        ):
+            self.counters["suppressed"] += 1
+            return
+
+        changed = isack != self.__last_ack
+        if changed:
+            logging.info("Send %s to MChS", "ACK" if isack else "NACK")
         logging.debug("MChS dict state %s", self.__state)
-        MChSWorker.send(self.udp_ip, self.udp_port, self.client_id, self.isack)
+        self.send(isack)
+        self.__last_ack, self.__last_sent = isack, now
+        if changed and not isack and self.on_nack is not None:
+            try:
+                self.on_nack()
+            except Exception as e:
+                logging.error("NACK callback failed: %s", e)
         return
@@ -1,23 +1,49 @@
 from abc import ABC, abstractmethod
+from typing import Awaitable, TypeVar
 
 import asyncio
-import timeit
 import logging
 
-from .structures import MinimalScriptDict
+from .structures import MinimalScriptDict, ScheduleStats
+from .telemetry import ScriptTelemetry
+
+T = TypeVar("T")
 
 
 class Script(ABC):
+    """Abstract script running `exec_function`
+    every `repeat_every` seconds in one long-lived task
+
+    Notes
+    -----
+    * executions follow fixed-rate timetable (without drift)
+    * overrunning execution is followed by the next one immediately
+      and the timetable starts from this moment
+    * script can be woken up (see `wake`) to be executed immediately
+    """
 
     def __init__(self, shared_parameters: MinimalScriptDict):
         self.task = None
         self.shared_parameters = shared_parameters
+        self.schedule = ScheduleStats()
+        self.telemetry = ScriptTelemetry()
+        self._wakeup = asyncio.Event()
 
     @property
     def isrunning(self) -> bool:
         """Running script or not"""
         return self.task is not None
 
+    @property
+    def interval(self) -> float:
+        """Period of the script execution (in seconds)"""
+        return self.shared_parameters["repeat_every"]
+
+    @property
+    def first_delay(self) -> float:
+        """Delay of the first execution after the start (in seconds)"""
+        return 0
+
     def start_ifnot(self) -> None:
         """Starts a script loop if it not running yet"""
 
@@ -33,13 +59,15 @@ class Script(ABC):
         return
 
     def stop(self) -> None:
-        """Stops a script loop"""
+        """Stops a script loop
+        (the current execution is not interrupted)"""
         if not self.isrunning:
             logging.debug("Script is already stopped. No need stop")
             return
 
         self.shared_parameters["enable"] = False
         self.task = None
+        self.wake()
         asyncio.create_task(self.on_stop())
         logging.warning("Stop the script")
         return
@@ -59,6 +87,40 @@ class Script(ABC):
         self.start_ifnot()
         return
 
+    def wake(self, *args) -> None:
+        """Interrupts waiting for the next execution
+        (script will be executed immediately)"""
+        self._wakeup.set()
+        return
+
+    async def sleep(self, delay: float) -> bool:
+        """Waits `delay` seconds or until the script is woken up
+
+        Returns
+        -------
+        bool
+            True if the script was woken up
+        """
+        woken = False
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+            logging.debug("Script was woken up")
+            woken = True
+        except TimeoutError:
+            pass
+        self._wakeup.clear()
+        return woken
+
+    async def timed(self, step: str, aw: Awaitable[T]) -> T:
+        """Awaits `aw` measuring its duration as a sub-step `step`"""
+        with self.telemetry.step(step):
+            return await aw
+
+    def publish_telemetry(self) -> None:
+        """Puts execution statistics into shared parameters"""
+        self.shared_parameters["telemetry"] = self.telemetry.snapshot(self.schedule)
+        return
+
     async def on_start(self) -> None:
         """Coroutine calling during start of the script"""
         return
@@ -67,29 +129,43 @@ class Script(ABC):
         """Coroutine calling on stop of the script"""
         return
 
-    async def loop(self) -> bool:
-        """Core coroutine that executes a function and sets a new task in time"""
+    async def loop(self) -> None:
+        """Core coroutine that executes a function on the timetable
+        while the script is running"""
+
+        task = asyncio.current_task()
+        evloop = asyncio.get_running_loop()
+        self._wakeup.clear()
+        next_run = evloop.time() + self.first_delay
+        woken = await self.sleep(max(0, next_run - evloop.time()))
+
         try:
-            starttime = timeit.default_timer()
-            await self.exec_function()
-            exectime = timeit.default_timer() - starttime
-            repeat_every = self.shared_parameters["repeat_every"]
-            await asyncio.sleep(max(0, repeat_every - exectime))
-            logging.debug("scenario exec function is completed")
+            while self.task is task:
+                starttime = evloop.time()
+                if not woken:
+                    self.schedule.add_jitter(starttime - next_run)
+                else:
+                    next_run = starttime
+
+                try:
+                    with self.telemetry.execution():
+                        await self.exec_function()
+                    logging.debug("scenario exec function is completed")
+                except Exception:
+                    logging.error("Task was failed", exc_info=True)
+
+                next_run += self.interval
+                finishtime = evloop.time()
+                if finishtime > next_run:
+                    self.schedule.overruns += 1
+                    logging.warning("Script overrun on %.3f s", finishtime - next_run)
+                    next_run = finishtime
+                self.publish_telemetry()
+
+                woken = await self.sleep(max(0, next_run - evloop.time()))
         except asyncio.CancelledError:
             logging.info("Task was cancelled")
-            return False
-        except Exception as ex:
-            logging.error("Task was failed", exc_info=True)
-            self.task = None
-            # self.shared_parameters["enable"] = False
-            raise ex
-
-        if self.shared_parameters["enable"] is True:
-            self.task = asyncio.create_task(self.loop())
-        else:
-            self.task = None
-        return True
+        return
 
     @abstractmethod
     async def exec_function(self):
@@ -36,15 +36,21 @@ class PreparedReceipts:
         )
 
     @staticmethod
-    def get_params(sender: str, parameters: list | None = None) -> Receipt:
-        """Gets parameters from device backend"""
+    def get_params(
+        sender: str, parameters: list | None = None, frame: bool = False
+    ) -> Receipt:
+        """Gets parameters from device backend
+        (in the ParamsFrame wire format if `frame`)"""
 
         logging.debug("Ask for receipt devback/params")
+        params = {"select_params": parameters}
+        if frame:
+            params["frame"] = True
         return Receipt(
             sender=sender,
             executor=Services.DEVBACK,
             title="params",
-            params={"select_params": parameters},
+            params=params,
         )
 
     @staticmethod
@@ -59,12 +65,30 @@ class PreparedReceipts:
         )
 
     @staticmethod
-    def put2mon(sender: str, params: dict) -> Receipt:
-        """Puts parameters into monitor"""
+    def flight_trigger(sender: str, reason: str) -> Receipt:
+        """Triggers the flight recorder of device backend"""
+        logging.debug("Ask for receipt devback/flight_trigger")
+        return Receipt(
+            sender=sender,
+            executor=Services.DEVBACK,
+            title="flight_trigger",
+            params={"reason": reason},
+        )
+
+    @staticmethod
+    def put2mon(
+        sender: str, params: dict, measurement_time: float | None = None
+    ) -> Receipt:
+        """Puts parameters into monitor
+        (nested dictionary or ParamsFrame wire format
+        measured at `measurement_time`, the receipt time by default)"""
         logging.debug("Ask for receipt mon/send_params")
+        monparams = {"params": params}
+        if measurement_time is not None:
+            monparams["measurement_time"] = measurement_time
         return Receipt(
             sender=sender,
             executor=Services.MONITOR,
             title="send_params",
-            params={"params": params},
+            params=monparams,
         )
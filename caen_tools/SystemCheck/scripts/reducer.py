@@ -15,6 +15,7 @@ from .metascript import Script
 from .structures import ReducerParametersDict, Codes, CheckResult
 from .receipts import Services, PreparedReceipts
 from .mchswork import MChSWorker
+from .telemetry import Steps
 from .relax import RelaxControl
 
 Address: TypeAlias = str
@@ -41,7 +42,7 @@ class ReducerControl(Script):
         self.relax = relax
 
     async def interlock_status(self) -> bool:
-        state = await self.interlockdb.get_interlock()
+        state = await self.timed(Steps.INTERLOCK, self.interlockdb.get_interlock())
         return state.current_state
 
     @property
@@ -52,14 +53,26 @@ class ReducerControl(Script):
     def reduced_voltage(self) -> float:
         return self.target_voltage * self.shared_parameters["voltage_modifier"]
 
+    @property
+    def first_delay(self) -> float:
+        """Start logic in the end of the cycle time interval"""
+        return max(
+            0,
+            self.shared_parameters["repeat_every"]
+            - self.shared_parameters["reducing_period"],
+        )
+
     def form_answer(self, code: Codes) -> None:
+        if code is not Codes.OK:
+            self.telemetry.mark_failed()
         self.shared_parameters["last_check"] = CheckResult(code)
         return
 
     async def set_voltage(self, target_level: float):
         """Sends a receipt to devicebackend to set voltage"""
-        receipt = await self.cli.query(
-            PreparedReceipts.set_voltage(self.SENDER, target_level)
+        receipt = await self.timed(
+            Steps.DEVBACK,
+            self.cli.query(PreparedReceipts.set_voltage(self.SENDER, target_level)),
         )
         if isinstance(receipt.response, ReceiptResponseError):
             logging.error("No connection with Device during RelaxControl.set_voltage")
@@ -93,16 +106,6 @@ class ReducerControl(Script):
             script done
         """
         logging.debug("Start ReducerControl script")
-
-        # Start logic in the end of the cycle time interval
-        waiting_time = max(
-            0,
-            self.shared_parameters["repeat_every"]
-            - self.shared_parameters["reducing_period"],
-        )
-        logging.debug("Wait for %s", waiting_time)
-        await asyncio.sleep(waiting_time)
-
         starttime = timeit.default_timer()
 
         if await self.interlock_status():
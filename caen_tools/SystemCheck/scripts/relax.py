@@ -17,6 +17,7 @@ from caen_tools.utils.receipt import ReceiptResponseError
 from .metascript import Script
 from .structures import InterlockState, RelaxParamsDict, Codes, CheckResult
 from .receipts import PreparedReceipts, Services
+from .telemetry import Steps
 
 Address: TypeAlias = str
 
@@ -37,6 +38,7 @@ class RelaxControl(Script):
         super().__init__(shared_parameters=shared_parameters)
         self.cli = AsyncClient({Services.DEVBACK: devback})
         self.__interlockdb = interlockdb
+        self.__interlockdb.subscribe(self.wake)
 
     @property
     def target_voltage(self) -> float:
@@ -55,13 +57,16 @@ class RelaxControl(Script):
         self.shared_parameters["voltage_modifier"] = value
 
     def form_answer(self, code: Codes) -> None:
+        if code is not Codes.OK:
+            self.telemetry.mark_failed()
         self.shared_parameters["last_check"] = CheckResult(code)
         return
 
     async def set_voltage(self, target_level: float):
         """Sends a receipt to devicebackend to set voltage"""
-        receipt = await self.cli.query(
-            PreparedReceipts.set_voltage(self.SENDER, target_level)
+        receipt = await self.timed(
+            Steps.DEVBACK,
+            self.cli.query(PreparedReceipts.set_voltage(self.SENDER, target_level)),
         )
         if isinstance(receipt.response, ReceiptResponseError):
             logging.error("No connection with Device during RelaxControl.set_voltage")
@@ -84,10 +89,14 @@ class RelaxControl(Script):
         target_voltage: float = self.target_voltage
         voltage_modifier: float = self.voltage_modifier
         reduced_voltage: float = target_voltage * voltage_modifier
-        current_interlock = await self.__interlockdb.get_interlock()
+        current_interlock = await self.timed(
+            Steps.INTERLOCK, self.__interlockdb.get_interlock()
+        )
         interlock: bool = current_interlock.current_state
 
-        receipt = await self.cli.query(PreparedReceipts.get_voltage(self.SENDER))
+        receipt = await self.timed(
+            Steps.DEVBACK, self.cli.query(PreparedReceipts.get_voltage(self.SENDER))
+        )
         if isinstance(receipt.response, ReceiptResponseError):
             logging.error("No connection with Device during LoaderControl")
             self.form_answer(Codes.DEVBACK_ERROR)
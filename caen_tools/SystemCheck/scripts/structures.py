@@ -1,5 +1,6 @@
 from dataclasses import dataclass
-from typing import TypedDict
+from queue import Queue
+from typing import NamedTuple, TypedDict
 from enum import Flag, auto
 
 from caen_tools.utils.utils import get_timestamp
@@ -31,6 +32,7 @@ class MCHSDict(TypedDict):
     udp_ip: str
     udp_port: str
     client_id: str
+    heartbeat: float
 
 
 @dataclass
@@ -45,12 +47,56 @@ class CheckResult:
             self.timestamp = get_timestamp()
 
 
+@dataclass
+class ScheduleStats:
+    """Timetable statistics of the script
+
+    Parameters
+    ----------
+    runs : int
+        number of the scheduled (not woken up) executions
+    overruns : int
+        number of executions exceeding `repeat_every`
+    last_jitter : float
+        delay of the last scheduled execution start (in seconds)
+    max_jitter : float
+        maximal delay of the scheduled execution start (in seconds)
+    """
+
+    runs: int = 0
+    overruns: int = 0
+    last_jitter: float = 0
+    max_jitter: float = 0
+
+    def add_jitter(self, jitter: float) -> None:
+        """Records start delay of the scheduled execution"""
+        self.runs += 1
+        self.last_jitter = jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+
+
+class ScriptEvent(NamedTuple):
+    """Event for the script delivered from the API server to the worker
+
+    Parameters
+    ----------
+    script : str
+        script name (the key in the shared parameters)
+    wake : bool
+        execute the script immediately (on parameters change)
+    """
+
+    script: str
+    wake: bool = False
+
+
 class MinimalScriptDict(TypedDict):
     """Minimal script config structure"""
 
     enable: bool
     repeat_every: float
     last_check: CheckResult | None
+    telemetry: dict
 
 
 class LoaderDict(MinimalScriptDict):
@@ -60,6 +106,12 @@ class LoaderDict(MinimalScriptDict):
 class HealthParametersDict(MinimalScriptDict):
     """Defines shared parameters dict structure for HealthParameters script"""
 
+    adaptive: bool
+    min_repeat_every: float
+    max_repeat_every: float
+    current_ratio_threshold: float
+    trip_progress_threshold: float
+
 
 class InterlockParametersDict(MinimalScriptDict):
     """Defines shared parameters dict structure for Interlock polling script"""
@@ -87,3 +139,6 @@ class SharedParametersDict(TypedDict):
     relax: RelaxParamsDict
     reducer: ReducerParametersDict
     mchs: MCHSDict
+    mchs_counters: dict[str, int]
+    worker_metrics: dict | None
+    events: Queue
@@ -0,0 +1,102 @@
+"""Execution telemetry of the scripts"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import time
+import timeit
+
+from .structures import ScheduleStats
+
+
+class Steps:
+    """Names of the timed sub-steps of the scripts"""
+
+    DEVBACK = "devback"
+    MONITOR = "monitor"
+    INTERLOCK = "interlock"
+
+
+class ScriptTelemetry:
+    """Collects execution statistics of the script
+
+    Parameters
+    ----------
+    buckets : tuple[float, ...]
+        upper bounds of the execution time histogram buckets (in seconds),
+        the last extra bucket keeps longer executions
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.histogram = [0] * (len(buckets) + 1)
+        self.runs = 0
+        self.errors = 0
+        self.last_duration: float | None = None
+        self.max_duration: float = 0
+        self.last_success: float | None = None
+        self.steps: dict[str, dict[str, float]] = dict()
+        self.__failed = False
+
+    def mark_failed(self) -> None:
+        """Marks the current execution as failed"""
+        self.__failed = True
+
+    @contextmanager
+    def step(self, name: str):
+        """Measures the duration of the sub-step of the execution"""
+
+        starttime = timeit.default_timer()
+        try:
+            yield
+        finally:
+            duration = timeit.default_timer() - starttime
+            stat = self.steps.setdefault(name, dict(count=0, total=0, last=0, max=0))
+            stat["count"] += 1
+            stat["total"] += duration
+            stat["last"] = duration
+            stat["max"] = max(stat["max"], duration)
+
+    @contextmanager
+    def execution(self):
+        """Measures the duration of the whole execution"""
+
+        self.__failed = False
+        starttime = timeit.default_timer()
+        try:
+            yield
+        except Exception:
+            self.__failed = True
+            raise
+        finally:
+            duration = timeit.default_timer() - starttime
+            self.runs += 1
+            self.histogram[bisect_left(self.buckets, duration)] += 1
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration, duration)
+            if self.__failed:
+                self.errors += 1
+            else:
+                self.last_success = time.time()
+
+    def snapshot(self, schedule: ScheduleStats | None = None) -> dict:
+        """Returns JSON-serializable statistics"""
+
+        snap = dict(
+            runs=self.runs,
+            errors=self.errors,
+            last_duration=self.last_duration,
+            max_duration=self.max_duration,
+            last_success=self.last_success,
+            histogram=dict(buckets=list(self.buckets), counts=list(self.histogram)),
+            steps={name: dict(stat) for name, stat in self.steps.items()},
+        )
+        if schedule is not None:
+            snap.update(
+                overruns=schedule.overruns,
+                last_jitter=schedule.last_jitter,
+                max_jitter=schedule.max_jitter,
+            )
+        return snap
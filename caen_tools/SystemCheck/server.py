@@ -35,7 +35,10 @@ async def process_message(srv: RouterServer, shared_parameters: dict) -> None:
 
 
 def run_server(
-    shared_parameters: dict, address: str, identity: str = "syscheck"
+    shared_parameters: dict,
+    address: str,
+    identity: str = "syscheck",
+    options: dict | None = None,
 ) -> None:
     """Runs a server
 
@@ -47,11 +50,13 @@ def run_server(
         binding address for the server instance
     identity: str, default "syscheck"
         server identity name
+    options: dict | None, default None
+        RouterServer queue options (see server_options)
     """
 
     logging.info("Start server")
 
-    srv = RouterServer(address, identity)
+    srv = RouterServer(address, identity, **(options or dict()))
     loop = asyncio.get_event_loop()
 
     try:
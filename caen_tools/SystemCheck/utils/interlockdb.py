@@ -1,20 +1,47 @@
+from typing import Callable
 from urllib.parse import urlparse
 
+import asyncio
 import logging
 
 import psycopg
+from psycopg import sql
 from caen_tools.SystemCheck.scripts.structures import InterlockState
 
+INTERLOCK_QUERY = "SELECT value, time from values where property = 'KMD_Interlock';"
+
 
 class InterlockManager:
-    """Class for interaction with SND interlock database"""
+    """Class for interaction with SND interlock database
+
+    Parameters
+    ----------
+    interlock_db_uri : str
+        database uri (postgres starts with `postgresql://`,
+        reading from text file starts with `fake://`)
+    notify_channel : str | None, default None
+        channel name for the LISTEN/NOTIFY subscription
+        (polling only mode if None or empty)
+    safety_poll : float, default 10
+        period of the interlock re-reading in the subscription mode
+        (in seconds), needed in case of lost notifications
+    """
 
-    def __init__(self, interlock_db_uri: str):
+    def __init__(
+        self,
+        interlock_db_uri: str,
+        notify_channel: str | None = None,
+        safety_poll: float = 10,
+    ):
         """For reading fake interlock value from user defined file
         use interlock_db_uri in format like: fake://./interlock.txt
         """
 
         self._fakepath = None
+        self._notify_channel = notify_channel if notify_channel else None
+        self._safety_poll = safety_poll
+        self._state: InterlockState | None = None
+        self._subscribers: list[Callable[[InterlockState], None]] = []
         if interlock_db_uri.startswith("fake://"):
             self._fakepath = interlock_db_uri.split("://")[-1]
             return
@@ -28,6 +55,87 @@ class InterlockManager:
             "port": parsed_uri.port,
         }
 
+    @property
+    def islistening(self) -> bool:
+        """Interlock state is kept up to date by the subscription"""
+        return self._state is not None
+
+    def subscribe(self, callback: Callable[[InterlockState], None]) -> None:
+        """Adds a callback called on every interlock state change
+        (works in the subscription mode only)"""
+        self._subscribers.append(callback)
+
+    def __update_state(self, state: InterlockState) -> None:
+        """Keeps a new state and notifies subscribers if it was changed"""
+
+        previous, self._state = self._state, state
+        if previous is not None and previous.current_state == state.current_state:
+            return
+
+        logging.info("Interlock state changed to %s", state.current_state)
+        for callback in self._subscribers:
+            try:
+                callback(state)
+            except Exception:
+                logging.warning("Interlock subscriber failed", exc_info=True)
+
+    @staticmethod
+    async def __read_state(aconn: psycopg.AsyncConnection) -> InterlockState:
+        """Reads interlock state using opened connection"""
+
+        async with aconn.cursor() as acur:
+            await acur.execute(INTERLOCK_QUERY)
+            res = await acur.fetchone()
+            return InterlockState(
+                current_state=int(res[0]) > 0, timestamp=int(res[1].timestamp())
+            )
+
+    async def listen(self, reconnect_delay: float = 5) -> None:
+        """Subscribes on the interlock changes (LISTEN/NOTIFY)
+        and keeps the current state (infinite coroutine)
+
+        Notes
+        -----
+        * SND database must send NOTIFY on `notify_channel` on every
+          KMD_Interlock change (e.g. by the trigger on the values table)
+        * the state is re-read every `safety_poll` seconds anyway
+        * get_interlock falls back on direct reading while
+          the subscription is not established
+        """
+
+        if self._fakepath or self._notify_channel is None:
+            logging.info("Interlock subscription is disabled. Polling mode only")
+            return
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    autocommit=True, **self._db_credentials
+                ) as aconn:
+                    await aconn.execute(
+                        sql.SQL("LISTEN {}").format(
+                            sql.Identifier(self._notify_channel)
+                        )
+                    )
+                    logging.info("Listen interlock on %s", self._notify_channel)
+                    self.__update_state(await self.__read_state(aconn))
+
+                    while True:
+                        # waits first notification or safety poll timeout
+                        async for notify in aconn.notifies(
+                            timeout=self._safety_poll, stop_after=1
+                        ):
+                            logging.debug("Interlock notification %s", notify)
+                        self.__update_state(await self.__read_state(aconn))
+            except asyncio.CancelledError:
+                self._state = None
+                raise
+            except Exception:
+                logging.warning("Interlock subscription problem", exc_info=True)
+
+            self._state = None
+            await asyncio.sleep(reconnect_delay)
+
     async def get_interlock(self) -> InterlockState:
         """Returns current interlock state"""
 
@@ -37,18 +145,14 @@ class InterlockManager:
             logging.debug("Fake interlock value is %s", interlock)
             return InterlockState(interlock)
 
+        if self._state is not None:
+            return self._state
+
         try:
             async with await psycopg.AsyncConnection.connect(
                 **self._db_credentials
             ) as aconn:
-                async with aconn.cursor() as acur:
-                    await acur.execute(
-                        "SELECT value, time from values where property = 'KMD_Interlock';"
-                    )
-                    res = await acur.fetchone()
-                    return InterlockState(
-                        current_state=int(res[0]) > 0, timestamp=int(res[1].timestamp())
-                    )
+                return await self.__read_state(aconn)
         except Exception:
             logging.warning("Interlock reading problem (from SND db)", exc_info=True)
 
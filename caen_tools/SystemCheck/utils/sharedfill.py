@@ -24,6 +24,7 @@ def sharedmemo_fillup(
         udp_ip=settings.get(mchs_section, "host"),
         udp_port=settings.get(mchs_section, "port"),
         client_id=settings.get(mchs_section, "client_id"),
+        heartbeat=settings.getfloat(mchs_section, "heartbeat", fallback=1),
     )
     logging.debug("MChS defaults: %s", mchs)
 
@@ -40,6 +41,19 @@ def sharedmemo_fillup(
         enable=settings.getboolean(health_section, "enable"),
         repeat_every=settings.getfloat(health_section, "repeat_every"),
         last_check=None,
+        adaptive=settings.getboolean(health_section, "adaptive", fallback=False),
+        min_repeat_every=settings.getfloat(
+            health_section, "min_repeat_every", fallback=0.2
+        ),
+        max_repeat_every=settings.getfloat(
+            health_section, "max_repeat_every", fallback=5
+        ),
+        current_ratio_threshold=settings.getfloat(
+            health_section, "current_ratio_threshold", fallback=0.7
+        ),
+        trip_progress_threshold=settings.getfloat(
+            health_section, "trip_progress_threshold", fallback=0
+        ),
     )
     logging.debug("Health defaults: %s", health)
 
@@ -79,6 +93,9 @@ def sharedmemo_fillup(
         relax=relax,
         reducer=reducer,
         mchs=mchs,
+        mchs_counters=dict(sent=0, suppressed=0, failed=0),
+        worker_metrics=None,
+        events=manager.Queue(),
     )
 
     return shared_parameters
@@ -3,6 +3,10 @@
 import asyncio
 import logging
 
+from caen_tools.connection.client import AsyncClient
+from caen_tools.connection.pubsub import ParamsSubscriber
+from caen_tools.connection.sharedmem import SharedParams
+from caen_tools.utils.metrics import REGISTRY
 from caen_tools.SystemCheck.scripts import (
     ManagerScript,
     MChSWorker,
@@ -12,6 +16,7 @@ from caen_tools.SystemCheck.scripts import (
     RelaxControl,
     ReducerControl,
 )
+from caen_tools.SystemCheck.scripts.receipts import PreparedReceipts, Services
 from .utils import InterlockManager
 
 
@@ -22,17 +27,59 @@ def run_worker(
     interlock_db_uri: str,
     max_currents: dict,
     ramp_down_trip_time: dict,
+    interlock_notify_channel: str | None = None,
+    interlock_safety_poll: float = 10,
+    device_pub: str | None = None,
+    device_pub_max_age: float = 3,
+    device_shm: str | None = None,
 ):
-    """Worker running different scenarios for system control"""
+    """Worker running different scenarios for system control
+    (device parameters are taken from the DeviceBackend shared memory segment
+    if `device_shm` is set or from its telemetry bus if `device_pub` is set)"""
 
     logging.info("Start worker %s, %s", devback_address, mon_address)
+    subscriber = (
+        ParamsSubscriber(device_pub, device_pub_max_age) if device_pub else None
+    )
+    bus = (
+        SharedParams(device_shm, device_pub_max_age, fallback=subscriber)
+        if device_shm
+        else subscriber
+    )
 
     # Specific utility classes
     mchs = MChSWorker(**shared_parameters["mchs"])
-    interlockdb = InterlockManager(interlock_db_uri)
+    devback = AsyncClient({Services.DEVBACK: devback_address})
+
+    def trigger_recorder() -> None:
+        """Saves the DeviceBackend flight recording around the NACK"""
+        asyncio.ensure_future(
+            devback.query(
+                PreparedReceipts.flight_trigger("syscheck/mchs", "nack"),
+                receive_time=1,
+            )
+        )
+
+    mchs.on_nack = trigger_recorder
+
+    async def publish_counters() -> None:
+        """Puts MChS sending counters and metrics of the worker process
+        (e.g. queries and timeouts of the scripts) into shared parameters
+        every heartbeat"""
+        while True:
+            shared_parameters["mchs_counters"] = dict(mchs.counters)
+            shared_parameters["worker_metrics"] = REGISTRY.snapshot()
+            logging.debug("MChS counters: %s", mchs.counters)
+            await asyncio.sleep(mchs.heartbeat)
+
+    interlockdb = InterlockManager(
+        interlock_db_uri, interlock_notify_channel, interlock_safety_poll
+    )
 
     # A number of running scripts
-    loader = LoaderControl(shared_parameters["loader"], devback_address, mon_address)
+    loader = LoaderControl(
+        shared_parameters["loader"], devback_address, mon_address, bus
+    )
     interlock = InterlockControl(shared_parameters["interlock"], interlockdb, mchs)
     relax = RelaxControl(shared_parameters["relax"], devback_address, interlockdb)
     reducer = ReducerControl(
@@ -46,12 +93,26 @@ def run_worker(
         max_currents,
         ramp_down_trip_time,
         [relax, reducer],
+        bus,
     )
 
-    manager = ManagerScript([loader, interlock, relax, reducer, health])
+    manager = ManagerScript(
+        dict(
+            loader=loader,
+            interlock=interlock,
+            relax=relax,
+            reducer=reducer,
+            health=health,
+        ),
+        shared_parameters["events"],
+    )
 
     # Start manager and included scenarios
     loop = manager.start()
+    loop.create_task(interlockdb.listen())
+    loop.create_task(publish_counters())
+    if subscriber is not None:
+        loop.create_task(subscriber.run())
 
     try:
         loop.run_forever()
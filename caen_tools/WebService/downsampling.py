@@ -0,0 +1,92 @@
+"""Shape-preserving downsampling of the Monitor history
+(largest-triangle-three-buckets algorithm)"""
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Selects indices of `n_out` points representing the shape of y(x)
+
+    Parameters
+    ----------
+    x : np.ndarray
+        sorted abscissa values
+    y : np.ndarray
+        ordinate values
+    n_out : int
+        number of points to be selected
+        (the first and the last points only if it is less than 3)
+
+    Returns
+    -------
+    np.ndarray
+        sorted indices of the selected points
+        (the first and the last points are always selected)
+    """
+
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][: max(n_out, 0)], dtype=int)
+
+    # bucket edges for the inner points [1, n - 1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    sizes = np.diff(edges)
+    x_avg = np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes
+    y_avg = np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes
+    # the last point plays the role of the next bucket average for the last bucket
+    x_avg = np.append(x_avg[1:], x[-1])
+    y_avg = np.append(y_avg[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        xb, yb = x[start:stop], y[start:stop]
+        areas = np.abs(
+            (x[a] - x_avg[i]) * (yb - y[a]) - (x[a] - xb) * (y_avg[i] - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_history(rows: list[dict], max_points: int) -> list[dict]:
+    """Downsamples history of every channel to `max_points` points
+
+    Parameters
+    ----------
+    rows : list[dict]
+        Monitor history rows `{"t": int | float, "V": float, "I": float, "chidx": str}`
+    max_points : int
+        maximal number of points per channel
+
+    Returns
+    -------
+    list[dict]
+        history rows of the selected points
+        (current series drives the selection and its maximum is always kept)
+    """
+
+    channels: dict[str, list[dict]] = dict()
+    for row in rows:
+        channels.setdefault(row["chidx"], []).append(row)
+
+    out = []
+    for chrows in channels.values():
+        if len(chrows) <= max_points:
+            out.extend(chrows)
+            continue
+
+        chrows.sort(key=lambda row: row["t"])
+        t = np.fromiter((row["t"] for row in chrows), dtype=float, count=len(chrows))
+        current = np.fromiter(
+            (row["I"] for row in chrows), dtype=float, count=len(chrows)
+        )
+        indices = lttb_indices(t, current, max_points - 1)
+        indices = np.union1d(indices, int(np.argmax(current)))
+        assert len(indices) <= max_points, "downsampled history exceeds max_points"
+        out.extend(chrows[i] for i in indices[::-1])
+    return out
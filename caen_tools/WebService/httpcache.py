@@ -0,0 +1,204 @@
+"""HTTP compression, validators and server-side cache of the WebService responses"""
+
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import asyncio
+import gzip
+import hashlib
+
+import zstandard
+from fastapi import Request, Response
+
+# bodies smaller than MIN_SIZE are sent as is
+MIN_SIZE = 1024
+# bodies larger than THREAD_SIZE are compressed in the thread
+THREAD_SIZE = 1 << 16
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+NO_STORE = "no-store"
+
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    "zstd": zstandard.ZstdCompressor(level=3).compress,
+    "gzip": lambda body: gzip.compress(body, compresslevel=6),
+}
+
+
+def negotiate_encoding(
+    accept_encoding: str, available: tuple[str, ...] = tuple(COMPRESSORS)
+) -> str | None:
+    """Selects the content encoding accepted by the client
+
+    Parameters
+    ----------
+    accept_encoding : str
+        value of the Accept-Encoding header
+    available : tuple[str, ...]
+        encodings of the server in the order of preference
+
+    Returns
+    -------
+    str | None
+        selected encoding (None for the identity one)
+    """
+
+    accepted: dict[str, float] = dict()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        param, _, value = params.strip().partition("=")
+        if param.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def representation_etag(etag: str, encoding: str | None) -> str:
+    """Returns the ETag of the encoded representation"""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Checks If-None-Match header against the ETag of any representation"""
+
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag in ("*", etag):
+            return True
+        if any(tag == representation_etag(etag, enc) for enc in COMPRESSORS):
+            return True
+    return False
+
+
+class EncodedBody:
+    """Response body with its ETag and compressed variants
+
+    Parameters
+    ----------
+    body : bytes
+        identity representation of the body
+    etag : str | None, default None
+        strong ETag (the hash of the body by default)
+    """
+
+    def __init__(self, body: bytes, etag: str | None = None):
+        self.body = body
+        self.etag = etag or f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.variants: dict[str, bytes] = dict()
+
+    @property
+    def size(self) -> int:
+        """Total size of all representations (in bytes)"""
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+    def compressed(self, encoding: str) -> bytes:
+        """Returns compressed body (compresses once)"""
+
+        if encoding not in self.variants:
+            self.variants[encoding] = COMPRESSORS[encoding](self.body)
+        return self.variants[encoding]
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Returns 304 response"""
+
+    return Response(
+        status_code=304,
+        headers={
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        },
+    )
+
+
+async def encoded_response(
+    request: Request,
+    entry: EncodedBody,
+    cache_control: str,
+    media_type: str = "application/json",
+) -> Response:
+    """Returns the body compressed according to Accept-Encoding of the request
+    (or 304 response if the client has the same representation)"""
+
+    encoding = None
+    if len(entry.body) >= MIN_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    etag = representation_etag(entry.etag, encoding)
+    if etag_matches(request, entry.etag):
+        return not_modified(etag, cache_control)
+
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    body = entry.body
+    if encoding is not None:
+        if len(body) >= THREAD_SIZE:
+            body = await asyncio.to_thread(entry.compressed, encoding)
+        else:
+            body = entry.compressed(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+class ResponseLRU:
+    """LRU cache of the encoded responses limited by the total size
+
+    Parameters
+    ----------
+    max_bytes : int
+        maximal total size of the kept responses (in bytes)
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.__entries: OrderedDict[Hashable, EncodedBody] = OrderedDict()
+        self.counters = dict(hits=0, misses=0, evicted=0)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def size(self) -> int:
+        """Total size of the kept responses (in bytes)"""
+        return sum(entry.size for entry in self.__entries.values())
+
+    def __evict(self) -> None:
+        """Removes least recently used responses exceeding the size limit"""
+
+        size = self.size
+        while self.__entries and size > self.max_bytes:
+            _, entry = self.__entries.popitem(last=False)
+            size -= entry.size
+            self.counters["evicted"] += 1
+
+    def get(self, key: Hashable) -> EncodedBody | None:
+        """Returns the kept response (None if there is no one)"""
+
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        self.__entries.move_to_end(key)
+        # compressed variants could be added since the last call
+        self.__evict()
+        return entry
+
+    def put(self, key: Hashable, entry: EncodedBody) -> None:
+        """Keeps the response"""
+
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+        self.__evict()
@@ -0,0 +1,148 @@
+"""Admission control of the WebService requests (token buckets)"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled with `rate` tokens per second up to `burst` tokens
+
+    Parameters
+    ----------
+    rate : float
+        refill rate (in tokens per second)
+    burst : float
+        capacity of the bucket
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        """Adds tokens for the time passed since the last update"""
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Returns the time until one token is available (in seconds)"""
+
+        self.refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Takes one token (the balance becomes negative for the reserved ones)"""
+        self.tokens -= 1
+
+    @property
+    def full(self) -> bool:
+        """The bucket has not been used recently"""
+        self.refill()
+        return self.tokens >= self.burst
+
+
+class RateLimiter:
+    """Per-sender and per-route token buckets
+
+    The request is admitted if both buckets (of its sender and of its route)
+    have a token. If a token will be available in `max_wait` seconds,
+    the request is reserved and queued until then, otherwise it is limited
+
+    Parameters
+    ----------
+    sender_limit : tuple[float, float]
+        rate (per second) and burst of every sender
+    route_limit : tuple[float, float]
+        default rate (per second) and burst of every route
+    route_limits : dict[str, tuple[float, float]] | None, default None
+        rate and burst of the specific routes
+    max_wait : float, default 0.5
+        maximal queueing time of the request (in seconds)
+    max_senders : int, default 1024
+        number of kept sender buckets to start cleaning of the unused ones
+    """
+
+    COUNTERS = ("admitted", "queued", "stale", "rejected")
+
+    def __init__(
+        self,
+        sender_limit: tuple[float, float],
+        route_limit: tuple[float, float],
+        route_limits: dict[str, tuple[float, float]] | None = None,
+        max_wait: float = 0.5,
+        max_senders: int = 1024,
+    ):
+        self.sender_limit = sender_limit
+        self.route_limit = route_limit
+        self.route_limits = route_limits or dict()
+        self.max_wait = max_wait
+        self.max_senders = max_senders
+        self.__senders: dict[str, TokenBucket] = dict()
+        self.__routes: dict[str, TokenBucket] = dict()
+        self.queue_size = 0
+        self.counters: dict[str, dict[str, int]] = dict()
+
+    def __bucket(self, buckets: dict, key: str, limit: tuple[float, float]):
+        if key not in buckets:
+            buckets[key] = TokenBucket(*limit)
+        return buckets[key]
+
+    def record(self, route: str, counter: str) -> None:
+        """Increments the counter of the route"""
+
+        if route not in self.counters:
+            self.counters[route] = dict.fromkeys(self.COUNTERS, 0)
+        self.counters[route][counter] += 1
+
+    async def acquire(self, sender: str, route: str) -> bool:
+        """Admits the request (waits in the queue if needed)
+
+        Returns
+        -------
+        bool
+            True if the request is admitted,
+            False if the limit is exceeded (the caller records "stale" or "rejected")
+        """
+
+        if len(self.__senders) > self.max_senders:
+            self.__senders = {k: b for k, b in self.__senders.items() if not b.full}
+
+        buckets = (
+            self.__bucket(self.__senders, sender, self.sender_limit),
+            self.__bucket(
+                self.__routes, route, self.route_limits.get(route, self.route_limit)
+            ),
+        )
+        wait = max(bucket.wait_time() for bucket in buckets)
+        if wait > self.max_wait:
+            return False
+
+        for bucket in buckets:
+            bucket.take()
+        if wait > 0:
+            self.record(route, "queued")
+            self.queue_size += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.queue_size -= 1
+        self.record(route, "admitted")
+        return True
+
+
+def parse_route_limits(value: str) -> dict[str, tuple[float, float]]:
+    """Parses the config lines `<route> <rate> <burst>`"""
+
+    limits = dict()
+    for line in value.split("\n"):
+        if not line.strip():
+            continue
+        route, rate, burst = line.split()
+        limits[route] = (float(rate), float(burst))
+    return limits
@@ -0,0 +1,184 @@
+"""Serving of the built frontend with precompressed variants and caching headers"""
+
+from email.utils import formatdate, parsedate_to_datetime
+
+import gzip
+import logging
+import mimetypes
+import os
+import re
+import sys
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from caen_tools.WebService.httpcache import (
+    IMMUTABLE,
+    REVALIDATE,
+    etag_matches,
+    negotiate_encoding,
+)
+
+# precompressed variants in the order of preference
+VARIANTS = {"br": ".br", "gzip": ".gz"}
+# content hash in the file name of the bundler output (e.g. main.3f2a9c1b.js)
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(chunk\.)?[a-z0-9]+$")
+
+
+class FrontendFiles:
+    """Serves files of the frontend build
+
+    * `.br` / `.gz` files lying next to the original are sent
+      if the client accepts the encoding
+      (missing or outdated ones are written by `precompress` on startup)
+    * files with the content hash in the name are immutable,
+      other files (index.html, icons) are revalidated by ETag and Last-Modified
+    * files smaller than `max_cached_size` are kept in memory
+      (until their modification time changes)
+
+    Parameters
+    ----------
+    directory : str
+        path to the frontend build
+    max_cached_size : int, default 256 kB
+        maximal size of the file kept in memory (in bytes)
+    """
+
+    def __init__(self, directory: str, max_cached_size: int = 256 << 10):
+        self.directory = os.path.realpath(directory)
+        self.max_cached_size = max_cached_size
+        self.__cache: dict[str, tuple[int, bytes]] = dict()
+
+    def precompress(self) -> None:
+        """Writes missing or outdated precompressed variants of the build"""
+
+        if not os.path.isdir(self.directory):
+            logging.warning("Frontend build %s is not found", self.directory)
+            return
+        precompress(self.directory)
+
+    def __resolve(self, relpath: str) -> str:
+        """Returns the absolute path of the file inside the directory"""
+
+        path = os.path.realpath(os.path.join(self.directory, relpath))
+        if os.path.commonpath([path, self.directory]) != self.directory:
+            raise HTTPException(status_code=404, detail="File is not found")
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="File is not found")
+        return path
+
+    def __read(self, path: str, stat: os.stat_result) -> bytes:
+        """Returns the file content from memory (reads the file if changed)"""
+
+        cached = self.__cache.get(path)
+        if cached is None or cached[0] != stat.st_mtime_ns:
+            with open(path, "rb") as f:
+                cached = (stat.st_mtime_ns, f.read())
+            self.__cache[path] = cached
+        return cached[1]
+
+    @staticmethod
+    def __not_modified(request: Request, etag: str, mtime: float) -> bool:
+        """Checks validators of the request"""
+
+        if "if-none-match" in request.headers:
+            return etag_matches(request, etag)
+        since = request.headers.get("if-modified-since")
+        if since is None:
+            return False
+        try:
+            return int(mtime) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    async def response(self, request: Request, relpath: str) -> Response:
+        """Returns the file response for the request"""
+
+        path = self.__resolve(relpath)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        cache_control = IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+
+        encoding = None
+        available = tuple(
+            e for e, ext in VARIANTS.items() if os.path.isfile(path + ext)
+        )
+        if available:
+            encoding = negotiate_encoding(
+                request.headers.get("accept-encoding", ""), available
+            )
+        if encoding is not None:
+            path += VARIANTS[encoding]
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        if self.__not_modified(request, etag, stat.st_mtime):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        if stat.st_size <= self.max_cached_size:
+            return Response(
+                content=self.__read(path, stat), media_type=media_type, headers=headers
+            )
+        return FileResponse(
+            path, media_type=media_type, headers=headers, stat_result=stat
+        )
+
+
+def precompress(directory: str) -> None:
+    """Writes `.gz` (and `.br` if brotli is installed) variants
+    of the text files in the directory
+    (up-to-date variants are kept, unwritable files are skipped)"""
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logging.warning("brotli is not installed, only .gz variants are written")
+
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith(tuple(VARIANTS.values())):
+                continue
+            media_type = mimetypes.guess_type(filename)[0] or ""
+            if not media_type.startswith("text/") and not media_type.endswith(
+                ("javascript", "json", "svg+xml")
+            ):
+                continue
+
+            path = os.path.join(dirpath, filename)
+            compressors = {".gz": lambda c: gzip.compress(c, compresslevel=9)}
+            if brotli is not None:
+                compressors[".br"] = brotli.compress
+            mtime = os.stat(path).st_mtime_ns
+            outdated = [
+                ext
+                for ext in compressors
+                if not os.path.isfile(path + ext)
+                or os.stat(path + ext).st_mtime_ns < mtime
+            ]
+            if not outdated:
+                continue
+
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+                for ext in outdated:
+                    with open(path + ext, "wb") as f:
+                        f.write(compressors[ext](content))
+            except OSError as e:
+                logging.warning("Cannot precompress %s: %s", path, e)
+                continue
+            logging.info("Precompressed %s", path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    precompress(sys.argv[1])
@@ -0,0 +1,105 @@
+"""Upstream process shared by WebService workers
+
+Workers send coalescable read receipts to this process instead of the backends,
+so the backend load does not grow with the number of workers
+"""
+
+import json
+import asyncio
+import logging
+
+import zmq
+import zmq.asyncio
+
+from caen_tools.connection.client import AsyncClient
+from caen_tools.utils.receipt import ReceiptJSONDecoder
+from caen_tools.utils.utils import get_logging_config
+from caen_tools.WebService.utils import RequestCoalescer
+
+
+class UpstreamProxy:
+    """Coalescing proxy between WebService workers and backends
+
+    Replies have the same frames as the RouterServer ones,
+    so workers use the ordinary AsyncClient to query the proxy
+
+    Parameters
+    ----------
+    bind_addr : str
+        address to be bound for workers (e.g. "ipc:///tmp/caen_ws_upstream")
+    coalescer : RequestCoalescer
+        coalescer of the backend queries
+    """
+
+    def __init__(self, bind_addr: str, coalescer: RequestCoalescer):
+        self.coalescer = coalescer
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.SNDTIMEO, 10_000)
+        self.socket.bind(bind_addr)
+        self.__tasks: set[asyncio.Task] = set()
+
+    async def __reply(self, client: bytes, receipt_str: bytes) -> None:
+        """Queries backends and sends the encoded response to the worker"""
+
+        try:
+            receipt = json.loads(receipt_str.decode("utf-8"), cls=ReceiptJSONDecoder)
+        except (ValueError, TypeError) as e:
+            logging.error("Bad receipt from worker %s: %s", client, e)
+            return
+
+        statuscode, raw = await self.coalescer.query(receipt, raw=True)
+        header = json.dumps(dict(statuscode=statuscode)).encode("utf-8")
+        try:
+            await self.socket.send_multipart([client, b"", raw, header])
+        except zmq.error.Again:
+            logging.error("Send_multipart failed. Exeeded sending time")
+        return
+
+    async def serve(self) -> None:
+        """Serves workers queries concurrently"""
+
+        while True:
+            client, _, receipt_str = await self.socket.recv_multipart()
+            task = asyncio.create_task(self.__reply(client, receipt_str))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+
+
+async def log_counters(coalescer: RequestCoalescer, period: float = 60) -> None:
+    """Logs the coalescer counters periodically"""
+
+    while True:
+        await asyncio.sleep(period)
+        logging.info("Upstream counters %s", coalescer.counters)
+
+
+def run(addresses: dict[str, str], bind_addr: str, receive_time: float, logs: dict):
+    """Runs the upstream proxy (entry point of the separate process)
+
+    Parameters
+    ----------
+    addresses : dict[str, str]
+        backend addresses in format {"identity" : "address"}
+    bind_addr : str
+        address to be bound for workers
+    receive_time : float
+        waiting time for the backend response (in seconds)
+    logs : dict
+        keyword arguments of the `get_logging_config`
+    """
+
+    get_logging_config(**logs)
+    coalescer = RequestCoalescer(AsyncClient(addresses, receive_time), ttl=1)
+    proxy = UpstreamProxy(bind_addr, coalescer)
+    logging.info("Start WebService upstream on %s", bind_addr)
+
+    async def main():
+        asyncio.create_task(log_counters(coalescer))
+        await proxy.serve()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logging.info("Keyboard Interrupt. Stop WebService upstream")
+    return
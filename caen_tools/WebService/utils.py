@@ -2,13 +2,32 @@ from functools import wraps
 from typing import List
 
 import asyncio
+import contextvars
 import json
 import logging
 import subprocess
+import time
+import timeit
 
 from fastapi import HTTPException
-from caen_tools.utils.receipt import ReceiptResponseError
-from caen_tools.utils.receipt import ReceiptJSONEncoder
+from starlette.datastructures import MutableHeaders
+from caen_tools.connection.client import AsyncClient
+from caen_tools.utils import tracing
+from caen_tools.utils.paramsframe import ParamsFrame
+from caen_tools.utils.receipt import Receipt, ReceiptResponseError
+from caen_tools.utils.receipt import ReceiptJSONEncoder, ReceiptJSONDecoder
+
+
+def check_response(resp):
+    """Raises HTTP error code
+    on ReceiptResponseError instance"""
+
+    if isinstance(resp.response, ReceiptResponseError) or (
+        resp.response.statuscode > 300
+    ):
+        data = resp.response
+        raise HTTPException(status_code=data.statuscode, detail=data.body)
+    return resp
 
 
 def response_provider(func):
@@ -18,16 +37,157 @@ def response_provider(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
         resp = await func(*args, **kwargs)
-        if isinstance(resp.response, ReceiptResponseError) or (
-            resp.response.statuscode > 300
-        ):
-            data = resp.response
-            raise HTTPException(status_code=data.statuscode, detail=data.body)
-        return resp
+        return check_response(resp)
 
     return wrapper
 
 
+def check_raw(statuscode: int, raw: bytes) -> bytes:
+    """Raises HTTP error code on the error statuscode
+    of the encoded receipt"""
+
+    if statuscode > 300:
+        receipt = json.loads(raw.decode("utf-8"), cls=ReceiptJSONDecoder)
+        raise HTTPException(status_code=statuscode, detail=receipt.response.body)
+    return raw
+
+
+class RequestCoalescer:
+    """Shares one backend query between identical read requests
+
+    Requests are identical if they have the same executor, title and params
+    (sender is ignored). Identical requests in flight wait the same query,
+    successful responses are reused during `ttl` seconds.
+
+    Parameters
+    ----------
+    cli : AsyncClient
+        client for the backend queries
+    ttl : float, default 1
+        freshness window of the responses (in seconds)
+    max_size : int, default 256
+        number of kept responses to start cleaning of expired ones
+    """
+
+    def __init__(self, cli: AsyncClient, ttl: float = 1, max_size: int = 256):
+        self.cli = cli
+        self.ttl = ttl
+        self.max_size = max_size
+        self.__cache: dict[tuple, tuple[float, object]] = dict()
+        self.__inflight: dict[tuple, asyncio.Task] = dict()
+        self.counters = dict(hits=0, misses=0, coalesced=0)
+
+    @staticmethod
+    def key(receipt: Receipt, raw: bool = False) -> tuple:
+        """Identity of the request"""
+        return (
+            receipt.executor,
+            receipt.title,
+            json.dumps(receipt.params, sort_keys=True),
+            raw,
+        )
+
+    def __store(self, key: tuple, task: asyncio.Task) -> None:
+        """Keeps successful response of the finished query"""
+
+        self.__inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        _, _, _, raw = key
+        if raw and result[0] > 300:
+            return
+        if not raw and (
+            isinstance(result.response, ReceiptResponseError)
+            or result.response.statuscode > 300
+        ):
+            return
+
+        now = time.monotonic()
+        if len(self.__cache) >= self.max_size:
+            self.__cache = {
+                k: v for k, v in self.__cache.items() if now - v[0] < self.ttl
+            }
+        self.__cache[key] = (now, result)
+
+    def stale(self, receipt: Receipt, raw: bool = False):
+        """Returns the last kept response regardless of its age
+        (None if there is no one)"""
+
+        cached = self.__cache.get(self.key(receipt, raw))
+        return None if cached is None else cached[1]
+
+    async def query(
+        self, receipt: Receipt, receive_time: float | None = None, raw: bool = False
+    ):
+        """Returns the response on the receipt
+        (Receipt or (statuscode, bytes) tuple if `raw`, see AsyncClient.query_raw)
+
+        Notes
+        -----
+        Returned objects are shared between callers and must not be changed
+        """
+
+        key = self.key(receipt, raw)
+        cached = self.__cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            self.counters["hits"] += 1
+            return cached[1]
+
+        task = self.__inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            query = self.cli.query_raw if raw else self.cli.query
+            task = asyncio.create_task(query(receipt, receive_time))
+            task.add_done_callback(lambda t: self.__store(key, t))
+            self.__inflight[key] = task
+
+        return await asyncio.shield(task)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding the timing breakdown of the backend queries
+    made during the HTTP request to the `Server-Timing` header
+    (and the trace ID propagated through the receipts to the `X-Trace-Id` header)
+
+    Slow queries are kept in the slow traces of the WebService
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = tracing.new_trace_id()
+        collected = tracing.Collector()
+        trace_token = tracing.TRACE_ID.set(trace_id)
+        collected_token = tracing.COLLECTED.set(collected)
+        starttime = timeit.default_timer()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                collected.closed = True
+                total = (timeit.default_timer() - starttime) * 1000
+                timing = [tracing.server_timing(collected), f"total;dur={total:.2f}"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", ", ".join(filter(None, timing)))
+                headers.append("X-Trace-Id", trace_id)
+                for receipt in collected:
+                    tracing.SLOW_TRACES.add(receipt, tracing.duration(receipt))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            tracing.TRACE_ID.reset(trace_token)
+            tracing.COLLECTED.reset(collected_token)
+
+
 def send_mail(addresses: List[str], subject: str, text: str) -> int:
     """Sends mail to a number of addresses
 
@@ -61,19 +221,156 @@ def send_mail(addresses: List[str], subject: str, text: str) -> int:
     return 1
 
 
-def broadcaster(delay, function, *args, **kwargs):
-    """Creates a generator to broadcast `function`
-    function responses every delay (in seconds) in the loop"""
+class StreamHub:
+    """Broadcasts `function` responses to all subscribers
 
-    async def generator():
-        """yields response strings"""
-        try:
-            while True:
-                response = await function(*args, **kwargs)
-                response_str = json.dumps(response, cls=ReceiptJSONEncoder)
-                yield response_str
-                await asyncio.sleep(delay)
-        except asyncio.CancelledError:
-            logging.info("Disconnected from client (via refresh/close)")
-
-    return generator()
+    Only one producer polls `function` every `delay` seconds
+    (while there are subscribers) and serializes the response once.
+    Every subscriber has a bounded queue, the oldest message is skipped
+    if the subscriber is too slow to read it in time.
+
+    Parameters
+    ----------
+    delay : float
+        polling period (in seconds)
+    function : Callable
+        coroutine function returning the response
+    *args, **kwargs
+        arguments of the `function`
+    queue_size : int, default 2
+        maximal number of the messages waiting for the subscriber
+    """
+
+    def __init__(self, delay, function, *args, queue_size: int = 2, **kwargs):
+        self.delay = delay
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.queue_size = queue_size
+        self.subscribers: set[asyncio.Queue] = set()
+        self.task: asyncio.Task | None = None
+        self.counters = dict(produced=0, skipped=0)
+
+    async def __produce(self):
+        """Polls the function and fills subscribers queues"""
+
+        logging.debug("Start hub producer for %s", self.function.__name__)
+        while self.subscribers:
+            try:
+                response = await self.function(*self.args, **self.kwargs)
+                message = json.dumps(response, cls=ReceiptJSONEncoder)
+            except Exception:
+                logging.error("Hub producer failed", exc_info=True)
+                await asyncio.sleep(self.delay)
+                continue
+
+            self.counters["produced"] += 1
+            for queue in self.subscribers:
+                if queue.full():
+                    queue.get_nowait()
+                    self.counters["skipped"] += 1
+                queue.put_nowait((response, message))
+            await asyncio.sleep(self.delay)
+
+        logging.debug(
+            "Stop hub producer for %s (no subscribers)", self.function.__name__
+        )
+        self.task = None
+
+    def subscribe(self, raw: bool = False):
+        """Creates a generator yielding response strings
+        (or response objects if `raw`) to the new subscriber"""
+
+        async def generator():
+            """yields response strings"""
+            # the queue is registered on the first iteration only,
+            # so a never iterated generator does not keep the producer running
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self.subscribers.add(queue)
+            if self.task is None:
+                # the producer outlives the request of the first subscriber
+                self.task = asyncio.create_task(
+                    self.__produce(), context=contextvars.Context()
+                )
+            try:
+                while True:
+                    response, message = await queue.get()
+                    yield response if raw else message
+            except asyncio.CancelledError:
+                logging.info("Disconnected from client (via refresh/close)")
+            finally:
+                self.subscribers.discard(queue)
+
+        return generator()
+
+
+class ParamsDeltaEncoder:
+    """Prepares device parameters messages for one client:
+    full snapshot first (and on changes of the channels or parameters list)
+    and then only changed parameters (compared column by column)
+
+    Parameters
+    ----------
+    channels : list[str] | None, default None
+        subscribed channels (all channels if None)
+    deadband : float, default 0
+        minimal change of the numeric parameter to be sent
+        (status parameters are sent on any change)
+    """
+
+    EXACT_PARAMS = ("ChStatus", "ImonRange")
+
+    def __init__(self, channels: list[str] | None = None, deadband: float = 0):
+        self.channels: set[str] | None = None
+        self.deadband = deadband
+        self.__last: ParamsFrame | None = None
+        self.subscribe(channels, deadband)
+
+    def subscribe(self, channels: list[str] | None, deadband: float) -> None:
+        """Changes subscription (the next message will be a full snapshot)"""
+
+        self.channels = set(map(str, channels)) if channels else None
+        self.deadband = float(deadband)
+        self.__last = None
+        return
+
+    @staticmethod
+    def __layout(frame: ParamsFrame) -> tuple:
+        return frame.aliases, [
+            (p, getattr(values, "typecode", None))
+            for p, values in frame.columns.items()
+        ]
+
+    def encode(
+        self, params: dict[str, dict] | ParamsFrame, timestamp: int
+    ) -> dict | None:
+        """Returns a message for the client
+        (None if nothing was changed beyond the deadband)"""
+
+        frame = ParamsFrame.from_any(params)
+        if self.channels is not None:
+            frame = frame.select(channels=self.channels)
+        last = self.__last
+        if last is None or self.__layout(last) != self.__layout(frame):
+            self.__last = ParamsFrame(
+                frame.aliases, {p: values[:] for p, values in frame.columns.items()}
+            )
+            return dict(type="snapshot", timestamp=timestamp, params=frame.to_dict())
+
+        delta = dict()
+        for key, new in frame.columns.items():
+            old = last.columns[key]
+            if key in self.EXACT_PARAMS or isinstance(new, list):
+                changed = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+            else:
+                changed = [
+                    i
+                    for i, (a, b) in enumerate(zip(old, new))
+                    if abs(b - a) > self.deadband
+                ]
+            for i in changed:
+                old[i] = new[i]
+                delta.setdefault(frame.aliases[i], dict())[key] = new[i]
+        if not delta:
+            return None
+        return dict(type="delta", timestamp=timestamp, params=delta)
@@ -1,76 +1,95 @@
 """WebServer implementation"""
 
 from enum import Enum
-from collections import namedtuple
 from typing import Annotated
 
 import os
+import copy
+import configparser
+import multiprocessing
+import json
+import zlib
 import asyncio
 import argparse
 import logging
 
 import uvicorn
 
-from fastapi import FastAPI, Body, Query, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, FastAPI, Body, Query, Request, WebSocket
+from fastapi import HTTPException
+from fastapi import WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from async_lru import alru_cache
 from sse_starlette.sse import EventSourceResponse
 
 from caen_tools.connection.client import AsyncClient
+from caen_tools.connection.pubsub import ParamsSubscriber
+from caen_tools.connection.sharedmem import SharedParams
 from caen_tools.utils.utils import config_processor, get_timestamp, get_logging_config
-from caen_tools.utils.receipt import Receipt
+from caen_tools.utils import tracing
+from caen_tools.utils.metrics import REGISTRY, to_prometheus
+from caen_tools.utils.receipt import Receipt, ReceiptResponse, ReceiptResponseError
+from caen_tools.utils.receipt import ReceiptJSONEncoder
 from caen_tools.utils.resperrs import RResponseErrors
-from caen_tools.WebService.utils import response_provider, send_mail, broadcaster
+from caen_tools.WebService.utils import (
+    response_provider,
+    check_response,
+    check_raw,
+    send_mail,
+    StreamHub,
+    ParamsDeltaEncoder,
+    RequestCoalescer,
+    ServerTimingMiddleware,
+)
+from caen_tools.WebService.downsampling import downsample_history
+from caen_tools.WebService.httpcache import (
+    IMMUTABLE,
+    NO_STORE,
+    REVALIDATE,
+    EncodedBody,
+    ResponseLRU,
+    encoded_response,
+)
+from caen_tools.WebService.ratelimit import RateLimiter, parse_route_limits
+from caen_tools.WebService.static import FrontendFiles
+from caen_tools.WebService.upstream import run as upstream_run
 
 # Initialization part
 # -------------------
 
-parser = argparse.ArgumentParser(description="CAEN Manager WebService")
-parser.add_argument(
-    "-c",
-    "--config",
-    required=False,
-    type=argparse.FileType("r"),
-    help="Config file",
-    nargs="?",
-)
-console_args = parser.parse_args()
-settings = config_processor(console_args.config)
-settings.add_section("global_pars")
-settings.set("global_pars", "last_target_voltage", "0.0")
-settings.set("global_pars", "is_interlock", "True")
-
-get_logging_config(
-    level=settings.get("ws", "loglevel"),
-    filepath=settings.get("ws", "logfile"),
-)
-logging.info(
-    "Successfuly started WebService with arguments %s",
-    dict(settings.items("ws")),
-)
+# environment variable with the config path (passed to the worker processes)
+CONFIG_ENV = "CAEN_WS_CONFIG"
+# environment variable with the upstream address used by the worker processes
+# (empty if the workers query the backends directly)
+UPSTREAM_ENV = "CAEN_WS_UPSTREAM"
 
-Service = namedtuple("Service", ["title", "address"])
+# worker state (set up by `create_app`)
+settings: configparser.ConfigParser
+cli: AsyncClient
+coalescer: RequestCoalescer
+history_cache: ResponseLRU
+limiter: RateLimiter
+params_bus: ParamsSubscriber | SharedParams | None
 
 
 class Services(Enum):
-    """A list of microservices"""
+    """A list of microservices
+    (addresses are taken from the [ws] config section by titles)
+    """
 
     @property
     def title(self):
         """Returns a title of the microservice"""
-        return self.value.title
+        return self.value
 
-    @property
-    def address(self):
+    def address(self, config: configparser.ConfigParser) -> str:
         """Returns an adress of the microservice"""
-        return self.value.address
+        return config.get("ws", self.value)
 
-    DEVBACK = Service("device_backend", settings.get("ws", "device_backend"))
-    MONITOR = Service("monitor", settings.get("ws", "monitor"))
-    SYSCHECK = Service("system_check", settings.get("ws", "system_check"))
+    DEVBACK = "device_backend"
+    MONITOR = "monitor"
+    SYSCHECK = "system_check"
 
 
 tags_metadata = [
@@ -88,58 +107,28 @@ tags_metadata = [
     },
 ]
 
-app = FastAPI(
-    title="CAEN Manager App",
-    summary="Application to run high voltage on CAEN",
-    version="1.0",
-)
-cli = AsyncClient(
-    {s.title: s.address for s in Services},
-    settings.get("ws", "receive_time"),
-)
-
+router = APIRouter()
 root = os.path.dirname(os.path.abspath(__file__))
-app.mount(
-    "/static",
-    StaticFiles(directory=os.path.join(root, "frontend", "build", "static")),
-    name="static",
-)
-
-origins = ["*"]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
+frontend = FrontendFiles(os.path.join(root, "frontend", "build"))
 
-@app.on_event("shutdown")
-async def last_scream() -> None:
-    """Actions on shutdown server"""
 
-    logging.info("Start server shutdown actions")
-
-    subslist = list(
-        filter(lambda x: ("@" in x), settings.get("ws", "subscribers").split("\n"))
-    )
-    logging.info("Send shutdown info emails to %s", subslist)
-    send_mail(subslist, "CAEN WebServer shutdown", "Hello! WebServer shutdown.")
-    return
-
-
-@app.get("/")
-async def read_root():
+@router.get("/")
+async def read_root(request: Request):
     """Redirect on frontend page"""
-    return FileResponse(os.path.join(root, "frontend", "build", "index.html"))
+    return await frontend.response(request, "index.html")
 
 
-@app.get("/energy-icon.svg", include_in_schema=False)
-async def read_favicon():
+@router.get("/energy-icon.svg", include_in_schema=False)
+async def read_favicon(request: Request):
     """Reads favicon for the webpage"""
-    return FileResponse(os.path.join(root, "frontend", "build", "energy-icon.svg"))
+    return await frontend.response(request, "energy-icon.svg")
+
+
+@router.get("/static/{path:path}", include_in_schema=False)
+async def read_static(request: Request, path: str):
+    """Reads static files of the webpage
+    (precompressed variants, immutable hashed assets)"""
+    return await frontend.response(request, os.path.join("static", path))
 
 
 # API part
@@ -148,12 +137,11 @@ async def read_favicon():
 # Device backend API routes
 
 
-@alru_cache(ttl=1)
 async def devback_status(
     sender: str = "webcli", receive_time: float | None = None
 ) -> Receipt:
     """Returns a status of DeviceBackend
-    (cache during 1 s)
+    (coalesced, cache during 1 s)
     """
 
     logging.debug("Start devback_status")
@@ -163,15 +151,41 @@ async def devback_status(
         title="status",
         params={},
     )
-    resp = await cli.query(receipt, receive_time)
+    resp = await coalescer.query(receipt, receive_time)
     return resp
 
 
-@app.get(f"/{Services.DEVBACK.title}/status", tags=[Services.DEVBACK.title])
+def reject(route: str) -> None:
+    """Raises 429 error for the limited request"""
+
+    limiter.record(route, "rejected")
+    raise HTTPException(
+        status_code=429,
+        detail=f"Rate limit of {route} is exceeded",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def admitted_query(route: str, receipt: Receipt, raw: bool = False):
+    """Queries the receipt under the rate limits of the route and the sender
+    (limited requests get the last cached response or 429 error)"""
+
+    if await limiter.acquire(receipt.sender, route):
+        return await coalescer.query(receipt, raw=raw)
+
+    stale = coalescer.stale(receipt, raw)
+    if stale is None:
+        reject(route)
+    limiter.record(route, "stale")
+    return stale
+
+
+@router.get(f"/{Services.DEVBACK.title}/status", tags=[Services.DEVBACK.title])
 @response_provider
 async def read_parameters(sender: str = "webcli") -> Receipt:
     """[WS Backend API]
     Returns `device_backend` status.
+    (rate limited)
 
     Parameters
     ----------
@@ -179,17 +193,24 @@ async def read_parameters(sender: str = "webcli") -> Receipt:
     """
 
     logging.info("Start devback status task")
-    response = await devback_status(sender)
+    receipt = Receipt(
+        sender=sender,
+        executor=Services.DEVBACK.title,
+        title="status",
+        params={},
+    )
+    response = await admitted_query(f"{Services.DEVBACK.title}/status", receipt)
     return response
 
 
-@app.post(f"/{Services.DEVBACK.title}/set_voltage", tags=[Services.DEVBACK.title])
+@router.post(f"/{Services.DEVBACK.title}/set_voltage", tags=[Services.DEVBACK.title])
 @response_provider
 async def set_voltage(
     target_voltage: Annotated[float, Body()], sender: Annotated[str, Body()] = "webcli"
 ) -> Receipt:
     """[WS Backend API]
     Sets voltage on CAEN setup
+    (rate limited)
 
     Parameters
     ----------
@@ -197,6 +218,10 @@ async def set_voltage(
     - **sender**: string identifier of the request sender
     """
 
+    route = f"{Services.DEVBACK.title}/set_voltage"
+    if not await limiter.acquire(sender, route):
+        reject(route)
+
     logging.info("Start setting voltage task by %s: %.3f", sender, target_voltage)
 
     set_voltage = Receipt(
@@ -228,13 +253,14 @@ async def set_voltage(
     return set_voltage
 
 
-@app.post(f"/{Services.DEVBACK.title}/down", tags=[Services.DEVBACK.title])
+@router.post(f"/{Services.DEVBACK.title}/down", tags=[Services.DEVBACK.title])
 @response_provider
 async def down(sender: Annotated[str, Body(embed=True)] = "webcli") -> Receipt:
     """[WS Backend API]
     Emergency call:
       Turns off voltage from CAEN device
       and turns off autopilot (if on)
+      (never rate limited)
 
     Parameters
     ----------
@@ -261,10 +287,10 @@ async def down(sender: Annotated[str, Body(embed=True)] = "webcli") -> Receipt:
     return down_resp
 
 
-@alru_cache(ttl=1)
 async def device_params(sender: str = "webcli") -> Receipt:
     """[WS Backend API]
     Gets parameters of CAEN setup
+    (from the telemetry bus or coalesced, cache during 1 s)
 
     Parameters
     ----------
@@ -278,17 +304,30 @@ async def device_params(sender: str = "webcli") -> Receipt:
         title="params",
         params={},
     )
-    response = await cli.query(receipt)
+    if params_bus is not None:
+        params_bus.start()
+        published = params_bus.params()
+        if published is not None:
+            timestamp, params = published
+            receipt.response = ReceiptResponse(
+                statuscode=1, body=dict(params=params), timestamp=int(timestamp)
+            )
+            return receipt
+    response = await coalescer.query(receipt)
     return response
 
 
-@app.get(f"/{Services.DEVBACK.title}/params", tags=[Services.DEVBACK.title])
-@response_provider
+@router.get(
+    f"/{Services.DEVBACK.title}/params",
+    tags=[Services.DEVBACK.title],
+    response_model=Receipt,
+)
 async def device_params_api(
-    sender: Annotated[str, Query(max_length=50)] = "webcli"
-) -> Receipt:
+    request: Request, sender: Annotated[str, Query(max_length=50)] = "webcli"
+) -> Response:
     """[WS Backend API]
     Gets parameters of CAEN setup
+    (compressed according to Accept-Encoding, revalidated by ETag, rate limited)
 
     Parameters
     ----------
@@ -296,19 +335,26 @@ async def device_params_api(
     """
 
     logging.debug("Start device_params_api")
-    response = await device_params(sender)
-    return response
+    receipt = Receipt(
+        sender=sender,
+        executor=Services.DEVBACK.title,
+        title="params",
+        params={},
+    )
+    raw = check_raw(
+        *await admitted_query(f"{Services.DEVBACK.title}/params", receipt, raw=True)
+    )
+    return await encoded_response(request, EncodedBody(raw), REVALIDATE)
 
 
 # Monitor API routes
 
 
-@alru_cache(ttl=1)
 async def monitor_status(
     sender: str = "webcli", receive_time: float | None = None
 ) -> Receipt:
     """Returns a status of Monitor
-    (cache during 1 s)
+    (coalesced, cache during 1 s)
     """
 
     logging.debug("Start monitor_status")
@@ -318,11 +364,11 @@ async def monitor_status(
         title="status",
         params={},
     )
-    response = await cli.query(receipt, receive_time)
+    response = await coalescer.query(receipt, receive_time)
     return response
 
 
-@app.get(f"/{Services.MONITOR.title}/status", tags=[Services.MONITOR.title])
+@router.get(f"/{Services.MONITOR.title}/status", tags=[Services.MONITOR.title])
 @response_provider
 async def monstatus(sender: Annotated[str, Query(max_length=50)] = "webcli") -> Receipt:
     """[WS Backend API]
@@ -338,25 +384,77 @@ async def monstatus(sender: Annotated[str, Query(max_length=50)] = "webcli") ->
     return response
 
 
-@app.get(f"/{Services.MONITOR.title}/getparams", tags=[Services.MONITOR.title])
-@response_provider
+@router.get(
+    f"/{Services.MONITOR.title}/getparams",
+    tags=[Services.MONITOR.title],
+    response_model=Receipt,
+)
 async def paramsdb(
+    request: Request,
     start_timestamp: Annotated[int, Query()],
     stop_timestamp: Annotated[int | None, Query()] = None,
+    max_points: Annotated[int | None, Query(ge=3)] = None,
+    precise: Annotated[bool, Query()] = False,
     sender: Annotated[str, Query(max_length=50)] = "webcli",
-) -> Receipt:
+) -> Response:
     """[WS Backend API]
     Returns parameters from the `monitor` microservice
+    (the reply of the monitor is forwarded without re-encoding if no downsampling)
+
+    The response is compressed according to Accept-Encoding.
+    Closed time ranges (`stop_timestamp` older than `closed_range_delay`)
+    are immutable: they are cached on the server and get long-lived ETags,
+    other ranges are revalidated by the content ETag
 
     Parameters
     ----------
     - **start_timestamp**: start timestamp for data retrieval (in seconds)
     - **stop_timestamp**: stop timestamp for data retrieval  (in seconds)
+    - **max_points**: maximal number of points per channel
+      (history is downsampled by LTTB algorithm keeping current peaks, no limit by default)
+    - **precise**: return measurement times with the fraction of the second
+      (integer seconds by default)
     - **sender**: string identifier of the request sender
     """
 
     logging.info("Start montior/getparams task")
+    closed = stop_timestamp is not None and (
+        stop_timestamp + settings.getint("ws", "closed_range_delay") <= get_timestamp()
+    )
     stop_timestamp = get_timestamp() if stop_timestamp is None else stop_timestamp
+    if closed:
+        key = (start_timestamp, stop_timestamp, max_points, precise)
+        etag = f'"history-{start_timestamp}-{stop_timestamp}-{max_points or 0}{"-p" if precise else ""}"'
+        # the cached entry answers If-None-Match with its representation ETag
+        entry = history_cache.get(key)
+        if entry is None:
+            statuscode, body = await history_body(
+                sender, start_timestamp, stop_timestamp, max_points, precise
+            )
+            if statuscode != 1:
+                # failed Monitor replies are neither cached nor immutable
+                return await encoded_response(request, EncodedBody(body), NO_STORE)
+            entry = EncodedBody(body, etag)
+            history_cache.put(key, entry)
+        return await encoded_response(request, entry, IMMUTABLE)
+
+    _, body = await history_body(
+        sender, start_timestamp, stop_timestamp, max_points, precise
+    )
+    return await encoded_response(request, EncodedBody(body), REVALIDATE)
+
+
+async def history_body(
+    sender: str,
+    start_timestamp: int,
+    stop_timestamp: int,
+    max_points: int | None,
+    precise: bool = False,
+) -> tuple[int, bytes]:
+    """Returns the statuscode and the encoded Monitor reply with the history
+    (downsampled if `max_points` is set,
+    with fractional measurement times if `precise`)"""
+
     receipt = Receipt(
         sender=sender,
         executor=Services.MONITOR.title,
@@ -364,13 +462,29 @@ async def paramsdb(
         params=dict(
             start_time=start_timestamp,
             end_time=stop_timestamp,
+            precise=precise,
         ),
     )
-    resp = await cli.query(receipt)
-    return resp
-
-
-@app.post(f"/{Services.MONITOR.title}/setparams", tags=[Services.MONITOR.title])
+    if max_points is None:
+        statuscode, raw = await coalescer.query(receipt, raw=True)
+        return statuscode, check_raw(statuscode, raw)
+
+    resp = check_response(await coalescer.query(receipt))
+    if resp.response.statuscode == 1:
+        # the coalesced response is shared, so it is not changed in place
+        resp = copy.copy(resp)
+        resp.response = ReceiptResponse(
+            statuscode=resp.response.statuscode,
+            body=await asyncio.to_thread(
+                downsample_history, resp.response.body, max_points
+            ),
+            timestamp=resp.response.timestamp,
+        )
+    body = json.dumps(resp, cls=ReceiptJSONEncoder).encode("utf-8")
+    return resp.response.statuscode, body
+
+
+@router.post(f"/{Services.MONITOR.title}/setparams", tags=[Services.MONITOR.title])
 @response_provider
 async def setparamsdb(
     params: Annotated[dict[str, dict[str, float]], Body(embed=True)],
@@ -396,15 +510,72 @@ async def setparamsdb(
     return resp
 
 
+@router.get(f"/{Services.MONITOR.title}/flights", tags=[Services.MONITOR.title])
+@response_provider
+async def flights(
+    start_timestamp: Annotated[int, Query()],
+    stop_timestamp: Annotated[int | None, Query()] = None,
+    sender: Annotated[str, Query(max_length=50)] = "webcli",
+) -> Receipt:
+    """[WS Backend API]
+    Returns flight recordings (high-rate parameters around the triggers:
+    down, NACK, bad channel status) saved in the `monitor` microservice
+
+    Parameters
+    ----------
+    - **start_timestamp**: start of the trigger times (in seconds)
+    - **stop_timestamp**: stop of the trigger times (in seconds, now by default)
+    - **sender**: string identifier of the request sender
+    """
+
+    logging.info("Start monitor/flights task")
+    receipt = Receipt(
+        sender=sender,
+        executor=Services.MONITOR.title,
+        title="get_flights",
+        params=dict(
+            start_time=start_timestamp,
+            end_time=get_timestamp() if stop_timestamp is None else stop_timestamp,
+        ),
+    )
+    return await coalescer.query(receipt)
+
+
+@router.get(
+    f"/{Services.MONITOR.title}/flights/{{flight_id}}", tags=[Services.MONITOR.title]
+)
+@response_provider
+async def flight(
+    flight_id: int, sender: Annotated[str, Query(max_length=50)] = "webcli"
+) -> Receipt:
+    """[WS Backend API]
+    Returns samples of the flight recording
+    (rows `{"t", "V", "I", "status", "chidx"}` with sub-second times)
+
+    Parameters
+    ----------
+    - **flight_id**: identifier of the recording (see `/monitor/flights`)
+    - **sender**: string identifier of the request sender
+    """
+
+    logging.info("Start monitor/flight task")
+    receipt = Receipt(
+        sender=sender,
+        executor=Services.MONITOR.title,
+        title="get_flight",
+        params=dict(id=flight_id),
+    )
+    return await coalescer.query(receipt)
+
+
 # System check API routes
 
 
-@alru_cache(ttl=1)
 async def syscheck_status(
     sender: str = "webcli", receive_time: float | None = None
 ) -> Receipt:
     """Returns a status of System Check
-    (cache during 1 s)
+    (coalesced, cache during 1 s)
     """
 
     logging.debug("Start syscheck status")
@@ -414,11 +585,11 @@ async def syscheck_status(
         title="status",
         params={},
     )
-    response = await cli.query(receipt, receive_time)
+    response = await coalescer.query(receipt, receive_time)
     return response
 
 
-@app.get(f"/{Services.SYSCHECK.title}/status", tags=[Services.SYSCHECK.title])
+@router.get(f"/{Services.SYSCHECK.title}/status", tags=[Services.SYSCHECK.title])
 async def status_api(
     sender: Annotated[str, Query(max_length=50)] = "webcli"
 ) -> Receipt:
@@ -435,7 +606,32 @@ async def status_api(
     return resp
 
 
-@app.get(
+@router.get(f"/{Services.SYSCHECK.title}/telemetry", tags=[Services.SYSCHECK.title])
+@response_provider
+async def syscheck_telemetry(
+    sender: Annotated[str, Query(max_length=50)] = "webcli"
+) -> Receipt:
+    """[WS Backend API]
+    Gets execution statistics of the SystemCheck scripts
+    (execution time histograms, overruns, errors and sub-steps durations)
+
+    Parameters
+    ----------
+    - **sender**: string identifier of the request sender
+    """
+
+    logging.info("Start syscheck telemetry task")
+    receipt = Receipt(
+        sender=sender,
+        executor=Services.SYSCHECK.title,
+        title="telemetry",
+        params={},
+    )
+    resp = await cli.query(receipt)
+    return resp
+
+
+@router.get(
     f"/{Services.SYSCHECK.title}/is_interlock_follow", tags=[Services.SYSCHECK.title]
 )
 @response_provider
@@ -457,11 +653,11 @@ async def is_interlock_follow(
         title="status_autopilot",
         params={},
     )
-    resp = await cli.query(receipt)
+    resp = await coalescer.query(receipt)
     return resp
 
 
-@app.post(
+@router.post(
     f"/{Services.SYSCHECK.title}/set_interlock_follow", tags=[Services.SYSCHECK.title]
 )
 @response_provider
@@ -494,58 +690,398 @@ async def set_interlock_follow(
 # Events stream
 
 
-@app.get("/events/status", tags=["events"])
+async def system_status(sender: str, rcv_time: float) -> dict:
+    """Returns statuses of all microservices"""
+
+    async with asyncio.TaskGroup() as tg:
+        devback = tg.create_task(devback_status(sender, rcv_time))
+        monitor = tg.create_task(monitor_status(sender, rcv_time))
+        syscheck = tg.create_task(syscheck_status(sender, rcv_time))
+
+    response = {
+        Services.DEVBACK.title: devback.result().response,
+        Services.MONITOR.title: monitor.result().response,
+        Services.SYSCHECK.title: syscheck.result().response,
+    }
+    return response
+
+
+status_hub = StreamHub(1, system_status, sender="eventstream", rcv_time=1)
+params_hub = StreamHub(1, device_params, sender="eventstream")
+
+
+@router.get("/events/status", tags=["events"])
 async def devback_status_broadcast() -> EventSourceResponse:
     """Broadcaster of the all system status
-
-    Do not use different **senders** to acheive boost from cache functions
+    (one poller is shared by all subscribers)
     """
 
     logging.debug("Start events/status")
+    return EventSourceResponse(status_hub.subscribe(), send_timeout=5)
 
-    async def get_status(sender: str, rcv_time: float):
-        async with asyncio.TaskGroup() as tg:
-            devback = tg.create_task(devback_status(sender, rcv_time))
-            monitor = tg.create_task(monitor_status(sender, rcv_time))
-            syscheck = tg.create_task(syscheck_status(sender, rcv_time))
 
-        response = {
-            Services.DEVBACK.title: devback.result().response,
-            Services.MONITOR.title: monitor.result().response,
-            Services.SYSCHECK.title: syscheck.result().response,
-        }
-        return response
+@router.get(
+    f"/{Services.DEVBACK.title}/params_broadcast", tags=[Services.DEVBACK.title]
+)
+async def device_params_broadcast() -> EventSourceResponse:
+    """Broadcaster of the device backend parameters
+    (one poller is shared by all subscribers)
+    """
+
+    logging.info("Start devback/params_broadcast")
+    return EventSourceResponse(params_hub.subscribe(), send_timeout=5)
 
-    return EventSourceResponse(
-        broadcaster(1, get_status, sender="eventstream", rcv_time=1), send_timeout=5
+
+@router.websocket(f"/{Services.DEVBACK.title}/params_ws")
+async def device_params_ws(
+    websocket: WebSocket,
+    channels: str | None = None,
+    deadband: float = 0,
+    binary: bool = False,
+) -> None:
+    """Live device backend parameters
+    (full snapshot first and then only changed parameters)
+
+    Parameters
+    ----------
+    - **channels**: comma separated list of the subscribed channels (all by default)
+    - **deadband**: minimal change of the numeric parameter to be sent
+    - **binary**: send zlib compressed JSON in the binary frames
+
+    Messages
+    --------
+    - server: `{"type": "snapshot" | "delta", "timestamp": int, "params": {ch: {par: value}}}`
+      or `{"type": "error", "timestamp": int, "detail": str}`
+    - client (to change subscription): `{"channels": [str] | null, "deadband": float}`,
+      the socket is closed with the code 1003 on a malformed message
+    """
+
+    await websocket.accept()
+    logging.info("Start devback/params_ws")
+    encoder = ParamsDeltaEncoder(channels.split(",") if channels else None, deadband)
+
+    async def send(message: dict) -> None:
+        if binary:
+            await websocket.send_bytes(zlib.compress(json.dumps(message).encode()))
+        else:
+            await websocket.send_text(json.dumps(message))
+
+    async def receive_subscriptions() -> None:
+        while True:
+            try:
+                request = await websocket.receive_json()
+                logging.debug("New params_ws subscription %s", request)
+                encoder.subscribe(
+                    request.get("channels"), request.get("deadband", encoder.deadband)
+                )
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                logging.warning("Bad params_ws subscription: %s", e)
+                await websocket.close(code=1003, reason="Bad subscription message")
+                return
+
+    subscription = params_hub.subscribe(raw=True)
+    reader = asyncio.create_task(receive_subscriptions())
+    try:
+        async for receipt in subscription:
+            if reader.done():
+                break
+            response = receipt.response
+            if isinstance(response, ReceiptResponseError) or response.statuscode != 1:
+                await send(
+                    dict(
+                        type="error", timestamp=response.timestamp, detail=response.body
+                    )
+                )
+                continue
+            message = encoder.encode(response.body["params"], response.timestamp)
+            if message is not None:
+                await send(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        logging.info("Disconnected from params_ws client")
+        reader.cancel()
+        try:
+            await reader
+        except (asyncio.CancelledError, WebSocketDisconnect):
+            pass
+        except Exception:
+            logging.error("params_ws reader failed", exc_info=True)
+        await subscription.aclose()
+
+
+@router.get("/gateway/stats", tags=["gateway"])
+async def gateway_stats() -> dict:
+    """Returns WebService counters
+    (coalesced requests and broadcasting hubs)
+    """
+
+    return dict(
+        worker=os.getpid(),
+        coalescer=coalescer.counters,
+        limiter=dict(queue_size=limiter.queue_size, routes=limiter.counters),
+        history_cache=dict(
+            entries=len(history_cache),
+            size=history_cache.size,
+            **history_cache.counters,
+        ),
+        hubs=dict(
+            status=dict(subscribers=len(status_hub.subscribers), **status_hub.counters),
+            params=dict(subscribers=len(params_hub.subscribers), **params_hub.counters),
+        ),
+        bus=params_bus.counters if params_bus is not None else None,
     )
 
 
-@app.get(f"/{Services.DEVBACK.title}/params_broadcast", tags=[Services.DEVBACK.title])
-async def device_params_broadcast() -> EventSourceResponse:
-    """Broadcaster of the device backend parameters
+def gateway_metrics() -> dict:
+    """Returns metrics snapshot of the worker
+    (own metrics and gateway counters)"""
 
-    Do not use sender to acheive the boost from cache function
+    snapshot = REGISTRY.snapshot()
+    counters, gauges = snapshot["counters"], snapshot["gauges"]
+    for result, value in coalescer.counters.items():
+        counters.append(
+            dict(
+                name="caen_ws_coalescer_total", labels=dict(result=result), value=value
+            )
+        )
+    for route, route_counters in limiter.counters.items():
+        for result, value in route_counters.items():
+            counters.append(
+                dict(
+                    name="caen_ws_limiter_total",
+                    labels=dict(route=route, result=result),
+                    value=value,
+                )
+            )
+    gauges.append(
+        dict(name="caen_ws_limiter_queue", labels={}, value=limiter.queue_size)
+    )
+    return snapshot
+
+
+@router.get("/metrics", tags=["gateway"], response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Returns metrics of all services in the Prometheus text format
+    (`caen_up` is 0 for the services not answered in 1 s)
     """
 
-    logging.info("Start devback/params_broadcast")
-    delay = 1  # in seconds
-    return EventSourceResponse(
-        broadcaster(delay, device_params, sender="eventstream"), send_timeout=5
+    async def service_metrics(service: Services) -> dict | None:
+        receipt = Receipt(
+            sender="metrics", executor=service.title, title="metrics", params={}
+        )
+        resp = await cli.query(receipt, 1)
+        if resp.response.statuscode != 1:
+            return None
+        return resp.response.body
+
+    snapshots = dict(webservice=gateway_metrics())
+    results = await asyncio.gather(*map(service_metrics, Services))
+    for service, snapshot in zip(Services, results):
+        up = dict(name="caen_up", labels={}, value=int(snapshot is not None))
+        snapshot = dict() if snapshot is None else snapshot
+        snapshot.setdefault("gauges", []).append(up)
+        snapshots[service.title] = snapshot
+    return PlainTextResponse(
+        to_prometheus(snapshots), media_type="text/plain; version=0.0.4"
+    )
+
+
+@router.get("/gateway/traces", tags=["gateway"])
+async def traces(service: str | None = None) -> dict:
+    """Returns recent slow traces
+    (receipts with the timing breakdown of the queue, execution and transport)
+
+    Parameters
+    ----------
+    - **service**: title of the service (`webservice` or the microservice, all by default)
+    """
+
+    async def service_traces(service: Services) -> list | str:
+        receipt = Receipt(
+            sender="traces", executor=service.title, title="traces", params={}
+        )
+        resp = await cli.query(receipt, 1)
+        return resp.response.body
+
+    services = [s for s in Services if service in (None, s.title)]
+    bodies = await asyncio.gather(*map(service_traces, services))
+    result = {s.title: body for s, body in zip(services, bodies)}
+    if service in (None, "webservice"):
+        result["webservice"] = tracing.SLOW_TRACES.snapshot()
+    return result
+
+
+def read_settings(configpath: str | None) -> configparser.ConfigParser:
+    """Reads WebService config (the default one if `configpath` is None)"""
+
+    if configpath is None:
+        return config_processor(None)
+    with open(configpath, encoding="utf-8") as configfile:
+        return config_processor(configfile)
+
+
+def logging_kwargs(config: configparser.ConfigParser) -> dict:
+    """Returns keyword arguments of the `get_logging_config`"""
+
+    return dict(
+        level=config.get("ws", "loglevel"), filepath=config.get("ws", "logfile")
+    )
+
+
+def upstream_address(config: configparser.ConfigParser) -> str:
+    """Returns the address of the upstream process shared by the workers
+    (empty if there is only one worker)"""
+
+    if config.getint("ws", "workers") > 1:
+        return config.get("ws", "upstream")
+    return ""
+
+
+def create_app() -> FastAPI:
+    """WebService application factory
+    (runs in every worker process)
+
+    Notes
+    -----
+    The config path is taken from the `CAEN_WS_CONFIG` environment variable.
+    If there are several workers, coalescable read queries
+    go through the shared upstream process (see caen_tools.WebService.upstream),
+    its address is taken from the `CAEN_WS_UPSTREAM` environment variable
+    set by `main` (the config decides if the variable is not set)
+    """
+
+    global settings, cli, coalescer, history_cache, limiter, params_bus
+
+    settings = read_settings(os.environ.get(CONFIG_ENV))
+    get_logging_config(**logging_kwargs(settings))
+    logging.info(
+        "Start WebService worker %d with arguments %s",
+        os.getpid(),
+        dict(settings.items("ws")),
+    )
+
+    receive_time = settings.get("ws", "receive_time")
+    cli = AsyncClient({s.title: s.address(settings) for s in Services}, receive_time)
+    upstream = os.environ.get(UPSTREAM_ENV, upstream_address(settings))
+    if upstream:
+        upstream_cli = AsyncClient({s.title: upstream for s in Services}, receive_time)
+        coalescer = RequestCoalescer(upstream_cli, ttl=1)
+    else:
+        coalescer = RequestCoalescer(cli, ttl=1)
+    history_cache = ResponseLRU(settings.getint("ws", "history_cache_size") << 20)
+    limiter = RateLimiter(
+        sender_limit=(
+            settings.getfloat("ws.limits", "sender_rate"),
+            settings.getfloat("ws.limits", "sender_burst"),
+        ),
+        route_limit=(
+            settings.getfloat("ws.limits", "route_rate"),
+            settings.getfloat("ws.limits", "route_burst"),
+        ),
+        route_limits=parse_route_limits(settings.get("ws.limits", "route_limits")),
+        max_wait=settings.getfloat("ws.limits", "max_wait"),
+    )
+    max_age = settings.getfloat("ws", "device_pub_max_age", fallback=3)
+    params_bus = (
+        ParamsSubscriber(settings.get("ws", "device_pub"), max_age)
+        if settings.get("ws", "device_pub", fallback="")
+        else None
+    )
+    if settings.get("ws", "device_shm", fallback=""):
+        params_bus = SharedParams(
+            settings.get("ws", "device_shm"), max_age, fallback=params_bus
+        )
+
+    app = FastAPI(
+        title="CAEN Manager App",
+        summary="Application to run high voltage on CAEN",
+        version="1.0",
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
     )
+    app.add_middleware(ServerTimingMiddleware)
+    app.include_router(router)
+    return app
+
+
+def last_scream(config: configparser.ConfigParser) -> None:
+    """Actions on shutdown server"""
+
+    logging.info("Start server shutdown actions")
+
+    subslist = list(
+        filter(lambda x: ("@" in x), config.get("ws", "subscribers").split("\n"))
+    )
+    logging.info("Send shutdown info emails to %s", subslist)
+    send_mail(subslist, "CAEN WebServer shutdown", "Hello! WebServer shutdown.")
+    return
 
 
 def main():
     """Runs server"""
 
-    # 192.168.173.217:8000
-    uvicorn.run(
-        "caen_tools.WebService.ws:app",
-        port=settings.getint("ws", "port"),
-        host=settings.get("ws", "host"),
-        log_config=None,
-        # workers=1,
+    parser = argparse.ArgumentParser(description="CAEN Manager WebService")
+    parser.add_argument(
+        "-c",
+        "--config",
+        required=False,
+        type=argparse.FileType("r"),
+        help="Config file",
+        nargs="?",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, help="Number of workers (workers from config)"
     )
+    console_args = parser.parse_args()
+    config = config_processor(console_args.config)
+    if console_args.config is not None:
+        os.environ[CONFIG_ENV] = os.path.abspath(console_args.config.name)
+    if console_args.workers is not None:
+        config.set("ws", "workers", str(console_args.workers))
+    workers = config.getint("ws", "workers")
+    # the workers follow the effective worker count, not their copy of the config
+    os.environ[UPSTREAM_ENV] = upstream_address(config)
+
+    get_logging_config(**logging_kwargs(config))
+    logging.info("Start WebService with %d workers", workers)
+    frontend.precompress()
+
+    upstream = None
+    if os.environ[UPSTREAM_ENV]:
+        upstream = multiprocessing.Process(
+            target=upstream_run,
+            args=(
+                {s.title: s.address(config) for s in Services},
+                os.environ[UPSTREAM_ENV],
+                config.getfloat("ws", "receive_time"),
+                logging_kwargs(config),
+            ),
+            name="ws-upstream",
+            daemon=True,
+        )
+        upstream.start()
+
+    try:
+        # 192.168.173.217:8000
+        uvicorn.run(
+            "caen_tools.WebService.ws:create_app",
+            factory=True,
+            port=config.getint("ws", "port"),
+            host=config.get("ws", "host"),
+            log_config=None,
+            workers=workers,
+        )
+    finally:
+        if upstream is not None:
+            upstream.terminate()
+            upstream.join()
+        last_scream(config)
 
 
 if __name__ == "__main__":
@@ -4,9 +4,12 @@ from abc import ABC
 from typing import Dict
 import json
 import logging
+import time
 import zmq
 import zmq.asyncio
 
+from caen_tools.utils import tracing
+from caen_tools.utils.metrics import REGISTRY, Names
 from caen_tools.utils.receipt import Receipt, ReceiptJSONEncoder, ReceiptJSONDecoder
 from caen_tools.utils.resperrs import RResponseErrors
 
@@ -49,6 +52,44 @@ class AsyncClient(BaseClient):
         self.connect_addresses = connect_addresses
         super().__init__(context, int(receive_time))
 
+    async def __exchange(
+        self, receipt: Receipt, receive_time: float | None
+    ) -> list[bytes] | None:
+        """Sends the receipt and returns reply frames (None on timeout)"""
+
+        tracing.start(receipt)
+        timeout = receive_time if receive_time is not None else self.recv_time
+        if timeout:
+            deadline = time.time() + timeout
+            if receipt.deadline is None or deadline < receipt.deadline:
+                receipt.deadline = deadline
+        receipt_str = json.dumps(receipt, cls=ReceiptJSONEncoder).encode("utf-8")
+        s = self.context.socket(zmq.DEALER)
+        connect_address = self.connect_addresses[receipt.executor]
+
+        if receive_time is not None:
+            s.setsockopt(zmq.RCVTIMEO, receive_time * 1000)
+
+        response = None
+        labels = dict(executor=receipt.executor)
+        REGISTRY.inc(Names.CLIENT_QUERIES, title=receipt.title, **labels)
+        with s.connect(connect_address) as sock:
+            await sock.send_multipart([b"", receipt_str])
+
+            try:
+                with REGISTRY.timer(
+                    Names.CLIENT_DURATION, Names.CLIENT_IN_FLIGHT, **labels
+                ):
+                    response = await sock.recv_multipart()
+            except zmq.error.Again:
+                REGISTRY.inc(Names.CLIENT_TIMEOUTS, **labels)
+                logging.warning("No response from executor %s", receipt.executor)
+
+        s.setsockopt(zmq.LINGER, 0)
+        s.close()
+
+        return response
+
     async def query(
         self, receipt: Receipt, receive_time: float | None = None
     ) -> Receipt:
@@ -79,29 +120,57 @@ class AsyncClient(BaseClient):
             )
             return receipt
 
-        receipt_str = json.dumps(receipt, cls=ReceiptJSONEncoder).encode("utf-8")
-        s = self.context.socket(zmq.DEALER)
-        connect_address = self.connect_addresses[receipt.executor]
+        response = await self.__exchange(receipt, receive_time)
+        if response is None:
+            receipt.response = RResponseErrors.GatewayTimeout(
+                f"No response from {receipt.executor} service"
+            )
+            return receipt
 
-        if receive_time is not None:
-            s.setsockopt(zmq.RCVTIMEO, receive_time * 1000)
+        receipt_out = json.loads(response[1].decode("utf-8"), cls=ReceiptJSONDecoder)
+        tracing.collect(receipt_out)
+        return receipt_out
 
-        with s.connect(connect_address) as sock:
-            await sock.send_multipart([b"", receipt_str])
+    async def query_raw(
+        self, receipt: Receipt, receive_time: float | None = None
+    ) -> tuple[int, bytes]:
+        """Query and response without decoding of the response receipt
 
-            try:
-                response = await sock.recv_multipart()
-                receipt_out = json.loads(
-                    response[1].decode("utf-8"), cls=ReceiptJSONDecoder
-                )
-            except zmq.error.Again:
-                logging.warning("No response from executor %s", receipt.executor)
+        Parameters
+        ----------
+        receipt : Receipt
+            instruction with full information
+            about sender, executor and task
+        receive_time : float | None, None
+             waiting answer time for the response from the client (in seconds)
+
+        Returns
+        -------
+        tuple[int, bytes]
+            statuscode of the response and the encoded response receipt
+        """
+
+        if receipt.executor not in self.connect_addresses:
+            receipt_out = await self.query(receipt, receive_time)
+        else:
+            response = await self.__exchange(receipt, receive_time)
+            if response is not None and len(response) > 2:
+                header = json.loads(response[2].decode("utf-8"))
+                # the request receipt carries the timing of the forwarded one
+                receipt.spans = header.get("spans", receipt.spans)
+                tracing.collect(receipt)
+                return header["statuscode"], response[1]
+
+            if response is None:
                 receipt_out = receipt
                 receipt_out.response = RResponseErrors.GatewayTimeout(
-                    f"No response from {receipt_out.executor} service"
+                    f"No response from {receipt.executor} service"
                 )
+            else:  # no header frame in the response
+                receipt_out = json.loads(
+                    response[1].decode("utf-8"), cls=ReceiptJSONDecoder
+                )
+                tracing.collect(receipt_out)
 
-        s.setsockopt(zmq.LINGER, 0)
-        s.close()
-
-        return receipt_out
+        receipt_str = json.dumps(receipt_out, cls=ReceiptJSONEncoder)
+        return receipt_out.response.statuscode, receipt_str.encode("utf-8")
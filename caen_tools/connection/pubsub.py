@@ -0,0 +1,214 @@
+"""Publish/subscribe telemetry bus (based on zmq.PUB and zmq.SUB sockets)
+
+Every message has three frames:
+* topic (subscribers filter messages by the topic prefix)
+* header `{"seq": int, "timestamp": float}` (`seq` is counted per topic,
+  `timestamp` is the time of the data, e.g. the measurement time of the parameters)
+* JSON body
+"""
+
+from typing import Any, Tuple
+import asyncio
+import json
+import logging
+import time
+
+import zmq.asyncio
+from caen_tools.utils.metrics import REGISTRY, Names
+
+# topic prefix of the device parameters (followed by the board name)
+PARAMS_TOPIC = "params/"
+
+
+def board_topics(map_config: dict) -> dict[str, str]:
+    """Returns topics of the channels by their aliases
+    (one topic per board of the `board_info` of the map config)"""
+
+    return {
+        str(alias): f"{PARAMS_TOPIC}{board}"
+        for board, info in map_config["board_info"].items()
+        for alias in info["aliases"]
+    }
+
+
+class Publisher:
+    """Publisher of the telemetry messages
+
+    Parameters
+    ----------
+    bind_addr : str
+        address for binding (e.g. "tcp://*:5572")
+    sndhwm : int, default 100
+        high water mark of the outgoing messages
+        (slow subscribers lose messages beyond it)
+    """
+
+    def __init__(self, bind_addr: str, sndhwm: int = 100):
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.PUB)
+        self.socket.setsockopt(zmq.SNDHWM, sndhwm)
+        self.socket.bind(bind_addr)
+        self.bind_addr = bind_addr
+        self.seq: dict[str, int] = dict()
+
+    def __del__(self):
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.close()
+        self.context.term()
+
+    async def publish(
+        self, topic: str, body: Any, timestamp: float | None = None
+    ) -> int:
+        """Publishes the body on the topic
+
+        Parameters
+        ----------
+        topic : str
+            topic of the message
+        body : Any
+            JSON serializable body of the message
+        timestamp : float | None, default None
+            time of the data in the body (current time by default)
+
+        Returns
+        -------
+        int
+            sequence number of the message
+        """
+
+        seq = self.seq.get(topic, 0) + 1
+        self.seq[topic] = seq
+        if timestamp is None:
+            timestamp = time.time()
+        header = json.dumps(dict(seq=seq, timestamp=timestamp)).encode("utf-8")
+        await self.socket.send_multipart(
+            [topic.encode("utf-8"), header, json.dumps(body).encode("utf-8")]
+        )
+        REGISTRY.inc(Names.PUB_MESSAGES, topic=topic)
+        return seq
+
+
+class Subscriber:
+    """Subscriber of the telemetry messages
+
+    Parameters
+    ----------
+    connect_addr : str
+        publisher address (e.g. "tcp://localhost:5572")
+    topics : list[str] | None, default None
+        subscribed topic prefixes (all topics by default)
+    rcvhwm : int, default 100
+        high water mark of the incoming messages
+    """
+
+    def __init__(
+        self, connect_addr: str, topics: list[str] | None = None, rcvhwm: int = 100
+    ):
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.SUB)
+        self.socket.setsockopt(zmq.RCVHWM, rcvhwm)
+        for topic in topics or [""]:
+            self.socket.setsockopt_string(zmq.SUBSCRIBE, topic)
+        self.socket.connect(connect_addr)
+        self.connect_addr = connect_addr
+        self.seq: dict[str, int] = dict()
+        self.counters = dict(received=0, gaps=0, lost=0)
+
+    def __del__(self):
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.close()
+        self.context.term()
+
+    def check_seq(self, topic: str, seq: int) -> None:
+        """Counts lost messages of the topic by the gaps in sequence numbers
+        (the sequence restarts with the publisher)"""
+
+        last = self.seq.get(topic)
+        self.seq[topic] = seq
+        if last is None or seq <= last or seq == last + 1:
+            return
+        self.counters["gaps"] += 1
+        self.counters["lost"] += seq - last - 1
+        REGISTRY.inc(Names.SUB_LOST, seq - last - 1, topic=topic)
+        logging.warning("Lost %d messages of %s", seq - last - 1, topic)
+
+    async def recv(self) -> Tuple[str, dict, Any]:
+        """Waits the next message
+
+        Returns
+        -------
+        Tuple[str, dict, Any]
+            topic, header and body of the message
+        """
+
+        topic, header, body = await self.socket.recv_multipart()
+        topic = topic.decode("utf-8")
+        header = json.loads(header)
+        self.check_seq(topic, header["seq"])
+        self.counters["received"] += 1
+        REGISTRY.inc(Names.SUB_MESSAGES, topic=topic)
+        return topic, header, json.loads(body)
+
+
+class ParamsSubscriber(Subscriber):
+    """Keeps the latest device parameters published by DeviceBackend
+
+    Parameters
+    ----------
+    connect_addr : str
+        DeviceBackend publisher address
+    max_age : float, default 3
+        maximal age of the board parameters to be used (in seconds)
+    """
+
+    def __init__(self, connect_addr: str, max_age: float = 3):
+        super().__init__(connect_addr, [PARAMS_TOPIC])
+        self.max_age = max_age
+        self.boards: dict[str, Tuple[float, dict]] = dict()
+        self.task: asyncio.Task | None = None
+
+    async def run(self) -> None:
+        """Receives messages forever"""
+
+        while True:
+            topic, header, body = await self.recv()
+            self.boards[topic] = (header["timestamp"], body["params"])
+
+    def start(self) -> None:
+        """Starts receiving in the background (if it is not started yet)"""
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def params(self, parameters: list[str] | None = None) -> Tuple[float, dict] | None:
+        """Returns the latest parameters of all channels
+
+        Parameters
+        ----------
+        parameters : list[str] | None, default None
+            selected parameters (all by default)
+
+        Returns
+        -------
+        Tuple[float, dict] | None
+            timestamp of the oldest board and parameters by the channel aliases
+            or None if there are no fresh parameters of every known board
+            (the caller falls back to the `params` request)
+        """
+
+        if not self.boards:
+            return None
+        oldest = min(timestamp for timestamp, _ in self.boards.values())
+        if time.time() - oldest > self.max_age:
+            return None
+
+        out = dict()
+        for _, channels in self.boards.values():
+            for alias, values in channels.items():
+                if parameters is None:
+                    out[alias] = values
+                elif all(p in values for p in parameters):
+                    out[alias] = {p: values[p] for p in parameters}
+                else:
+                    return None
+        return oldest, out
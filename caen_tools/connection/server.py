@@ -1,17 +1,27 @@
 """Base zmq Server implementation"""
 
 from typing import Tuple
+import asyncio
+import configparser
 import json
 import logging
+import time
 
 import zmq.asyncio
+from caen_tools.utils import tracing
+from caen_tools.utils.metrics import REGISTRY, Names
 from caen_tools.utils.receipt import Receipt, ReceiptJSONDecoder, ReceiptJSONEncoder
+from caen_tools.utils.resperrs import RResponseErrors
 
 
 class RouterServer:
     """Implementation of the async server (zmq.ROUTER) (for DeviceBackend firstly)
     (this one receives data from outer space and interacts with the device)
 
+    Received receipts wait for the execution in the admission queue
+    of the limited depth, the new ones are answered by
+    `RResponseErrors.ServiceUnavailable` immediately when it is full
+
     Parameters
     ----------
     connect_addr: str
@@ -21,13 +31,31 @@ class RouterServer:
             "tcp://*:5560" to bind 5560 port
     identity: str
         identity name of the socket (default is 'deviceback')
+    max_queue: int, default 64
+        maximal number of receipts waiting for the execution
+    rcvhwm: int, default 1000
+        high water mark of the incoming messages of the socket
+    sndhwm: int, default 1000
+        high water mark of the outgoing messages of the socket
+    send_timeout: float, default 10
+        waiting time of the reply sending (in seconds)
     """
 
-    def __init__(self, connect_addr: str, identity: str = "deviceback"):
+    def __init__(
+        self,
+        connect_addr: str,
+        identity: str = "deviceback",
+        max_queue: int = 64,
+        rcvhwm: int = 1000,
+        sndhwm: int = 1000,
+        send_timeout: float = 10,
+    ):
         self.context = zmq.asyncio.Context()
-        self.__configure_context()
 
         self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.RCVHWM, rcvhwm)
+        self.socket.setsockopt(zmq.SNDHWM, sndhwm)
+        self.socket.setsockopt(zmq.SNDTIMEO, int(send_timeout * 1000))
         self.connect_addr = connect_addr
         self.socket.setsockopt_string(zmq.IDENTITY, identity)
         if "*" in connect_addr:
@@ -35,30 +63,157 @@ class RouterServer:
         else:
             self.socket.connect(connect_addr)
 
-    def __configure_context(self):
-        self.context.setsockopt(zmq.RCVHWM, 1)
-        self.context.setsockopt(zmq.SNDTIMEO, 10_000)
+        self.queue: asyncio.Queue[Tuple[bytes, Receipt]] = asyncio.Queue(max_queue)
+        self.__reader: asyncio.Task | None = None
 
     def __del__(self):
         self.socket.setsockopt(zmq.LINGER, 0)
         self.socket.close()
         self.context.term()
 
-    async def recv_receipt(self) -> Tuple[bytes, Receipt]:
-        """Gets a receipt from the socket"""
-        client, _, receipt_str = await self.socket.recv_multipart()
+    @property
+    def queue_depth(self) -> int:
+        """Number of receipts waiting for the execution"""
+        return self.queue.qsize()
+
+    def __expired(self, client: bytes, receipt: Receipt) -> bool:
+        """Checks the receipt deadline (the expired one is counted and logged)"""
+
+        if receipt.deadline is None or receipt.deadline > time.time():
+            return False
+        REGISTRY.inc(Names.SERVER_EXPIRED, title=receipt.title)
+        logging.warning(
+            "Drop expired receipt %s from %s (%.3f s late)",
+            receipt.title,
+            client,
+            time.time() - receipt.deadline,
+        )
+        return True
+
+    async def __receive(self) -> None:
+        """Moves receipts from the socket to the admission queue"""
+
+        while True:
+            frames = await self.socket.recv_multipart()
+            try:
+                await self.__admit(frames)
+            except Exception:
+                logging.error("Not admitted message %s", frames[:1], exc_info=True)
+
+    async def __admit(self, frames: list[bytes]) -> None:
+        """Decodes the message and puts the receipt into the admission queue
+        (or rejects it if the queue is full)"""
+
+        client, _, receipt_str = frames
         logging.debug("Success recv_multipart from %s", client)
 
         receipt = json.loads(receipt_str.decode("utf-8"), cls=ReceiptJSONDecoder)
-        return (client, receipt)
+        if not isinstance(receipt, Receipt):
+            raise ValueError(f"Not a receipt: {receipt_str[:100]!r}")
+        tracing.mark(receipt, tracing.Events.SERVER_RECEIVE)
+        REGISTRY.inc(Names.SERVER_RECEIVED, title=receipt.title)
+        if self.__expired(client, receipt):
+            return
+
+        if self.queue.full():
+            REGISTRY.inc(Names.SERVER_REJECTED, title=receipt.title)
+            logging.warning(
+                "Reject %s from %s, the queue is full", receipt.title, client
+            )
+            receipt.response = RResponseErrors.ServiceUnavailable(
+                f"Server error: queue is full ({self.queue.maxsize} receipts)"
+            )
+            tracing.mark(receipt, tracing.Events.SERVER_REPLY)
+            await self.__send(client, receipt)
+            return
+
+        self.queue.put_nowait((client, receipt))
+        REGISTRY.add(Names.SERVER_QUEUE_DEPTH, 1)
+        REGISTRY.add(Names.SERVER_IN_FLIGHT, 1)
+
+    def __start_reader(self) -> None:
+        """Starts the reader task (again if it was finished)"""
+
+        if self.__reader is not None and self.__reader.done():
+            if self.__reader.cancelled():
+                logging.warning("Server reader was cancelled, restart it")
+            else:
+                logging.error(
+                    "Server reader failed, restart it",
+                    exc_info=self.__reader.exception(),
+                )
+        if self.__reader is None or self.__reader.done():
+            self.__reader = asyncio.ensure_future(self.__receive())
+            self.__reader.add_done_callback(self.__reader_done)
+
+    def __reader_done(self, task: asyncio.Task) -> None:
+        # receipts waiting in recv_receipt need the reader
+        # (it is cancelled only on the shutdown)
+        if not task.cancelled():
+            self.__start_reader()
+
+    async def recv_receipt(self) -> Tuple[bytes, Receipt]:
+        """Gets a receipt from the admission queue
+
+        Notes
+        -----
+        Receipts with the passed deadline are dropped without reply
+        (the client is not waiting for them anymore)
+        """
+
+        if self.__reader is None or self.__reader.done():
+            self.__start_reader()
+
+        while True:
+            client, receipt = await self.queue.get()
+            REGISTRY.add(Names.SERVER_QUEUE_DEPTH, -1)
+            if not self.__expired(client, receipt):
+                return (client, receipt)
+            REGISTRY.add(Names.SERVER_IN_FLIGHT, -1)
 
     async def send_receipt(self, address: bytes, receipt: Receipt) -> None:
-        """Sends a status back"""
+        """Sends a status back
+
+        Notes
+        -----
+        The reply contains an extra frame with the small response header
+        (`{"statuscode": int, "spans": list}`) to let clients forward the receipt
+        without decoding (and still collect its timing)
+        """
+        REGISTRY.add(Names.SERVER_IN_FLIGHT, -1)
+        tracing.mark(receipt, tracing.Events.SERVER_REPLY)
+        received = tracing.event_time(receipt, tracing.Events.SERVER_RECEIVE)
+        if received is not None:
+            tracing.SLOW_TRACES.add(receipt, receipt.spans[-1][1] - received)
+        await self.__send(address, receipt)
+
+    async def __send(self, address: bytes, receipt: Receipt) -> None:
         separator = b""
         receipt_str = json.dumps(receipt, cls=ReceiptJSONEncoder).encode("utf-8")
+        header = json.dumps(
+            dict(
+                statuscode=(
+                    receipt.response.statuscode if receipt.response is not None else 0
+                ),
+                spans=receipt.spans,
+            )
+        ).encode("utf-8")
         try:
-            await self.socket.send_multipart([address, separator, receipt_str])
+            await self.socket.send_multipart([address, separator, receipt_str, header])
+            REGISTRY.inc(Names.SERVER_SENT, title=receipt.title)
             logging.debug("Success send multipart to %s", address)
         except zmq.error.Again:
+            REGISTRY.inc(Names.SERVER_SEND_FAILURES, title=receipt.title)
             logging.error("Send_multipart failed. Exeeded sending time")
         return
+
+
+def server_options(settings: configparser.ConfigParser, section: str) -> dict:
+    """Reads RouterServer queue options from the config section"""
+
+    return dict(
+        max_queue=settings.getint(section, "max_queue", fallback=64),
+        rcvhwm=settings.getint(section, "rcvhwm", fallback=1000),
+        sndhwm=settings.getint(section, "sndhwm", fallback=1000),
+        send_timeout=settings.getfloat(section, "send_timeout", fallback=10),
+    )
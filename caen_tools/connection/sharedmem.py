@@ -0,0 +1,286 @@
+"""Same-host channel of the device parameters in the shared memory
+
+DeviceBackend writes the latest snapshot into the fixed-layout segment,
+local consumers read it without requests and serialization.
+The segment is protected by the seqlock: the writer makes the sequence number
+odd before the update and even after it, the reader retries the copy
+if the number was odd or changed during the copy.
+
+Segment layout (native byte order)
+* sequence number (uint64)
+* measurement time of the snapshot (float64)
+* layout length (uint64) and JSON layout `{"aliases": [...], "params": [...], "ints": [...]}`
+  (padded to 8 bytes)
+* float64 values, `params` of every channel in the `aliases` order
+  (NaN if the value is missing)
+"""
+
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple
+import json
+import logging
+import math
+import time
+
+from caen_tools.connection.pubsub import ParamsSubscriber
+
+HEADER_SIZE = 24
+
+
+def channel_aliases(map_config: dict) -> list[str]:
+    """Returns channel aliases in the order of the `board_info` of the map config"""
+
+    return [
+        str(alias)
+        for info in map_config["board_info"].values()
+        for alias in info["aliases"]
+    ]
+
+
+class SnapshotWriter:
+    """Writer of the parameters snapshots into the shared memory segment
+
+    The segment is created on the first write:
+    its parameters are the numeric ones of the first snapshot
+
+    Parameters
+    ----------
+    name : str
+        name of the segment
+    aliases : list[str]
+        channel aliases (see channel_aliases)
+    """
+
+    def __init__(self, name: str, aliases: list[str]):
+        self.name = name
+        self.aliases = aliases
+        self.index = {alias: i for i, alias in enumerate(aliases)}
+        self.parameters: list[str] = []
+        self.shm: SharedMemory | None = None
+
+    def __create(self, snapshot: dict[str, dict]) -> None:
+        first = next(iter(snapshot.values()), {})
+        numeric = {
+            p: v
+            for p, v in first.items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool)
+        }
+        self.parameters = sorted(numeric)
+        layout = json.dumps(
+            dict(
+                aliases=self.aliases,
+                params=self.parameters,
+                ints=[p for p, v in numeric.items() if isinstance(v, int)],
+            )
+        ).encode("utf-8")
+        self.offset = HEADER_SIZE + (len(layout) + 7) // 8 * 8
+        size = self.offset + 8 * len(self.aliases) * len(self.parameters)
+
+        try:
+            stale = SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            logging.warning("Stale shared memory %s is removed", self.name)
+        except FileNotFoundError:
+            pass
+        self.shm = SharedMemory(self.name, create=True, size=size)
+        self.shm.buf[HEADER_SIZE : HEADER_SIZE + len(layout)] = layout
+        self.shm.buf[:HEADER_SIZE].cast("Q")[2] = len(layout)
+        self.values = self.shm.buf[self.offset : size].cast("d")
+        for i in range(len(self.values)):
+            self.values[i] = math.nan
+        logging.info(
+            "Shared memory %s: %d channels, parameters %s",
+            self.name,
+            len(self.aliases),
+            self.parameters,
+        )
+
+    def write(self, snapshot: dict[str, dict], timestamp: float) -> None:
+        """Writes parameters of the channels `{alias: {par: value}}`
+        (channels missing from the snapshot are cleared, so their old values
+        are not read as fresh ones)"""
+
+        if self.shm is None:
+            self.__create(snapshot)
+
+        header = self.shm.buf[:HEADER_SIZE]
+        seq = header.cast("Q")
+        seq[0] += 1
+        nparams = len(self.parameters)
+        written = set()
+        for alias, values in snapshot.items():
+            i = self.index.get(str(alias))
+            if i is None:
+                continue
+            written.add(i)
+            for j, p in enumerate(self.parameters):
+                self.values[i * nparams + j] = values.get(p, math.nan)
+        for i in range(len(self.aliases)):
+            if i not in written:
+                for j in range(i * nparams, (i + 1) * nparams):
+                    self.values[j] = math.nan
+        header.cast("d")[1] = timestamp
+        seq[0] += 1
+
+    def close(self) -> None:
+        """Removes the segment"""
+
+        if self.shm is not None:
+            self.values.release()
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class SharedParams:
+    """Reader of the latest parameters from the shared memory segment
+    (the same interface as caen_tools.connection.pubsub.ParamsSubscriber)
+
+    The segment is attached on demand and re-attached
+    when its parameters become stale (e.g. DeviceBackend was restarted)
+
+    Parameters
+    ----------
+    name : str
+        name of the segment
+    max_age : float, default 3
+        maximal age of the parameters to be used (in seconds);
+        consumers with the stricter requirements check the returned timestamp
+        (e.g. HealthControl uses parameters younger than its period only)
+    retries : int, default 100
+        number of copy attempts while the writer updates the segment
+    fallback : ParamsSubscriber | None, default None
+        source of the parameters if there are no fresh ones in the segment
+        (e.g. DeviceBackend runs on the other host)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_age: float = 3,
+        retries: int = 100,
+        fallback: ParamsSubscriber | None = None,
+    ):
+        self.name = name
+        self.max_age = max_age
+        self.retries = retries
+        self.fallback = fallback
+        self.shm: SharedMemory | None = None
+        self.counters = dict(reads=0, retries=0, attaches=0, fallbacks=0)
+
+    def start(self) -> None:
+        """Starts the fallback (the segment is read on demand)"""
+
+        if self.fallback is not None:
+            self.fallback.start()
+
+    def attach(self) -> bool:
+        """Attaches the segment and reads its layout"""
+
+        try:
+            self.shm = SharedMemory(self.name)
+        except FileNotFoundError:
+            return False
+        # the segment belongs to the writer: the resource tracker of the reader
+        # must not unlink it when the reader exits (bpo-39959)
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        length = self.shm.buf[:HEADER_SIZE].cast("Q")[2]
+        layout = json.loads(bytes(self.shm.buf[HEADER_SIZE : HEADER_SIZE + length]))
+        self.aliases = layout["aliases"]
+        self.parameters = layout["params"]
+        self.ints = set(layout["ints"])
+        offset = HEADER_SIZE + (length + 7) // 8 * 8
+        size = 8 * len(self.aliases) * len(self.parameters)
+        self.header = self.shm.buf[:HEADER_SIZE]
+        self.seq = self.header.cast("Q")
+        self.timestamp = self.header.cast("d")
+        self.values = self.shm.buf[offset : offset + size].cast("d")
+        self.local = memoryview(bytearray(size)).cast("d")
+        self.counters["attaches"] += 1
+        return True
+
+    def close(self) -> None:
+        """Detaches the segment"""
+
+        if self.shm is not None:
+            for view in (self.values, self.seq, self.timestamp, self.header):
+                view.release()
+            self.shm.close()
+            self.shm = None
+
+    def read(self) -> Tuple[float, memoryview] | None:
+        """Copies the consistent snapshot
+
+        Returns
+        -------
+        Tuple[float, memoryview] | None
+            timestamp and values (`params` of every channel in the `aliases` order)
+            or None if the writer did not finish the update during all retries
+        """
+
+        for _ in range(self.retries):
+            start = self.seq[0]
+            if start % 2 == 0:
+                self.local[:] = self.values
+                timestamp = self.timestamp[1]
+                if self.seq[0] == start:
+                    self.counters["reads"] += 1
+                    return timestamp, self.local
+            self.counters["retries"] += 1
+        return None
+
+    def params(self, parameters: list[str] | None = None) -> Tuple[float, dict] | None:
+        """Returns the latest parameters of all channels
+        (from the segment or from the fallback)
+
+        Parameters
+        ----------
+        parameters : list[str] | None, default None
+            selected parameters (all by default)
+
+        Returns
+        -------
+        Tuple[float, dict] | None
+            timestamp and parameters by the channel aliases
+            or None if there are no fresh parameters
+            (the caller falls back to the `params` request)
+        """
+
+        published = self.__read_params(parameters)
+        if published is None and self.fallback is not None:
+            self.counters["fallbacks"] += 1
+            return self.fallback.params(parameters)
+        return published
+
+    def __read_params(self, parameters: list[str] | None) -> Tuple[float, dict] | None:
+        if self.shm is None and not self.attach():
+            return None
+        snapshot = self.read()
+        if snapshot is None or snapshot[0] == 0:
+            return None
+        timestamp, values = snapshot
+        if time.time() - timestamp > self.max_age:
+            self.close()
+            return None
+
+        selected = self.parameters if parameters is None else parameters
+        if any(p not in self.parameters for p in selected):
+            return None
+        columns = [(p, self.parameters.index(p), p in self.ints) for p in selected]
+        nparams = len(self.parameters)
+        out = dict()
+        for i, alias in enumerate(self.aliases):
+            row = dict()
+            for p, j, is_int in columns:
+                value = values[i * nparams + j]
+                if not math.isnan(value):
+                    row[p] = int(value) if is_int else value
+            if len(row) == len(columns):
+                out[alias] = row
+            elif row and parameters is not None:
+                # some of the selected parameters are missing
+                return None
+        return timestamp, out
@@ -0,0 +1,13 @@
+"""Bit masks of the CAEN channel status (ChStatus)"""
+
+
+class Status:
+    """Bit masks of the channel status (ChStatus)"""
+
+    # ramping up or down (bits 1, 2)
+    RAMP = 0b110
+    RAMP_DOWN = 0b100
+    # bad status bits (3-12)
+    ERRORS = 0b1_1111_1111_1000
+    # over and under voltage (bits 4, 5), acceptable while ramping down
+    OVERVOLTAGE = 0b11_0000
@@ -0,0 +1,173 @@
+"""Process-wide metrics of the microservices
+(counters, gauges and histograms with labels)"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import timeit
+
+# upper bounds of the latency histogram buckets (in seconds)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Names:
+    """Names of the collected metrics"""
+
+    # RouterServer
+    SERVER_RECEIVED = "caen_server_received_total"
+    SERVER_SENT = "caen_server_sent_total"
+    SERVER_SEND_FAILURES = "caen_server_send_failures_total"
+    SERVER_IN_FLIGHT = "caen_server_in_flight"
+    SERVER_EXPIRED = "caen_server_expired_total"
+    SERVER_REJECTED = "caen_server_rejected_total"
+    SERVER_QUEUE_DEPTH = "caen_server_queue_depth"
+    # APIFactory
+    REQUESTS = "caen_requests_total"
+    REQUEST_DURATION = "caen_request_duration_seconds"
+    # AsyncClient
+    CLIENT_QUERIES = "caen_client_queries_total"
+    CLIENT_TIMEOUTS = "caen_client_timeouts_total"
+    CLIENT_IN_FLIGHT = "caen_client_in_flight"
+    CLIENT_DURATION = "caen_client_duration_seconds"
+    # Publisher and Subscriber
+    PUB_MESSAGES = "caen_pub_messages_total"
+    SUB_MESSAGES = "caen_sub_messages_total"
+    SUB_LOST = "caen_sub_lost_total"
+    # FlightRecorder
+    FLIGHT_SAMPLES = "caen_flight_samples_total"
+    FLIGHT_TRIGGERS = "caen_flight_triggers_total"
+    FLIGHT_RECORDINGS = "caen_flight_recordings_total"
+
+
+class Metrics:
+    """Registry of the metrics of the process
+
+    Metrics are identified by the name and the sorted labels
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counters: dict[tuple, float] = dict()
+        self.gauges: dict[tuple, float] = dict()
+        self.histograms: dict[tuple, dict] = dict()
+
+    @staticmethod
+    def key(name: str, labels: dict) -> tuple:
+        """Identity of the metric"""
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increments the counter"""
+
+        key = self.key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def add(self, name: str, value: float, **labels) -> None:
+        """Changes the gauge by the value"""
+
+        key = self.key(name, labels)
+        self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Adds the value to the histogram"""
+
+        key = self.key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = dict(counts=[0] * (len(self.buckets) + 1), sum=0, count=0)
+            self.histograms[key] = hist
+        hist["counts"][bisect_left(self.buckets, value)] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, gauge: str | None = None, **labels):
+        """Observes the duration of the block (and counts it in the in-flight gauge)"""
+
+        if gauge is not None:
+            self.add(gauge, 1, **labels)
+        starttime = timeit.default_timer()
+        try:
+            yield
+        finally:
+            self.observe(name, timeit.default_timer() - starttime, **labels)
+            if gauge is not None:
+                self.add(gauge, -1, **labels)
+
+    def snapshot(self) -> dict:
+        """Returns JSON-serializable state of all metrics"""
+
+        def rows(metrics: dict) -> list[dict]:
+            return [
+                dict(name=name, labels=dict(labels), value=value)
+                for (name, labels), value in metrics.items()
+            ]
+
+        return dict(
+            counters=rows(self.counters),
+            gauges=rows(self.gauges),
+            histograms=[
+                dict(name=name, labels=dict(labels), buckets=list(self.buckets), **hist)
+                for (name, labels), hist in self.histograms.items()
+            ],
+        )
+
+
+# metrics of the current process
+REGISTRY = Metrics()
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def to_prometheus(snapshots: dict[str, dict]) -> str:
+    """Renders metrics snapshots in the Prometheus text format
+
+    Parameters
+    ----------
+    snapshots : dict[str, dict]
+        snapshots (see Metrics.snapshot) by the service titles
+        (the title is added as the `service` label)
+
+    Returns
+    -------
+    str
+        Prometheus text exposition
+    """
+
+    families: dict[str, tuple[str, list[str]]] = dict()
+
+    def family(name: str, kind: str) -> list[str]:
+        return families.setdefault(name, (kind, []))[1]
+
+    for service, snapshot in snapshots.items():
+        for kind in ("counters", "gauges"):
+            for row in snapshot.get(kind, []):
+                labels = dict(service=service, **row["labels"])
+                family(row["name"], kind[:-1]).append(
+                    f"{row['name']}{_labels(labels)} {row['value']}"
+                )
+        for row in snapshot.get("histograms", []):
+            lines = family(row["name"], "histogram")
+            labels = dict(service=service, **row["labels"])
+            cumulative = 0
+            for bound, count in zip(row["buckets"] + ["+Inf"], row["counts"]):
+                cumulative += count
+                lines.append(
+                    f"{row['name']}_bucket{_labels(dict(labels, le=bound))} {cumulative}"
+                )
+            lines.append(f"{row['name']}_sum{_labels(labels)} {row['sum']}")
+            lines.append(f"{row['name']}_count{_labels(labels)} {row['count']}")
+
+    out = []
+    for name, (kind, lines) in sorted(families.items()):
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
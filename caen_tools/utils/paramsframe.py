@@ -0,0 +1,133 @@
+"""Columnar snapshot of the device parameters
+
+The usual representation is a nested dictionary `{alias: {par: value}}`,
+ParamsFrame keeps the channel index (aliases) and one contiguous array
+per parameter instead. Its wire format is
+`{"aliases": [alias, ...], "columns": {par: [value, ...]}}`
+"""
+
+from array import array
+from typing import Any, Iterable
+
+
+class ParamsFrame:
+    """Device parameters of the channels by columns
+
+    Parameters
+    ----------
+    aliases : list[str]
+        channel aliases (index of the rows)
+    columns : dict[str, array | list]
+        values of every parameter in the `aliases` order
+        (`array("q")` for integer parameters, `array("d")` for numeric ones
+        and `list` for the others)
+    """
+
+    __slots__ = ("aliases", "index", "columns")
+
+    def __init__(self, aliases: list[str], columns: dict[str, array | list]):
+        self.aliases = aliases
+        self.index = {alias: i for i, alias in enumerate(aliases)}
+        self.columns = columns
+
+    @staticmethod
+    def column(values: list) -> array | list:
+        """Packs the values into the array of the suitable type"""
+
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            return array("q", values)
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            return array("d", values)
+        return list(values)
+
+    @classmethod
+    def from_dict(cls, params: dict[Any, dict]) -> "ParamsFrame":
+        """Creates the frame from `{alias: {par: value}}`
+        (parameters of the first channel define the columns)"""
+
+        aliases = [str(alias) for alias in params]
+        rows = list(params.values())
+        names = list(rows[0]) if rows else []
+        return cls(
+            aliases, {p: cls.column([row.get(p) for row in rows]) for p in names}
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "ParamsFrame":
+        """Creates the frame from the GetParams ticket rows
+        `[{"channel": {"alias": ...}, "params": {par: value}}]`"""
+
+        return cls.from_dict({row["channel"]["alias"]: row["params"] for row in rows})
+
+    @classmethod
+    def from_wire(cls, dct: dict) -> "ParamsFrame":
+        """Creates the frame from the wire format"""
+
+        return cls(
+            [str(alias) for alias in dct["aliases"]],
+            {p: cls.column(values) for p, values in dct["columns"].items()},
+        )
+
+    @staticmethod
+    def is_wire(obj: Any) -> bool:
+        """The object is the frame in the wire format"""
+        return isinstance(obj, dict) and set(obj) == {"aliases", "columns"}
+
+    @classmethod
+    def from_any(cls, obj: "ParamsFrame | dict") -> "ParamsFrame":
+        """Creates the frame from the frame, its wire format or the nested dictionary"""
+
+        if isinstance(obj, ParamsFrame):
+            return obj
+        if cls.is_wire(obj):
+            return cls.from_wire(obj)
+        return cls.from_dict(obj)
+
+    def to_wire(self) -> dict:
+        """Returns the wire format"""
+
+        return dict(
+            aliases=self.aliases,
+            columns={p: list(values) for p, values in self.columns.items()},
+        )
+
+    def to_dict(self) -> dict[str, dict]:
+        """Returns `{alias: {par: value}}`"""
+
+        names = list(self.columns)
+        return {
+            alias: dict(zip(names, values))
+            for alias, *values in zip(self.aliases, *self.columns.values())
+        }
+
+    def select(
+        self, parameters: list[str] | None = None, channels: set[str] | None = None
+    ) -> "ParamsFrame":
+        """Returns the frame with the selected parameters and channels
+        (all by default)"""
+
+        names = list(self.columns) if parameters is None else parameters
+        if channels is None:
+            return ParamsFrame(self.aliases, {p: self.columns[p] for p in names})
+        rows = [i for i, alias in enumerate(self.aliases) if alias in channels]
+        return ParamsFrame(
+            [self.aliases[i] for i in rows],
+            {p: self.column([self.columns[p][i] for i in rows]) for p in names},
+        )
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def __contains__(self, parameter: str) -> bool:
+        return parameter in self.columns
+
+    def __getitem__(self, parameter: str) -> array | list:
+        return self.columns[parameter]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ParamsFrame):
+            return NotImplemented
+        return self.aliases == other.aliases and self.columns == other.columns
+
+    def __repr__(self) -> str:
+        return f"ParamsFrame({len(self.aliases)} channels, {list(self.columns)})"
@@ -9,25 +9,36 @@ import dataclasses
 from caen_tools.utils.utils import get_timestamp
 
 
-@dataclass
+@dataclass(slots=True)
 class ReceiptResponse:
     """Defines a structure of the receipt response"""
 
     statuscode: int
     body: Union[str, dict, list]
-    timestamp: int = None
+    timestamp: int | float = None
 
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = get_timestamp()
 
+    def to_dict(self) -> dict:
+        """Returns the dictionary of the fields (the body is not copied)"""
+        return dict(
+            statuscode=self.statuscode, body=self.body, timestamp=self.timestamp
+        )
 
-@dataclass
+    @classmethod
+    def from_dict(cls, dct: dict) -> "ReceiptResponse":
+        """Creates the response from the dictionary of the fields"""
+        return cls(dct["statuscode"], dct["body"], dct.get("timestamp"))
+
+
+@dataclass(slots=True)
 class ReceiptResponseError(ReceiptResponse):
     """Defines a structure of the error receipt response"""
 
 
-@dataclass
+@dataclass(slots=True)
 class Receipt:
     """A message structure for conversation between microservices
 
@@ -41,47 +52,88 @@ class Receipt:
         title of the task
     params : dict
         arguments of the task
-    timestamp : int
-        time creation of the receipt
-        (defined automatically)
+    timestamp : int | float
+        time creation of the receipt in seconds
+        (defined automatically as an integer)
     response : ReceiptResponse
         response on this receipt
+    trace_id : str
+        identifier of the trace the receipt belongs to
+        (defined by the client)
+    spans : list
+        `[event, time]` pairs of the receipt processing
+        (see caen_tools.utils.tracing)
+    deadline : float
+        unix time after which nobody waits the response
+        (defined by the client from its receive time)
     """
 
     sender: str
     executor: str
     title: str
     params: dict
-    timestamp: int = None
+    timestamp: int | float = None
     response: ReceiptResponse = None
+    trace_id: str = None
+    spans: list = None
+    deadline: float = None
 
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = get_timestamp()
 
+    def to_dict(self) -> dict:
+        """Returns the dictionary of the fields
+        (params, body and spans are not copied)"""
+
+        return dict(
+            sender=self.sender,
+            executor=self.executor,
+            title=self.title,
+            params=self.params,
+            timestamp=self.timestamp,
+            response=self.response.to_dict() if self.response is not None else None,
+            trace_id=self.trace_id,
+            spans=self.spans,
+            deadline=self.deadline,
+        )
+
+    @classmethod
+    def from_dict(cls, dct: dict) -> "Receipt":
+        """Creates the receipt from the dictionary of the fields"""
+
+        response = dct.get("response")
+        return cls(
+            sender=dct["sender"],
+            executor=dct["executor"],
+            title=dct["title"],
+            params=dct["params"],
+            timestamp=dct.get("timestamp"),
+            response=ReceiptResponse.from_dict(response) if response else None,
+            trace_id=dct.get("trace_id"),
+            spans=dct.get("spans"),
+            deadline=dct.get("deadline"),
+        )
+
 
 class ReceiptJSONEncoder(json.JSONEncoder):
     """JSON Encoder for the receipt dataclass"""
 
     def default(self, o):
+        if isinstance(o, (Receipt, ReceiptResponse)):
+            return o.to_dict()
         if dataclasses.is_dataclass(o):
             return dataclasses.asdict(o)
         return super().default(o)
 
 
 class ReceiptJSONDecoder(json.JSONDecoder):
-    """JSON Decoder for the receipt dataclass"""
-
-    def __init__(self, *args, **kwargs):
-        json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
-
-    def object_hook(self, dct):
-        """Decoder of the dictionary"""
-
-        if ("sender" in dct) and ("executor" in dct):
-            response_dict = dct.pop("response", None)
-            response = (
-                ReceiptResponse(**response_dict) if response_dict is not None else None
-            )
-            return Receipt(response=response, **dct)
-        return dct
+    """JSON Decoder for the receipt dataclass
+    (only the top level object is checked to be a receipt,
+    nested dictionaries are kept as they are)"""
+
+    def decode(self, s, *args, **kwargs):
+        obj = super().decode(s, *args, **kwargs)
+        if isinstance(obj, dict) and ("sender" in obj) and ("executor" in obj):
+            return Receipt.from_dict(obj)
+        return obj
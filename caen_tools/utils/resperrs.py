@@ -16,6 +16,13 @@ class RResponseErrors:
         """Response when waiting time exeeded (for example)"""
         return ReceiptResponseError(statuscode=503, body=msg)
 
+    @staticmethod
+    def ServiceUnavailable(
+        msg: str = "Server error: Service Unavailable",
+    ) -> ReceiptResponse:
+        """Response when the server is overloaded"""
+        return ReceiptResponseError(statuscode=503, body=msg)
+
     @staticmethod
     def ForbiddenMethod(
         msg: str = "Usage of the method is prohibited",
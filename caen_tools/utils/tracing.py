@@ -0,0 +1,177 @@
+"""Timing of the receipts on their way between microservices
+
+Every receipt carries `trace_id` and `spans`, the list of `[event, time]` pairs
+appended by the client (send, receive), the server (receive, reply)
+and the APIFactory (execute_start, execute_end)
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import time
+import uuid
+
+from caen_tools.utils.receipt import Receipt
+
+
+class Events:
+    """Names of the receipt events"""
+
+    CLIENT_SEND = "client_send"
+    SERVER_RECEIVE = "server_receive"
+    EXECUTE_START = "execute_start"
+    EXECUTE_END = "execute_end"
+    SERVER_REPLY = "server_reply"
+    CLIENT_RECEIVE = "client_receive"
+
+
+# names of the intervals between consecutive events
+SEGMENTS = {
+    (Events.CLIENT_SEND, Events.SERVER_RECEIVE): "request",
+    # the receipt forwarded by the proxy (e.g. WebService upstream)
+    (Events.CLIENT_SEND, Events.CLIENT_SEND): "proxy",
+    (Events.SERVER_RECEIVE, Events.EXECUTE_START): "queue",
+    (Events.EXECUTE_START, Events.EXECUTE_END): "execute",
+    (Events.EXECUTE_END, Events.SERVER_REPLY): "reply",
+    (Events.SERVER_REPLY, Events.CLIENT_RECEIVE): "response",
+}
+
+# trace ID of the current task (e.g. HTTP request of the WebService)
+TRACE_ID: ContextVar[str | None] = ContextVar("caen_trace_id", default=None)
+
+
+class Collector(list):
+    """Receipts received by the task
+    (background tasks started by it can outlive the task, so it can be closed)"""
+
+    closed = False
+
+
+# receipts received by the current task
+COLLECTED: ContextVar[Collector | None] = ContextVar(
+    "caen_trace_receipts", default=None
+)
+
+
+def new_trace_id() -> str:
+    """Generates a new trace ID"""
+    return uuid.uuid4().hex[:16]
+
+
+def mark(receipt: Receipt, event: str) -> None:
+    """Appends the event with the current time to the receipt spans"""
+
+    if receipt.spans is None:
+        receipt.spans = []
+    receipt.spans.append([event, time.time()])
+
+
+def start(receipt: Receipt) -> None:
+    """Sets the trace ID (of the current task or a new one)
+    and marks the sending of the receipt"""
+
+    if receipt.trace_id is None:
+        receipt.trace_id = TRACE_ID.get() or new_trace_id()
+    mark(receipt, Events.CLIENT_SEND)
+
+
+def collect(receipt: Receipt) -> None:
+    """Marks the receiving of the response
+    and keeps the receipt for the current task if it is collecting"""
+
+    mark(receipt, Events.CLIENT_RECEIVE)
+    collected = COLLECTED.get()
+    if collected is not None and not collected.closed:
+        collected.append(receipt)
+
+
+@contextmanager
+def execution(receipt: Receipt):
+    """Marks the start and the end of the receipt execution"""
+
+    mark(receipt, Events.EXECUTE_START)
+    try:
+        yield
+    finally:
+        mark(receipt, Events.EXECUTE_END)
+
+
+def event_time(receipt: Receipt, event: str) -> float | None:
+    """Returns the time of the last such event (None if there is no one)"""
+
+    for name, t in reversed(receipt.spans or []):
+        if name == event:
+            return t
+    return None
+
+
+def duration(receipt: Receipt) -> float:
+    """Returns the time between the first and the last events (in seconds)"""
+
+    if not receipt.spans:
+        return 0
+    return receipt.spans[-1][1] - receipt.spans[0][1]
+
+
+def breakdown(spans: list) -> list[tuple[str, float]]:
+    """Returns durations of the intervals between consecutive events (in seconds)"""
+
+    return [
+        (SEGMENTS.get((a, b), f"{a}-{b}"), tb - ta)
+        for (a, ta), (b, tb) in zip(spans, spans[1:])
+    ]
+
+
+def server_timing(receipts: list[Receipt]) -> str:
+    """Renders timing breakdown of the receipts for the Server-Timing header"""
+
+    entries = []
+    for receipt in receipts:
+        for segment, duration in breakdown(receipt.spans or []):
+            entries.append(
+                f"{receipt.executor}.{receipt.title}.{segment};dur={duration * 1000:.2f}"
+            )
+    return ", ".join(entries)
+
+
+class SlowTraces:
+    """Ring buffer of the recent slow receipts
+
+    Parameters
+    ----------
+    threshold : float, default 0.5
+        minimal duration of the slow receipt (in seconds)
+    size : int, default 100
+        number of kept receipts
+    """
+
+    def __init__(self, threshold: float = 0.5, size: int = 100):
+        self.threshold = threshold
+        self.traces: deque[dict] = deque(maxlen=size)
+
+    def add(self, receipt: Receipt, duration: float) -> None:
+        """Keeps the receipt if it is slow"""
+
+        if duration < self.threshold:
+            return
+        spans = list(receipt.spans or [])
+        self.traces.append(
+            dict(
+                trace_id=receipt.trace_id,
+                sender=receipt.sender,
+                executor=receipt.executor,
+                title=receipt.title,
+                duration=duration,
+                spans=spans,
+                breakdown=dict(breakdown(spans)),
+            )
+        )
+
+    def snapshot(self) -> list[dict]:
+        """Returns kept traces (the latest first)"""
+        return list(reversed(self.traces))
+
+
+# slow receipts of the current process
+SLOW_TRACES = SlowTraces()
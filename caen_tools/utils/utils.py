@@ -36,9 +36,10 @@ def config_processor(configfile):
     return settings
 
 
-def get_timestamp() -> int:
-    """Returns current timestamp (in seconds)"""
-    return int(time.time())
+def get_timestamp(precise: bool = False) -> int | float:
+    """Returns current timestamp
+    (in seconds, with the fraction of the second if `precise`)"""
+    return time.time() if precise else int(time.time())
 
 
 def get_logging_config(